@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+from ConvertToTM2.convert import DATA_TEMPLATE, DataRecord, HeaderRecord
+from ConvertToTM2.tmy2format import DATA_ELEMENTS_POS, DERIVED_ELEMENTS, OPENMETEO_MAPPING
+from OpenMeteoAPI.metrics import instrument
+from OpenMeteoAPI.calendar_utils import get_calendar, get_date_columns, get_dates, hours_of_year
+
+import numpy as np
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+DATA_RECORD_LEN = 142  # number of characters of a data record
+
+
+def get_positions(key: str) -> (int, int):
+    """Get start (included) and end (excluded) index of the value of an element inside a data record.
+
+    :param str key: name of an element in the tmy2 format
+    :return:
+        - start_pos - index of the first character
+        - end_pos - index after the last character
+    """
+
+    return DATA_ELEMENTS_POS[key]['value'][0] - 1, DATA_ELEMENTS_POS[key]['value'][1]
+
+
+def format_column(values: np.ndarray, width: int, factor: float | None = None) -> (np.ndarray, np.ndarray):
+    """Format a whole column of values into fixed-width characters.
+
+    Equivalent to Record.set_value applied to every value of the column: values are divided by the conversion factor,
+    truncated to integers and zero-padded to the given width, NaN values are replaced by the "missing data" value.
+
+    :param np.ndarray values: values to be formatted
+    :param int width: number of characters of the element
+    :param float | None factor: conversion factor of the element, if any
+    :return:
+        - chars - ASCII codes of the formatted values, as array of shape (len(values), width)
+        - overflow - mask of values which do not fit into the given width (or are infinite)
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    if factor is not None:
+        values = values / factor
+
+    # integer part of the values, truncated towards zero (like int())
+    ints = np.trunc(np.where(missing, 0, values))
+    overflow = ~missing & (~np.isfinite(ints) | (ints >= 10 ** width) | (ints <= -10 ** (width - 1)))
+    ints = np.where(overflow, 0, ints).astype(np.int64)
+
+    # split absolute values into digits, most significant digit first
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    chars = (np.abs(ints)[:, None] // powers % 10 + ord('0')).astype(np.uint8)
+
+    # negative values keep their width, the sign takes the place of the leading zero
+    chars[ints < 0, 0] = ord('-')
+    chars[missing] = ord('9')
+
+    return chars, overflow
+
+
+def get_openmeteo_columns(data: DataFrame | dict) -> (dict, int, int):
+    """Get tmy2 data columns from pandas DataFrame (or dict of arrays) with OpenMeteo data.
+
+    :param DataFrame | dict data: weather data, as DataFrame or as dict of arrays (see
+        OpenMeteoClient.get_hourly_columns)
+    :return:
+        - tmy2_data - dict with tmy2 element as key and data as array
+        - year - year of the dataset
+        - first_hour - hour of the year at which the data begins
+    """
+
+    dates = get_dates(data['date'])
+    tmy2_data = get_date_columns(dates)  # year (format YY), month, day and hour
+    for _key in OPENMETEO_MAPPING.keys():
+        tmy2_data[OPENMETEO_MAPPING[_key]['tm2_varname']] = np.asarray(data[_key])
+    for key in DERIVED_ELEMENTS:  # derived elements, if any (see ConvertToTM2.derived)
+        if key in data:
+            tmy2_data[key] = np.asarray(data[key])
+
+    year = int(dates[0].astype('datetime64[Y]').astype(np.int64)) + 1970
+
+    # determine at which hour of the year the data begins
+    first_hour = int(hours_of_year(dates[:1])[0])
+
+    return tmy2_data, year, first_hour
+
+
+def format_columns(data: dict, start: int = 0, end: int | None = None) -> (dict, np.ndarray):
+    """Format all elements of a (part of a) dataset.
+
+    :param dict data: dict with parameter as key and data as array
+    :param int start: first index of the part of the dataset
+    :param int | None end: index after the last index of the part of the dataset, None for the end of the dataset
+    :return:
+        - columns - ASCII codes of the formatted values, with element as key
+        - overflow - mask of records with values which do not fit into their width
+    """
+
+    columns = {}
+    overflow = np.zeros(len(data['hour'][start:end]), dtype=bool)
+    for key in data:
+        start_pos, end_pos = get_positions(key)
+        factor = DATA_ELEMENTS_POS[key].get('factor')
+        columns[key], _overflow = format_column(data[key][start:end], end_pos - start_pos, factor)
+        overflow |= _overflow
+
+    return columns, overflow
+
+
+def render_record(data: dict, data_index: int, line: str) -> str:
+    """Render a single record through DataRecord, reproducing its handling of oversized values.
+
+    :param dict data: dict with parameter as key and data as array
+    :param int data_index: position of the record within the dataset
+    :param str line: current state of the record
+    :return: record as string
+    """
+
+    record = DataRecord(reset=False)
+    record.data = line
+    record.set_values({key: data[key][data_index].item() for key in data})
+
+    return record.data
+
+
+def get_template() -> np.ndarray:
+    """Get an empty data record ("missing data" values and flags, blank datetime) as ASCII codes."""
+    return np.frombuffer(DATA_TEMPLATE, dtype=np.uint8)
+
+
+class ColumnarTMY2:
+    def __init__(self, length: int = 8760) -> None:
+        """Initialize columnar tmy2 conversion.
+
+        Array-backed counterpart of TMY2, producing byte-identical tm2 files. Instead of one DataRecord per hour, all
+        records are kept in a single character block of shape (length, 143), one row per record with a trailing line
+        break, and every element is rendered for all records at once.
+
+        :param int length: length of tm2 file (number of records, typically 1 record per hour for a year, so 8760)
+        """
+        self.length = length
+        self.header = None
+
+        # every record starts as an empty data record ("missing data" values and flags, blank datetime)
+        template = np.append(get_template(), np.uint8(ord('\n')))
+        self.records = np.tile(template, (self.length, 1))
+
+        # records which cannot be rendered column-wise (values exceeding their width), as index: line
+        self.overrides = {}
+
+    def set_header(self, lat: float, long: float, time_zone: int, elevation: int) -> None:
+        """Set tmy2 file header.
+
+        :param float lat: latitude in degrees
+        :param float long: longitude in degrees
+        :param int time_zone: time zone (UTC = 0, UTC+1 = 1, UTC-1 = -1 etc.)
+        :param int elevation: elevation in meters
+        """
+
+        self.header = HeaderRecord(lat=lat, long=long, time_zone=time_zone, elevation=elevation)
+        self.header.update()
+
+    def fill_datetime_column(self, year: int) -> None:
+        """Fill the datetime column.
+
+        :param int year: year of the dataset
+        """
+
+        self.write_columns(get_calendar(year, self.length))
+
+    def write_columns(self, data: dict, start: int = 0) -> None:
+        """Write weather dataset into records, one element at a time for all records.
+
+        TMY2 format does not support leap year, therefore they have to be removed beforehand.
+
+        :param dict data: dict with parameter as key and data as array
+        :param int start: starting position of the dataset within the tm2 file (0-8759)
+        """
+
+        data_len: int = len(data['hour'])
+        if start + data_len > self.length:
+            raise IndexError(f'dataset with {data_len} records starting at {start} exceeds tm2 length {self.length}')
+
+        # format all elements first, records with oversized values have to be rendered from their previous state
+        columns, overflow = format_columns(data)
+
+        # records already rendered one by one have to be updated the same way
+        for index in self.overrides:
+            if start <= index < start + data_len:
+                overflow[index - start] = True
+
+        # values exceeding their width shift the rest of the record, render those records one by one
+        for data_index in np.flatnonzero(overflow):
+            index = start + int(data_index)
+            self.overrides[index] = render_record(data, int(data_index), self.get_line(index))
+
+        block = self.records[start:start + data_len]
+        for key in columns:
+            block[:, slice(*get_positions(key))] = columns[key]
+
+    def get_line(self, index: int) -> str:
+        """Get a single record as string.
+
+        :param int index: position of the record within the tm2 file
+        :return: record as string
+        """
+
+        if index in self.overrides:
+            return self.overrides[index]
+        return self.records[index, :DATA_RECORD_LEN].tobytes().decode('ascii')
+
+    def to_string(self) -> str:
+        """Get header and all records as tm2 file content.
+
+        :return: tm2 file content
+        """
+
+        body = self.records.tobytes().decode('ascii')[:-1]  # no line break after the last record
+
+        if self.overrides:
+            lines = body.split('\n')
+            for index, line in self.overrides.items():
+                lines[index] = line
+            body = '\n'.join(lines)
+
+        return self.header.data + '\n' + body
+
+    def print(self) -> None:
+        """Print all records."""
+
+        print(self.to_string())
+
+    def export(self, path: str) -> None:
+        """Export all records to designated path as tm2 file.
+
+        :param str path: output path, to receive a tm2 file, the file extension should be .tm2
+        """
+
+        with open(path, 'w') as f:
+            f.write(self.to_string())
+
+    @instrument('tmy2_export', rows=lambda result, self, data, *args, **kwargs: len(data['date']))
+    def export_from_openmeteo_df(
+            self, data: DataFrame | dict, lat: float, long: float, time_zone: int, elevation: int, path: str) -> None:
+        """Export tm2 file from pandas DataFrame (or dict of arrays) with OpenMeteo data.
+
+        :param DataFrame | dict data: weather data (see get_openmeteo_columns)
+        :param float lat: latitude in degrees
+        :param float long: longitude in degrees
+        :param int time_zone: time zone (UTC = 0, UTC+1 = 1, UTC-1 = -1 etc.)
+        :param int elevation: elevation in meters
+        :param str path: export path
+        """
+
+        self.set_header(lat=lat, long=long, time_zone=time_zone, elevation=elevation)
+
+        tmy2_data, year, first_hour = get_openmeteo_columns(data)
+
+        # fill datetime column
+        self.fill_datetime_column(year=year)
+
+        # write tmy2 data into tmy2 records
+        self.write_columns(tmy2_data, start=first_hour)
+
+        self.export(path)
+
+
+class StreamingTMY2:
+    def __init__(self, length: int = 8760, chunk_size: int = 4096) -> None:
+        """Initialize streaming tmy2 conversion.
+
+        Renders the records chunk by chunk while writing them, so that memory usage only depends on the chunk size and
+        not on the length of the tm2 file. Records not covered by the dataset are emitted from a precomputed chunk of
+        empty records, with only their datetime filled in. The output is byte-identical to TMY2 and ColumnarTMY2.
+
+        :param int length: length of tm2 file (number of records, typically 1 record per hour for a year, so 8760)
+        :param int chunk_size: number of records rendered at once
+        """
+        self.length = length
+        self.chunk_size = chunk_size
+        self.header = None
+
+        # chunk of empty records, each record preceded by a line break
+        self.template = np.tile(np.insert(get_template(), 0, np.uint8(ord('\n'))), (self.chunk_size, 1))
+
+    def set_header(self, lat: float, long: float, time_zone: int, elevation: int) -> None:
+        """Set tmy2 file header.
+
+        :param float lat: latitude in degrees
+        :param float long: longitude in degrees
+        :param int time_zone: time zone (UTC = 0, UTC+1 = 1, UTC-1 = -1 etc.)
+        :param int elevation: elevation in meters
+        """
+
+        self.header = HeaderRecord(lat=lat, long=long, time_zone=time_zone, elevation=elevation)
+        self.header.update()
+
+    @staticmethod
+    def write_block(block: np.ndarray, columns: dict) -> None:
+        """Write formatted elements into a block of records, each record preceded by a line break.
+
+        :param np.ndarray block: records as ASCII codes, of shape (records, 143)
+        :param dict columns: ASCII codes of the formatted values, with element as key
+        """
+
+        for key in columns:
+            start_pos, end_pos = get_positions(key)
+            block[:, start_pos + 1:end_pos + 1] = columns[key]
+
+    def iter_chunks(self, data: dict, year: int, start: int = 0) -> Iterator[str]:
+        """Yield all records chunk by chunk, each record preceded by a line break.
+
+        TMY2 format does not support leap year, therefore they have to be removed beforehand.
+
+        :param dict data: dict with parameter as key and data as array
+        :param int year: year of the dataset
+        :param int start: starting position of the dataset within the tm2 file (0-8759)
+        :return: chunks of records as string
+        """
+
+        data_len: int = len(data['hour'])
+        if start + data_len > self.length:
+            raise IndexError(f'dataset with {data_len} records starting at {start} exceeds tm2 length {self.length}')
+
+        for chunk_start in range(0, self.length, self.chunk_size):
+            chunk_end = min(chunk_start + self.chunk_size, self.length)
+
+            # empty records with datetime
+            block = self.template[:chunk_end - chunk_start].copy()
+            self.write_block(block, format_columns(get_calendar(year, chunk_end - chunk_start, chunk_start))[0])
+
+            # part of the dataset within the chunk
+            data_start, data_end = max(chunk_start, start) - start, min(chunk_end, start + data_len) - start
+            overrides = {}
+            if data_start < data_end:
+                columns, overflow = format_columns(data, data_start, data_end)
+                rows = block[data_start + start - chunk_start:data_end + start - chunk_start]
+
+                # values exceeding their width shift the rest of the record, render those records one by one
+                for index in np.flatnonzero(overflow):
+                    line = rows[index, 1:].tobytes().decode('ascii')
+                    overrides[data_start + start - chunk_start + int(index)] = render_record(
+                        data, data_start + int(index), line)
+
+                self.write_block(rows, columns)
+
+            text = block.tobytes().decode('ascii')
+            if overrides:
+                lines = text.split('\n')  # first element is empty, records are preceded by a line break
+                for index, line in overrides.items():
+                    lines[index + 1] = line
+                text = '\n'.join(lines)
+
+            yield text
+
+    def export(self, data: dict, year: int, path: str, start: int = 0, buffering: int = 1 << 20) -> None:
+        """Export all records to designated path as tm2 file, chunk by chunk.
+
+        :param dict data: dict with parameter as key and data as array
+        :param int year: year of the dataset
+        :param str path: output path, to receive a tm2 file, the file extension should be .tm2
+        :param int start: starting position of the dataset within the tm2 file (0-8759)
+        :param int buffering: size of the write buffer in bytes
+        """
+
+        with open(path, 'w', buffering=buffering) as f:
+            f.write(self.header.data)  # write header
+            for chunk in self.iter_chunks(data, year, start):
+                f.write(chunk)
+
+    @instrument('tmy2_export', rows=lambda result, self, data, *args, **kwargs: len(data['date']))
+    def export_from_openmeteo_df(
+            self, data: DataFrame | dict, lat: float, long: float, time_zone: int, elevation: int, path: str) -> None:
+        """Export tm2 file from pandas DataFrame (or dict of arrays) with OpenMeteo data.
+
+        :param DataFrame | dict data: weather data (see get_openmeteo_columns)
+        :param float lat: latitude in degrees
+        :param float long: longitude in degrees
+        :param int time_zone: time zone (UTC = 0, UTC+1 = 1, UTC-1 = -1 etc.)
+        :param int elevation: elevation in meters
+        :param str path: export path
+        """
+
+        self.set_header(lat=lat, long=long, time_zone=time_zone, elevation=elevation)
+
+        tmy2_data, year, first_hour = get_openmeteo_columns(data)
+
+        self.export(tmy2_data, year, path, start=first_hour)
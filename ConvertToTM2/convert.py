@@ -1,9 +1,15 @@
-from ConvertToTM2.tmy2format import HEADER_ELEMENTS_POS, DATA_ELEMENTS_POS, OPENMETEO_MAPPING
-from OpenMeteoAPI.utils import *
+from __future__ import annotations
+
+from ConvertToTM2.tmy2format import HEADER_ELEMENTS_POS, DATA_ELEMENTS_POS, DERIVED_ELEMENTS, OPENMETEO_MAPPING
+from OpenMeteoAPI.calendar_utils import get_calendar
+from OpenMeteoAPI.metrics import instrument
+from OpenMeteoAPI.utils import get_lat_long_minutes, hour_of_year
 
-import datetime
 from math import isnan
-from pandas import DataFrame
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
 
 
 class TMY2:
@@ -13,10 +19,15 @@ class TMY2:
         For more information about the tmy2 format, see "The User's Manual for TMY2s" under
         https://www.nrel.gov/docs/legosti/old/7668.pdf.
 
+        All records are views into a single buffer holding the file content after the header, each record preceded by
+        a line break, so that exporting them is a single write.
+
         :param int length: length of tm2 file (number of records, typically 1 record per hour for a year, so 8760)
         """
         self.length = length
-        self.records = [DataRecord() for _ in range(self.length)]
+        self.buffer = bytearray((b'\n' + DATA_TEMPLATE) * self.length)
+        self.records = [DataRecord(self.buffer, index * (DATA_RECORD_LEN + 1) + 1, reset=False)
+                        for index in range(self.length)]
         self.header = None
 
     def set_header(self, lat: float, long: float, time_zone: int, elevation: int) -> None:
@@ -41,22 +52,35 @@ class TMY2:
         """
 
         data_len: int = len(data['hour'])
+        records = self.records[start:start + data_len]
+
+        # one element at a time for all records, every record still receives its values in the order of the keys
+        for key in data:
+            for record, value in zip(records, data[key]):
+                record.set_value(key, value)
 
-        for data_index in range(data_len):
+    def to_string(self) -> str:
+        """Get header and all records as tm2 file content.
 
-            values = {}  # key-value pairs with data from current hour
-            for key in data:
-                values.update({key: data[key][data_index]})
+        :return: tm2 file content
+        """
+
+        body = self.buffer.decode('ascii')
 
-            # set values from all key-value pairs individually
-            self.records[start + data_index].set_values(values)
+        # records with oversized values are not part of the buffer
+        extended = [index for index, record in enumerate(self.records) if record.extended is not None]
+        if extended:
+            lines = body.split('\n')  # first element is empty, records are preceded by a line break
+            for index in extended:
+                lines[index + 1] = self.records[index].data
+            body = '\n'.join(lines)
+
+        return self.header.data + body
 
     def print(self) -> None:
         """Print all records."""
 
-        print("".join(self.header.data))
-        for record in self.records:
-            print("".join(record.data))
+        print(self.to_string())
 
     def export(self, path: str) -> None:
         """Export all records to designated path as tm2 file.
@@ -65,10 +89,7 @@ class TMY2:
         """
 
         with open(path, 'w') as f:
-            f.write("".join(self.header.data))  # write header
-            for record in self.records:
-                f.write('\n')  # new line
-                f.write("".join(record.data))  # write record
+            f.write(self.to_string())
 
     def fill_datetime_column(self, year: int) -> None:
         """Fill the datetime column.
@@ -76,18 +97,12 @@ class TMY2:
         :param int year: year of the dataset
         """
 
-        date = datetime.datetime(year, month=1, day=1, hour=0)
-        dt = datetime.timedelta(hours=1)
+        calendar = get_calendar(year, self.length)
 
-        for record in self.records:
-            record.set_values(values={
-                'year': int(repr(date.year)[-2:]),
-                'month': date.month,
-                'day': date.day,
-                'hour': date.hour,
-            })
-            date += dt
+        for record, year_, month, day, hour in zip(self.records, *[calendar[key].tolist() for key in calendar]):
+            record.set_values(values={'year': year_, 'month': month, 'day': day, 'hour': hour})
 
+    @instrument('tmy2_export', rows=lambda result, self, data, *args, **kwargs: len(data))
     def export_from_openmeteo_df(
             self, data: DataFrame, lat: float, long: float, time_zone: int, elevation: int, path: str) -> None:
         """Export tm2 file from pandas DataFrame with OpenMeteo data.
@@ -114,6 +129,9 @@ class TMY2:
         }
         for _key in OPENMETEO_MAPPING.keys():
             tmy2_data[OPENMETEO_MAPPING[_key]['tm2_varname']] = data[_key].to_list()
+        for key in DERIVED_ELEMENTS:  # derived elements, if any (see ConvertToTM2.derived)
+            if key in data:
+                tmy2_data[key] = data[key].to_list()
 
         # determine at which hour of the year the data begins
         first_hour = hour_of_year(
@@ -128,19 +146,88 @@ class TMY2:
         self.export(path)
 
 
+def get_fields(file_format: dict) -> dict:
+    """Precompute the position of every element of a tmy2 record format.
+
+    :param dict file_format: tmy2 format information containing the positions of individual elements within a record
+    :return: (start index, end index, conversion factor or None, "missing data" entry) with element as key
+    """
+
+    fields = {}
+    for key, element in file_format.items():
+        start_pos, end_pos = element['value'][0] - 1, element['value'][1]
+        fields[key] = (start_pos, end_pos, element.get('factor'), b'9' * (end_pos - start_pos))
+
+    return fields
+
+
+HEADER_RECORD_LEN = 59  # number of characters of the header record
+DATA_RECORD_LEN = 142  # number of characters of a data record
+HEADER_FIELDS = get_fields(HEADER_ELEMENTS_POS)
+DATA_FIELDS = get_fields(DATA_ELEMENTS_POS)
+
+
 class Record:
-    def __init__(self, file_format: dict, line_len: int) -> None:
+    __slots__ = ('format', 'fields', 'line_len', 'buffer', 'offset', 'extended')
+
+    def __init__(self, file_format: dict, line_len: int, fields: dict | None = None, buffer: bytearray | None = None,
+                 offset: int = 0) -> None:
         """Initialize record.
 
         Regarding the tmy2 (Typical Meteorological Years) format, the term "record" defines a single line. The first
         record is reserved for the header, all others a data records in hourly resolution with multiple sensor entries.
 
+        The characters of the record are stored in a shared buffer, so that the records of a tm2 file are views into a
+        single block. A value exceeding the width of its element shifts the rest of the record (as the tmy2 format has
+        no other way to represent it), such a record is kept as list of characters outside the buffer.
+
         :param dict file_format: tmy2 format information containing the positions of individual elements within a record
         :param int line_len: length of the record (number of characters)
+        :param dict | None fields: precomputed positions of the elements (see get_fields), computed if None
+        :param bytearray | None buffer: buffer holding the record, a new one filled with blanks if None
+        :param int offset: position of the record within the buffer
         """
 
-        self.data = list(' ' * line_len)  # data consisting of a list of characters
         self.format = file_format  # tmy2 format information about header and data element, as dict
+        self.fields = fields if fields is not None else get_fields(file_format)
+        self.line_len = line_len
+        self.buffer = buffer if buffer is not None else bytearray(b' ' * line_len)
+        self.offset = offset
+        self.extended = None  # list of characters of a record with oversized values, None if it fits into the buffer
+
+    @property
+    def data(self) -> str:
+        """Get the record as string."""
+
+        if self.extended is not None:
+            return ''.join(self.extended)
+        return self.buffer[self.offset:self.offset + self.line_len].decode('ascii')
+
+    @data.setter
+    def data(self, line: str | list) -> None:
+        """Set the record from a string or list of characters."""
+
+        if len(line) == self.line_len:
+            self.buffer[self.offset:self.offset + self.line_len] = ''.join(line).encode('ascii')
+            self.extended = None
+        else:
+            self.extended = list(line)
+
+    def set_entry(self, start_pos: int, end_pos: int, entry: bytes) -> None:
+        """Write an entry at the designated position inside the record.
+
+        :param int start_pos: index of the first character
+        :param int end_pos: index after the last character
+        :param bytes entry: characters of the entry, an entry exceeding its width shifts the rest of the record
+        """
+
+        if self.extended is None and len(entry) == end_pos - start_pos:
+            self.buffer[self.offset + start_pos:self.offset + end_pos] = entry
+            return
+
+        if self.extended is None:
+            self.extended = list(self.data)
+        self.extended[start_pos:end_pos] = entry.decode('ascii')
 
     def set_values(self, values: dict) -> None:
         """Writes multiple key-value pairs into the record.
@@ -162,41 +249,46 @@ class Record:
         """
 
         # start and end of the position designated to the element corresponding to the passed key
-        start_pos = self.format[key]['value'][0] - 1
-        end_pos = self.format[key]['value'][1]
-
-        entry_len = end_pos - start_pos  # length of entry
+        start_pos, end_pos, factor, missing_entry = self.fields[key]
 
         if isnan(value):  # if value is NaN, insert "missing data" value
-            value = int('9' * entry_len)
-        elif 'factor' in self.format[key].keys():  # if the element has a conversion factor, perform conversion
-            value = value / self.format[key]['factor']
+            entry = missing_entry
+        else:
+            if factor is not None:  # if the element has a conversion factor, perform conversion
+                value = value / factor
+            # right-aligned and with 0s at unused digits
+            entry = f"{int(value):0{end_pos - start_pos}d}".encode('ascii')
 
-        # write entry into record - right-aligned and with 0s at unused digits
-        self.data[start_pos:end_pos] = f"{int(value):0{entry_len}d}"
+        if self.extended is None and len(entry) == end_pos - start_pos:  # shortcut of set_entry
+            self.buffer[self.offset + start_pos:self.offset + end_pos] = entry
+        else:
+            self.set_entry(start_pos, end_pos, entry)
 
 
 class HeaderRecord(Record):
+    __slots__ = ('wban', 'city', 'state', 'timezone', 'latitude', 'longitude', 'elevation')
+
     def __init__(self, lat: float, long: float, time_zone: int,
                  wban: str = '00000', city: str = 'unknown', state: str = 'ZZ', elevation: int = 0) -> None:
         """Initialize header record."""
 
         # initialize as header record
-        super().__init__(HEADER_ELEMENTS_POS, 59)
+        super().__init__(HEADER_ELEMENTS_POS, HEADER_RECORD_LEN, HEADER_FIELDS)
 
         self.wban = wban
         self.city = city.ljust(22)
         self.state = state
         self.timezone = str(int(time_zone)).rjust(3)
 
+        # hemisphere letter and unsigned degrees and minutes, e.g. "S 33 52" and "W 074 00"
         lat_min, long_min = get_lat_long_minutes(lat, long)
-        self.latitude = ('N'
-                         + f' {int(lat):02d}'  # degrees
-                         + f' {int(lat_min):02d}'  # minutes
+        self.latitude = (('N', 'S')[lat < 0]
+                         + f' {abs(int(lat)):02d}'  # degrees
+                         + f' {abs(lat_min):02d}'  # minutes
                          )
-        self.longitude = (('W', 'E')[long > 0]
-                          + f' {int(long):02d}'  # degrees
-                          + f' {int(long_min):02d}'  # minutes
+        self.longitude = (('E', 'W')[long < 0]
+                          + f' {abs(int(long)):03d}'  # degrees
+                          + f' {abs(long_min):02d}'  # minutes
                           )
 
         self.elevation = f'{elevation:03d}'
@@ -204,54 +296,65 @@ class HeaderRecord(Record):
     def update(self) -> None:
         """Updates header record according to attribute values of the instance."""
 
-        for key in self.format:
-            # start and end of the position designated to the element corresponding to the passed key
-            start_pos = self.format[key]['value'][0] - 1
-            end_pos = self.format[key]['value'][1]
+        for key, (start_pos, end_pos, _, _) in self.fields.items():
+            # write entry into record at the position designated to the element corresponding to the key
+            self.set_entry(start_pos, end_pos, getattr(self, key).encode('ascii'))
+
+
+def get_data_template() -> bytes:
+    """Get an empty data record: "missing data" values, "unknown" source flags, "not applicable" uncertainty flags and
+    blank datetime."""
 
-            entry_len = end_pos - start_pos  # length of entry
+    line = bytearray(b' ' * DATA_RECORD_LEN)
+    for key, (start_pos, end_pos, _, missing_entry) in DATA_FIELDS.items():
+        if key in ['year', 'month', 'day', 'hour']:
+            continue  # do not initialize time data
+        line[start_pos:end_pos] = missing_entry
+        if 'source_flag' in DATA_ELEMENTS_POS[key]:
+            line[DATA_ELEMENTS_POS[key]['source_flag'] - 1] = ord(DataRecord.source_flag)
+        if 'uncertainty_flag' in DATA_ELEMENTS_POS[key]:
+            line[DATA_ELEMENTS_POS[key]['uncertainty_flag'] - 1] = ord(DataRecord.uncertainty_flag)
 
-            # write entry into record - right-aligned and with 0s at unused digits
-            self.data[start_pos:end_pos] = getattr(self, key)
+    return bytes(line)
 
 
 class DataRecord(Record):
-    def __init__(self):
-        """Initialize data record."""
+    __slots__ = ()
 
-        # initialize as data record
-        super().__init__(DATA_ELEMENTS_POS, 142)
+    # flags
+    source_flag = '?'
+    uncertainty_flag = '0'
+
+    # characters of the datetime elements, kept by reset
+    datetime_span = (DATA_FIELDS['year'][0], DATA_FIELDS['hour'][1])
 
-        # define flags
-        self.source_flag = '?'
-        self.uncertainty_flag = '0'
+    def __init__(self, buffer: bytearray | None = None, offset: int = 0, reset: bool = True) -> None:
+        """Initialize data record.
 
-        self.reset()  # fill record with "missing data" values
+        :param bytearray | None buffer: buffer holding the record, a new one if None
+        :param int offset: position of the record within the buffer
+        :param bool reset: fill record with "missing data" values, can be skipped if the buffer holds empty records
+        """
+
+        # initialize as data record
+        super().__init__(DATA_ELEMENTS_POS, DATA_RECORD_LEN, DATA_FIELDS, buffer, offset)
+
+        if reset:
+            self.reset()  # fill record with "missing data" values
 
     def reset(self) -> None:
         """Reset data record.
 
-        Fills record with "missing data" values, "unknown" source flag and "not applicable" uncertainty flag.
+        Fills record with "missing data" values, "unknown" source flag and "not applicable" uncertainty flag. The
+        datetime is kept, a record with oversized values gets back the fixed width.
         """
 
-        for key in self.format:
-            if key in ['year', 'month', 'day', 'hour']:
-                continue  # do not initialize time data
-
-            # create "missing data" entry
-            start_pos = self.format[key]['value'][0] - 1  # start...
-            end_pos = self.format[key]['value'][
-                1]  # ...and end of the position designated to the value of the element corresponding to the key
-            entry_len = end_pos - start_pos  # length of entry
-            missing_data_entry = '9' * entry_len
+        start_pos, end_pos = self.datetime_span
+        datetime_entry = self.data[start_pos:end_pos].encode('ascii')
 
-            # write entry into record - right-aligned and with leading zeros
-            self.data[start_pos:end_pos] = missing_data_entry
+        self.extended = None
+        self.buffer[self.offset:self.offset + self.line_len] = DATA_TEMPLATE
+        self.buffer[self.offset + start_pos:self.offset + end_pos] = datetime_entry
 
-            # set source flag
-            if 'source_flag' in self.format[key].keys():
-                self.data[self.format[key]['source_flag'] - 1] = self.source_flag
 
-            # set uncertainty flag
-            if 'uncertainty_flag' in self.format[key].keys():
-                self.data[self.format[key]['uncertainty_flag'] - 1] = self.uncertainty_flag
+DATA_TEMPLATE = get_data_template()
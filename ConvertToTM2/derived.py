@@ -0,0 +1,229 @@
+"""Derived tmy2 elements, computed from hourly OpenMeteo data over whole datasets with NumPy operations.
+
+Solar geometry follows the Fourier series of Spencer (1971), illuminances and zenith luminance the luminous efficacy
+model of Perez et al. (1990), "Modeling daylight availability and irradiance components from direct and global
+irradiance". Hourly values of the tmy2 format refer to the preceding hour, the sun is positioned at its middle.
+"""
+from __future__ import annotations
+
+from ConvertToTM2.tmy2format import OPENMETEO_MAPPING
+from OpenMeteoAPI.calendar_utils import get_dates, hours_of_year
+from OpenMeteoAPI.metrics import instrument
+
+import functools
+
+import numpy as np
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+SOLAR_CONSTANT = 1367  # [W/m²], as used for the tmy2 data set
+MIN_COS_ZENITH = 0.0175  # cosine of the zenith angle below which the sun is considered down (about 89°)
+
+# conversion factors from OpenMeteo units to the units of the tmy2 format
+UNIT_FACTORS = {'km/h': 1 / 3.6}
+
+# sky clearness bins and coefficients (a, b, c, d) of the luminous efficacy model per bin (Perez et al., 1990)
+CLEARNESS_BINS = np.array([1.065, 1.23, 1.5, 1.95, 2.8, 4.5, 6.2])
+GLOBAL_EFFICACY = np.array([
+    [96.63, -0.47, 11.50, -9.16],
+    [107.54, 0.79, 1.79, -1.19],
+    [98.73, 0.70, 4.40, -6.95],
+    [92.72, 0.56, 8.36, -8.31],
+    [86.73, 0.98, 7.10, -10.94],
+    [88.34, 1.39, 6.06, -7.60],
+    [78.63, 1.47, 4.93, -11.37],
+    [99.65, 1.86, -4.46, -3.15],
+])
+DIRECT_EFFICACY = np.array([
+    [57.20, -4.55, -2.98, 117.12],
+    [98.99, -3.46, -1.21, 12.38],
+    [109.83, -4.90, -1.71, -8.81],
+    [110.34, -5.84, -1.99, -4.56],
+    [106.36, -3.97, -1.75, -6.16],
+    [107.19, -1.25, -1.51, -26.73],
+    [105.75, 0.77, -1.26, -34.44],
+    [101.18, 1.58, -1.10, -8.29],
+])
+DIFFUSE_EFFICACY = np.array([
+    [97.24, -0.46, 12.00, -8.91],
+    [107.22, 1.15, 0.59, -3.95],
+    [104.97, 2.96, -5.53, -8.77],
+    [102.39, 5.59, -13.95, -13.90],
+    [100.71, 5.94, -22.75, -23.74],
+    [106.42, 3.83, -36.15, -28.83],
+    [141.88, 1.90, -53.24, -14.03],
+    [152.23, 0.35, -45.27, -7.98],
+])
+ZENITH_LUMINANCE = np.array([
+    [40.86, 26.77, -29.59, -45.75],
+    [26.58, 14.73, 58.46, -21.25],
+    [19.34, 2.28, 100.00, 0.25],
+    [13.25, -1.39, 124.79, 15.66],
+    [14.47, -5.09, 160.09, 9.13],
+    [19.76, -3.88, 154.61, -19.21],
+    [28.39, -9.67, 151.58, -69.39],
+    [42.91, -19.62, 130.80, -164.08],
+])
+
+
+@functools.lru_cache(maxsize=64)
+def get_solar_position(lat: float, long: float, time_zone: int, start: int, length: int) -> dict:
+    """Get solar geometry of consecutive hours at a site (cached, the arrays are read-only).
+
+    :param float lat: latitude in degrees
+    :param float long: longitude in degrees
+    :param int time_zone: time zone of the timestamps (UTC = 0, UTC+1 = 1, UTC-1 = -1 etc.)
+    :param int start: first timestamp, in hours since 1970-01-01 (local standard time)
+    :param int length: number of hours
+    :return: dict with
+        - cos_zenith - cosine of the solar zenith angle in the middle of the preceding hour
+        - zenith - solar zenith angle in radians
+        - et_dir_norm_rad - extraterrestrial direct normal radiation in W/m²
+    """
+
+    dates = np.arange(start, start + length).astype('datetime64[h]')
+    hours = hours_of_year(dates) - 0.5  # middle of the preceding hour
+    day_angle = 2 * np.pi / 365 * hours / 24
+
+    declination = (0.006918 - 0.399912 * np.cos(day_angle) + 0.070257 * np.sin(day_angle)
+                   - 0.006758 * np.cos(2 * day_angle) + 0.000907 * np.sin(2 * day_angle)
+                   - 0.002697 * np.cos(3 * day_angle) + 0.00148 * np.sin(3 * day_angle))
+    equation_of_time = 229.18 * (0.000075 + 0.001868 * np.cos(day_angle) - 0.032077 * np.sin(day_angle)
+                                 - 0.014615 * np.cos(2 * day_angle) - 0.040849 * np.sin(2 * day_angle))  # [min]
+
+    # apparent solar time, corrected from the meridian of the time zone to the longitude of the site
+    solar_time = hours % 24 + (4 * (long - 15 * time_zone) + equation_of_time) / 60
+    hour_angle = np.radians(15 * (solar_time - 12))
+
+    latitude = np.radians(lat)
+    cos_zenith = (np.sin(latitude) * np.sin(declination)
+                  + np.cos(latitude) * np.cos(declination) * np.cos(hour_angle))
+    cos_zenith = np.clip(cos_zenith, -1, 1)
+
+    position = {
+        'cos_zenith': cos_zenith,
+        'zenith': np.arccos(cos_zenith),
+        'et_dir_norm_rad': SOLAR_CONSTANT * (1.000110 + 0.034221 * np.cos(day_angle) + 0.001280 * np.sin(day_angle)
+                                             + 0.000719 * np.cos(2 * day_angle) + 0.000077 * np.sin(2 * day_angle)),
+    }
+    for values in position.values():
+        values.flags.writeable = False
+
+    return position
+
+
+def get_efficacy(coefficients: np.ndarray, bins: np.ndarray) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray):
+    """Get the coefficients of the luminous efficacy model for the sky clearness bin of every hour.
+
+    :param np.ndarray coefficients: coefficients (a, b, c, d) per bin, of shape (8, 4)
+    :param np.ndarray bins: sky clearness bin of every hour
+    :return: coefficients a, b, c and d as arrays
+    """
+
+    return tuple(coefficients[bins].T)
+
+
+def get_illuminance(ghi: np.ndarray, dni: np.ndarray, dhi: np.ndarray, dew_point: np.ndarray, zenith: np.ndarray,
+                    et_dir_norm_rad: np.ndarray) -> dict:
+    """Get illuminances and zenith luminance from radiation after the model of Perez et al. (1990).
+
+    :param np.ndarray ghi: global horizontal radiation in W/m²
+    :param np.ndarray dni: direct normal radiation in W/m²
+    :param np.ndarray dhi: diffuse horizontal radiation in W/m²
+    :param np.ndarray dew_point: dew point temperature in °C
+    :param np.ndarray zenith: solar zenith angle in radians
+    :param np.ndarray et_dir_norm_rad: extraterrestrial direct normal radiation in W/m²
+    :return: dict with global_hor_ill, dir_norm_illuminance and diff_hor_illuminance in lux and zenith_illuminance
+        (zenith luminance) in Cd/m², 0 while the sun is down or there is no diffuse radiation
+    """
+
+    cos_zenith = np.cos(zenith)
+    daylight = (cos_zenith > MIN_COS_ZENITH) & (dhi > 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # atmospheric precipitable water [cm], sky clearness and sky brightness
+        water = np.exp(0.07 * dew_point - 0.075)
+        clearness = ((dhi + dni) / dhi + 1.041 * zenith ** 3) / (1 + 1.041 * zenith ** 3)
+        air_mass = 1 / (cos_zenith + 0.50572 * np.maximum(96.07995 - np.degrees(zenith), 1e-3) ** -1.6364)
+        brightness = np.where(daylight, dhi * air_mass / et_dir_norm_rad, 1)
+        bins = np.searchsorted(CLEARNESS_BINS, np.where(daylight, clearness, 1), side='right')
+        log_brightness = np.log(brightness)
+
+        a, b, c, d = get_efficacy(GLOBAL_EFFICACY, bins)
+        global_ill = ghi * (a + b * water + c * cos_zenith + d * log_brightness)
+        a, b, c, d = get_efficacy(DIRECT_EFFICACY, bins)
+        direct_ill = dni * (a + b * water + c * np.exp(5.73 * zenith - 5) + d * brightness)
+        a, b, c, d = get_efficacy(DIFFUSE_EFFICACY, bins)
+        diffuse_ill = dhi * (a + b * water + c * cos_zenith + d * log_brightness)
+        a, b, c, d = get_efficacy(ZENITH_LUMINANCE, bins)
+        zenith_lum = dhi * (a + b * cos_zenith + c * np.exp(-3 * zenith) + d * brightness)
+
+    # NaN inputs stay missing
+    missing = np.isnan(ghi) | np.isnan(dhi) | np.isnan(dni) | np.isnan(dew_point)
+
+    return {key: np.where(missing, np.nan, np.where(daylight, np.maximum(values, 0), 0)) for key, values in {
+        'global_hor_ill': global_ill,
+        'dir_norm_illuminance': direct_ill,
+        'diff_hor_illuminance': diffuse_ill,
+        'zenith_illuminance': zenith_lum,
+    }.items()}
+
+
+@instrument('tmy2_derive', rows=lambda result, data, *args, **kwargs: len(data['date']))
+def derive_tm2_variables(data: DataFrame | dict, lat: float, long: float, time_zone: int) -> DataFrame | dict:
+    """Add the tmy2 elements which are derived from OpenMeteo data rather than mapped (see OPENMETEO_MAPPING).
+
+    Added columns are named after the tmy2 element (see DERIVED_ELEMENTS) and take precedence over the mapped OpenMeteo
+    variable when exporting:
+        - et_hor_rad, et_dir_norm_rad - extraterrestrial radiation, from solar geometry
+        - dir_norm_rad - direct normal radiation, from the direct (horizontal) radiation of OpenMeteo
+        - global_hor_rad - global horizontal radiation, GHI = DNI * cos(z) + DHI
+        - global_hor_ill, dir_norm_illuminance, diff_hor_illuminance, zenith_illuminance - from luminous efficacy
+        - opaque_sky_cover - total cloud cover, as there is no separate source
+        - mapped variables whose OpenMeteo unit differs from the tmy2 unit (wind speed in m/s)
+
+    :param DataFrame | dict data: weather data (see OpenMeteoClient.get_hourly_df or get_hourly_columns), with all
+        variables of OPENMETEO_MAPPING
+    :param float lat: latitude in degrees
+    :param float long: longitude in degrees
+    :param int time_zone: time zone (UTC = 0, UTC+1 = 1, UTC-1 = -1 etc.)
+    :return: weather data with the derived tmy2 elements as additional columns
+    """
+
+    dates = get_dates(data['date']).astype(np.int64)
+    if len(dates) == 0:
+        return data
+
+    # solar geometry of the whole span, also if hours are missing (e.g. without leap days)
+    position = get_solar_position(float(lat), float(long), int(time_zone), int(dates[0]), int(dates[-1] - dates[0]) + 1)
+    index = dates - dates[0]
+    cos_zenith = position['cos_zenith'][index]
+    zenith = position['zenith'][index]
+    et_dir_norm_rad = position['et_dir_norm_rad'][index]
+
+    dhi = np.asarray(data['diffuse_radiation'], dtype=np.float64)
+    direct = np.asarray(data['direct_radiation'], dtype=np.float64)
+    sun = cos_zenith > MIN_COS_ZENITH
+    dni = np.where(sun, np.clip(direct / np.maximum(cos_zenith, MIN_COS_ZENITH), 0, et_dir_norm_rad), 0)
+    dni[np.isnan(direct)] = np.nan
+    ghi = np.where(sun, dni * cos_zenith, direct) + dhi
+
+    columns = {
+        'et_hor_rad': et_dir_norm_rad * np.maximum(cos_zenith, 0),
+        'et_dir_norm_rad': np.where(sun, et_dir_norm_rad, 0),
+        'global_hor_rad': ghi,
+        'dir_norm_rad': dni,
+        'opaque_sky_cover': np.asarray(data['cloud_cover'], dtype=np.float64),
+    }
+    columns |= get_illuminance(ghi, dni, dhi, np.asarray(data['dew_point_2m'], dtype=np.float64), zenith,
+                               et_dir_norm_rad)
+    for _key, mapping in OPENMETEO_MAPPING.items():
+        if mapping['unit'] in UNIT_FACTORS:
+            columns[mapping['tm2_varname']] = np.asarray(data[_key], dtype=np.float64) * UNIT_FACTORS[mapping['unit']]
+
+    if isinstance(data, dict):
+        return data | columns
+    return data.assign(**columns)
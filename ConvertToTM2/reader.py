@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from ConvertToTM2.tmy2format import HEADER_ELEMENTS_POS, DATA_ELEMENTS_POS, OPENMETEO_MAPPING
+from OpenMeteoAPI.metrics import instrument
+
+import functools
+import re
+import numpy as np
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pandas is imported by read_tmy2 only, read_tmy2_columns does not need it
+    import pandas as pd
+
+DATA_RECORD_LEN = 142  # number of characters of a data record
+HEADER_MAX_LEN = 256  # maximum number of characters searched for the end of the header
+
+# latitude, longitude and elevation at the end of the header, e.g. "N 48 12 E 16 22    190"
+HEADER_LOCATION = re.compile(r'([NS]) *(-?\d+) +(-?\d+) +([EW]) *(-?\d+) +(-?\d+) +(-?\d+) *$')
+
+
+@functools.lru_cache(maxsize=1)
+def get_weights() -> (np.ndarray, np.ndarray):
+    """Get the matrix decoding all elements of a data record at once.
+
+    :return:
+        - weights - power of ten of every character position (columns) for the element it belongs to (rows)
+        - first - index of the first character of every element
+    """
+
+    weights = np.zeros((len(DATA_ELEMENTS_POS), DATA_RECORD_LEN + 1), dtype=np.float64)
+    first = np.zeros(len(DATA_ELEMENTS_POS), dtype=np.intp)
+    for index, element in enumerate(DATA_ELEMENTS_POS.values()):
+        start_pos, end_pos = element['value']  # positions start at 1, as the indices of a record after its line break
+        weights[index, start_pos:end_pos + 1] = 10. ** np.arange(end_pos - start_pos, -1, -1)
+        first[index] = start_pos
+
+    return weights, first
+
+
+def parse_coordinate(degrees: str, minutes: str, negative: bool) -> float:
+    """Parse latitude or longitude from the degrees and minutes fields of a tm2 header.
+
+    The sign is taken from the hemisphere letter (e.g. "W 074 00", as written by HeaderRecord), or from the fields if
+    either of them is negative (e.g. "W -74 00" or "W 00 -22", as written by earlier versions), but not from both.
+
+    :param str degrees: degrees field
+    :param str minutes: minutes field
+    :param bool negative: hemisphere letter is S or W
+    :return: coordinate in degrees
+    """
+
+    value = abs(int(degrees)) + abs(int(minutes)) / 60
+    if degrees.startswith('-') or minutes.startswith('-'):
+        return -value
+
+    return -value if negative else value
+
+
+def parse_header(line: str) -> dict:
+    """Parse the header record of a tm2 file.
+
+    Latitude, longitude and elevation are parsed from the end of the record rather than at fixed positions, so that
+    elevations of more than 3 digits (which extend the record) are read as well.
+
+    :param str line: header record
+    :return: dict with wban, city, state, lat, long, time_zone and elevation (arguments of export_from_openmeteo_df)
+    """
+
+    def field(key: str) -> str:
+        start_pos, end_pos = HEADER_ELEMENTS_POS[key]['value']
+        return line[start_pos - 1:end_pos]
+
+    location = HEADER_LOCATION.search(line)
+    if location is None:
+        raise ValueError(f'invalid tm2 header: {line!r}')
+    north, lat_deg, lat_min, east, long_deg, long_min, elevation = location.groups()
+
+    return {
+        'wban': field('wban').strip(),
+        'city': field('city').strip(),
+        'state': field('state').strip(),
+        'lat': parse_coordinate(lat_deg, lat_min, north == 'S'),
+        'long': parse_coordinate(long_deg, long_min, east == 'W'),
+        'time_zone': int(field('timezone')),
+        'elevation': int(elevation),
+    }
+
+
+def parse_records(buffer: np.ndarray) -> dict:
+    """Parse all data records of a tm2 file, one element at a time for all records.
+
+    :param np.ndarray buffer: ASCII codes of the data records, each preceded by a line break
+    :return: dict with tmy2 element as key and data as array (int16 for datetime elements, float32 otherwise)
+    """
+
+    if len(buffer) and buffer[-1] == ord('\n'):
+        buffer = buffer[:-1]  # trailing line break
+
+    # one row per record, the line break being at index 0 and the record positions (starting at 1) being indices
+    breaks = np.flatnonzero(buffer == ord('\n'))
+    lengths = np.diff(np.append(breaks, len(buffer))) - 1
+    if len(breaks) == 0 or breaks[0] != 0 or (lengths != DATA_RECORD_LEN).any():
+        invalid = np.flatnonzero(lengths != DATA_RECORD_LEN)
+        record = invalid[0] + 1 if len(invalid) else 1
+        raise ValueError(f'data record {record} is not {DATA_RECORD_LEN} characters long '
+                         f'(values exceeding their width or not a tm2 file)')
+    records = buffer.reshape(-1, DATA_RECORD_LEN + 1)
+
+    # all elements are decoded at once, as digits times their power of ten summed per element (one row per element)
+    weights, first = get_weights()
+    values = weights @ (records.astype(np.float64) - ord('0')).T
+
+    # a leading '-' is the sign: it was decoded as digit ord('-') - ord('0') = -3
+    leading = weights[np.arange(len(first)), first][:, np.newaxis]
+    negative = (records[:, first] == ord('-')).T
+    np.negative(values + 3 * leading, out=values, where=negative)
+
+    # "missing data" values (all 9s) become NaN
+    values[values == weights.sum(axis=1, keepdims=True) * 9] = np.nan
+
+    columns = {}
+    for index, (key, element) in enumerate(DATA_ELEMENTS_POS.items()):
+        if key in ['year', 'month', 'day', 'hour']:
+            columns[key] = values[index].astype(np.int16)
+        elif 'factor' in element:
+            columns[key] = (values[index] * element['factor']).astype(np.float32)
+        else:
+            columns[key] = values[index].astype(np.float32)
+
+    return columns
+
+
+@instrument('tmy2_read', rows=lambda result, *args, **kwargs: len(result[1]['hour']))
+def read_tmy2_columns(path: str) -> (dict, dict):
+    """Read a tm2 file into columns.
+
+    The file is memory-mapped and viewed as character block with one row per record, all elements of all records are
+    then decoded at once through fixed-width positions (see get_weights).
+
+    :param str path: path of the tm2 file
+    :return:
+        - header - location information (see parse_header)
+        - columns - dict with tmy2 element as key and data as array (see parse_records)
+    """
+
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    header = buffer[:HEADER_MAX_LEN].tobytes().split(b'\n')[0]
+    header_end = len(header)
+    header = parse_header(header.decode('ascii'))
+    columns = parse_records(buffer[header_end:])
+
+    return header, columns
+
+
+def read_tmy2(path: str) -> (dict, pd.DataFrame):
+    """Read a tm2 file into a DataFrame with OpenMeteo variables, as exported by export_from_openmeteo_df.
+
+    Years are stored with two digits, they are completed as by strptime: 69-99 as 1969-1999, 00-68 as 2000-2068.
+    Values are restored with the precision of the tm2 format (e.g. 0.1 °C), missing values are NaN.
+
+    :param str path: path of the tm2 file
+    :return:
+        - header - location information, can be passed on as keyword arguments of export_from_openmeteo_df
+        - df - weather data, with date column (local time, labelled as UTC) and OpenMeteo variables as columns
+    """
+
+    import pandas as pd
+
+    header, columns = read_tmy2_columns(path)
+    header = {key: header[key] for key in ['lat', 'long', 'time_zone', 'elevation']}
+
+    years = columns['year'].astype(np.int64)
+    years += np.where(years < 69, 2000, 1900)
+    months = (years - 1970).astype('datetime64[Y]').astype('datetime64[M]') + (columns['month'] - 1)
+    dates = months.astype('datetime64[h]') + ((columns['day'] - 1) * 24 + columns['hour']).astype(np.int64)
+
+    df = pd.DataFrame({'date': pd.DatetimeIndex(dates.astype('datetime64[ns]'), tz='UTC')})
+    for _key in OPENMETEO_MAPPING.keys():
+        df[_key] = columns[OPENMETEO_MAPPING[_key]['tm2_varname']]
+
+    return header, df
@@ -205,46 +205,64 @@ DATA_ELEMENTS_POS = {
     }
 }
 
-# Mapping between tmy2/OpenMeteo variable names
+# Mapping between tmy2/OpenMeteo variable names, with the aggregation of sub-hourly values into hourly values (see
+# OpenMeteoAPI.resample): mean or sum over the hour, or instantaneous value at the full hour
 OPENMETEO_MAPPING = {
     'temperature_2m': {
         'tm2_varname': 'dry_bulb_temp',
         'unit': '°C',
+        'aggregation': 'instant',
     },
     'relative_humidity_2m': {
         'tm2_varname': 'rel_hum',
-        'unit': '%'
+        'unit': '%',
+        'aggregation': 'instant',
     },
     'dew_point_2m': {
         'tm2_varname': 'dew_point_temp',
-        'unit': '°C'
+        'unit': '°C',
+        'aggregation': 'instant',
     },
     'rain': {
         'tm2_varname': 'precipitable_water',
-        'unit': 'mm'
+        'unit': 'mm',
+        'aggregation': 'sum',
     },
     'cloud_cover': {
         'tm2_varname': 'total_sky_cover',
-        'unit': '%'
+        'unit': '%',
+        'aggregation': 'instant',
     },
     'surface_pressure': {
         'tm2_varname': 'atmos_pressure',
-        'unit': 'hPa'
+        'unit': 'hPa',
+        'aggregation': 'instant',
     },
     'wind_speed_10m': {
         'tm2_varname': 'wind_speed',
-        'unit': 'km/h'
+        'unit': 'km/h',
+        'aggregation': 'instant',
     },
     'wind_direction_10m': {
         'tm2_varname': 'wind_dir',
-        'unit': '°'
+        'unit': '°',
+        'aggregation': 'instant',
     },
     'diffuse_radiation': {
         'tm2_varname': 'diff_hor_rad',
-        'unit': 'W/m²'
+        'unit': 'W/m²',
+        'aggregation': 'mean',
     },
     'direct_radiation': {
         'tm2_varname': 'dir_norm_rad',
-        'unit': 'W/m²'
+        'unit': 'W/m²',
+        'aggregation': 'mean',
     }
 }
+
+# tmy2 elements added by ConvertToTM2.derived.derive_tm2_variables, exported (in place of the mapped OpenMeteo variable,
+# if any) when present in the data
+DERIVED_ELEMENTS = [
+    'et_hor_rad', 'et_dir_norm_rad', 'global_hor_rad', 'dir_norm_rad', 'global_hor_ill', 'dir_norm_illuminance',
+    'diff_hor_illuminance', 'zenith_illuminance', 'opaque_sky_cover', 'wind_speed',
+]
@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import datetime
+import json
+import os
+
+import numpy as np
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+
+
+def merge_ranges(ranges: list) -> list[list[int]]:
+    """Merge overlapping or adjacent ranges.
+
+    :param list ranges: ranges as [start, end), e.g. in hours
+    :return: sorted, non-overlapping ranges
+    """
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+
+    return merged
+
+
+def subtract_ranges(start: int, end: int, covered: list) -> list[list[int]]:
+    """Get the parts of a range which are not covered by other ranges.
+
+    :param int start: start of the range (included)
+    :param int end: end of the range (excluded)
+    :param list covered: sorted, non-overlapping ranges as [start, end)
+    :return: missing ranges as [start, end)
+    """
+
+    missing = []
+    for covered_start, covered_end in covered:
+        if covered_end <= start or covered_start >= end:
+            continue
+        if covered_start > start:
+            missing.append([start, covered_start])
+        start = max(start, covered_end)
+    if start < end:
+        missing.append([start, end])
+
+    return missing
+
+
+def year_start_hour(year: int) -> int:
+    """Get the first hour of a year, in hours since 1970-01-01T00."""
+    return int(np.datetime64(f'{year:04d}-01-01T00', 'h').astype(np.int64))
+
+
+def hour_year(hour: int) -> int:
+    """Get the year of an hour, given in hours since 1970-01-01T00."""
+    return int(np.datetime64(hour, 'h').astype('datetime64[Y]').astype(np.int64)) + 1970
+
+
+def date_hour(date: datetime.date) -> int:
+    """Get the first hour of a date, in hours since 1970-01-01T00."""
+    return int(np.datetime64(date, 'h').astype(np.int64))
+
+
+class ArchivedResponse:
+    def __init__(self, meta: dict) -> None:
+        """Initialize location information of archived data.
+
+        Provides the location getters of an OpenMeteo API response (e.g. for tm2 export), without the data itself.
+
+        :param dict meta: location information as stored in the archive
+        """
+        self.meta = meta
+
+    def Latitude(self) -> float:
+        """Get latitude in degrees."""
+        return self.meta['latitude']
+
+    def Longitude(self) -> float:
+        """Get longitude in degrees."""
+        return self.meta['longitude']
+
+    def Elevation(self) -> float:
+        """Get elevation in meters."""
+        return self.meta['elevation']
+
+    def UtcOffsetSeconds(self) -> int:
+        """Get time difference to GMT+0 in seconds."""
+        return self.meta['utc_offset_seconds']
+
+    def Timezone(self) -> str:
+        """Get timezone name."""
+        return self.meta['timezone']
+
+    def TimezoneAbbreviation(self) -> str:
+        """Get timezone abbreviation."""
+        return self.meta['timezone_abbreviation']
+
+
+class LocalArchive:
+    def __init__(self, path: str = '.archive') -> None:
+        """Initialize local archive of hourly OpenMeteo data.
+
+        Data is stored as memory-mapped NumPy files, one float32 file per site, model, variable and year, holding one
+        value per hour of the year in local time (missing hours are NaN). For every site and model, the hour ranges
+        already covered are recorded per variable, so that only missing ranges have to be requested.
+
+        Directory structure: <path>/<latitude>_<longitude>/<model>/<variable>/<year>.npy, with the coverage and location
+        information stored as coverage.json and meta.json in the model directory.
+
+        :param str path: root directory of the archive
+        """
+        self.path = path
+
+    @staticmethod
+    def get_variables(params: dict) -> list[str]:
+        """Get the list of hourly variables of the request parameters."""
+
+        variables = params['hourly']
+        return variables.split(',') if isinstance(variables, str) else list(variables)
+
+    def get_directory(self, params: dict) -> str:
+        """Get the archive directory of a site and model.
+
+        :param dict params: parameters (see OpenMeteo API doc), with a single model as string or list
+        :return: directory path
+        """
+
+        models = params.get('models', 'best_match')
+        model = models if isinstance(models, str) else ','.join(models)
+        if ',' in model:
+            raise ValueError('the archive expects a single model, archive the models of a request one by one')
+
+        site = f"{float(params['latitude']):.4f}_{float(params['longitude']):.4f}"
+        return os.path.join(self.path, site, model)
+
+    def read_json(self, params: dict, name: str) -> dict:
+        """Read a json file of the archive directory of a site and model, empty dict if the file does not exist."""
+
+        path = os.path.join(self.get_directory(params), name)
+        if not os.path.isfile(path):
+            return {}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def write_json(self, params: dict, name: str, content: dict) -> None:
+        """Write a json file into the archive directory of a site and model."""
+
+        directory = self.get_directory(params)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, name + '.tmp'), 'w') as f:
+            json.dump(content, f)
+        os.replace(os.path.join(directory, name + '.tmp'), os.path.join(directory, name))
+
+    def get_coverage(self, params: dict) -> dict:
+        """Get hour ranges covered by the archive.
+
+        :param dict params: parameters (see OpenMeteo API doc)
+        :return: ranges as [start, end) in hours since 1970-01-01T00 (local time), with variable as key
+        """
+
+        return self.read_json(params, 'coverage.json')
+
+    def get_response(self, params: dict) -> ArchivedResponse:
+        """Get location information of archived data.
+
+        :param dict params: parameters (see OpenMeteo API doc)
+        :return: location information, with the getters of an OpenMeteo API response
+        """
+
+        meta = self.read_json(params, 'meta.json')
+        if not meta:
+            raise KeyError(f'no archived data found in {self.get_directory(params)}')
+        return ArchivedResponse(meta)
+
+    def get_missing_dates(self, params: dict, start_date: datetime.date, end_date: datetime.date
+                          ) -> list[tuple[datetime.date, datetime.date]]:
+        """Get date ranges not yet covered by the archive, for any of the requested variables.
+
+        :param dict params: parameters (see OpenMeteo API doc)
+        :param datetime.date start_date: first date of the requested period
+        :param datetime.date end_date: last date of the requested period (included)
+        :return: missing date ranges as (first date, last date)
+        """
+
+        coverage = self.get_coverage(params)
+        start, end = date_hour(start_date), date_hour(end_date) + 24
+
+        missing = []
+        for variable in self.get_variables(params):
+            missing += subtract_ranges(start, end, coverage.get(variable, []))
+
+        # the API is queried by date, extend missing hours to whole days
+        missing = merge_ranges([[_start // 24 * 24, -(-_end // 24) * 24] for _start, _end in missing])
+
+        epoch = datetime.date(1970, 1, 1)
+        return [(epoch + datetime.timedelta(days=_start // 24), epoch + datetime.timedelta(days=_end // 24 - 1))
+                for _start, _end in missing]
+
+    def get_year_file(self, params: dict, variable: str, year: int, mode: str = 'r') -> np.memmap | None:
+        """Open the file of a variable and year as memory-mapped array.
+
+        :param dict params: parameters (see OpenMeteo API doc)
+        :param str variable: name of the variable
+        :param int year: year
+        :param str mode: "r" for reading (None if the file does not exist), "r+" for writing (created if need be)
+        :return: hourly values of the year
+        """
+
+        directory = os.path.join(self.get_directory(params), variable)
+        path = os.path.join(directory, f'{year}.npy')
+
+        if not os.path.isfile(path):
+            if mode == 'r':
+                return None
+            os.makedirs(directory, exist_ok=True)
+            hours = year_start_hour(year + 1) - year_start_hour(year)
+            values = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(hours,))
+            values[:] = np.nan
+            return values
+
+        return np.load(path, mmap_mode=mode)
+
+    def write_values(self, params: dict, variable: str, start: int, values: np.ndarray) -> None:
+        """Write hourly values of a variable into the archive.
+
+        :param dict params: parameters (see OpenMeteo API doc)
+        :param str variable: name of the variable
+        :param int start: first hour of the values, in hours since 1970-01-01T00 (local time)
+        :param np.ndarray values: hourly values
+        """
+
+        end = start + len(values)
+        for year in range(hour_year(start), hour_year(end - 1) + 1):
+            offset = year_start_hour(year)
+            _start, _end = max(start, offset), min(end, year_start_hour(year + 1))
+            year_values = self.get_year_file(params, variable, year, mode='r+')
+            year_values[_start - offset:_end - offset] = values[_start - start:_end - start]
+            year_values.flush()
+
+    def read_values(self, params: dict, variable: str, start: int, end: int) -> np.ndarray:
+        """Read hourly values of a variable from the archive.
+
+        :param dict params: parameters (see OpenMeteo API doc)
+        :param str variable: name of the variable
+        :param int start: first hour, in hours since 1970-01-01T00 (local time)
+        :param int end: hour after the last hour
+        :return: hourly values, NaN where no data is archived
+        """
+
+        values = np.full(end - start, np.nan, dtype=np.float32)
+        for year in range(hour_year(start), hour_year(end - 1) + 1):
+            year_values = self.get_year_file(params, variable, year)
+            if year_values is None:
+                continue
+            offset = year_start_hour(year)
+            _start, _end = max(start, offset), min(end, year_start_hour(year + 1))
+            values[_start - start:_end - start] = year_values[_start - offset:_end - offset]
+
+        return values
+
+    def write_response(self, params: dict, response: WeatherApiResponse, final_date: datetime.date | None = None
+                       ) -> None:
+        """Write hourly data of an OpenMeteo API response into the archive and update its coverage.
+
+        The whole period of the response is marked as covered, also hours without data (archived as NaN), so that they
+        are not requested again. Only trailing hours without any data from final_date on (e.g. not yet available due to
+        the delay of the historical weather API) are not marked as covered, so that they are requested again later.
+
+        :param dict params: parameters of the request (see OpenMeteo API doc)
+        :param response: response from OpenMeteo API
+        :param datetime.date | None final_date: first date whose data may still be published later, None if all data
+            of the response is final
+        """
+
+        meta = self.read_json(params, 'meta.json')
+        if meta and meta['utc_offset_seconds'] != response.UtcOffsetSeconds():
+            raise ValueError(f'UTC offset {response.UtcOffsetSeconds()} s of response does not match '
+                             f'{meta["utc_offset_seconds"]} s of archived data in {self.get_directory(params)}')
+
+        hourly = response.Hourly()
+        start = (hourly.Time() + response.UtcOffsetSeconds()) // 3600
+        end = (hourly.TimeEnd() + response.UtcOffsetSeconds()) // 3600
+        last = start  # hour after the last hour with data
+
+        for index, variable in enumerate(self.get_variables(params)):
+            values = hourly.Variables(index).ValuesAsNumpy()
+            self.write_values(params, variable, start, values)
+
+            valid = np.flatnonzero(~np.isnan(values))
+            if len(valid):
+                last = max(last, start + int(valid[-1]) + 1)
+
+        if final_date is not None:
+            end = max(min(end, date_hour(final_date)), last)
+
+        # update coverage of all variables
+        coverage = self.get_coverage(params)
+        if end > start:
+            for variable in self.get_variables(params):
+                coverage[variable] = merge_ranges(coverage.get(variable, []) + [[start, end]])
+        self.write_json(params, 'coverage.json', coverage)
+
+        self.write_json(params, 'meta.json', {
+            'latitude': response.Latitude(),
+            'longitude': response.Longitude(),
+            'elevation': response.Elevation(),
+            'utc_offset_seconds': response.UtcOffsetSeconds(),
+            'timezone': response.Timezone().decode() if response.Timezone() else None,
+            'timezone_abbreviation':
+                response.TimezoneAbbreviation().decode() if response.TimezoneAbbreviation() else None,
+        })
+
+    def get_hourly_columns(self, params: dict, start_date: datetime.date, end_date: datetime.date) -> dict:
+        """Get hourly values of a period from the archive, without pandas.
+
+        :param dict params: parameters (see OpenMeteo API doc)
+        :param datetime.date start_date: first date of the period
+        :param datetime.date end_date: last date of the period (included)
+        :return: hourly data, in the format of OpenMeteoClient.get_hourly_columns
+        """
+
+        start, end = date_hour(start_date), date_hour(end_date) + 24
+
+        hourly_data = {'date': np.arange(start, end).astype('datetime64[h]').astype('datetime64[s]')}
+        for variable in self.get_variables(params):
+            hourly_data[variable] = self.read_values(params, variable, start, end)
+
+        return hourly_data
+
+    def get_hourly_df(self, params: dict, start_date: datetime.date, end_date: datetime.date) -> pd.DataFrame:
+        """Get hourly values of a period from the archive.
+
+        :param dict params: parameters (see OpenMeteo API doc)
+        :param datetime.date start_date: first date of the period
+        :param datetime.date end_date: last date of the period (included)
+        :return: hourly data, in the format of OpenMeteoClient.get_hourly_df
+        """
+
+        import pandas as pd
+
+        hourly_data = self.get_hourly_columns(params, start_date, end_date)
+        hourly_data['date'] = pd.DatetimeIndex(hourly_data['date'].astype('datetime64[ns]'), tz='UTC')
+
+        return pd.DataFrame(hourly_data)
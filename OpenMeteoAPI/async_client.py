@@ -0,0 +1,246 @@
+"""Asynchronous OpenMeteo API client, for use within an asyncio event loop.
+
+Example:
+
+    async with AsyncOpenMeteoClient(max_concurrency=64) as client:
+        responses = await asyncio.gather(*[
+            client.request_historical_data(params | {'latitude': lat, 'longitude': lon}, 2023)
+            for lat, lon in sites.values()])
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+
+import aiohttp
+
+from OpenMeteoAPI.cache_policy import ARCHIVE_LAG, DO_NOT_CACHE, CachePolicy
+from OpenMeteoAPI.metrics import increment, observe, SINKS
+from OpenMeteoAPI.openmeteo_api import OpenMeteoClient, URL_forecast, URL_historical
+from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+from openmeteo_requests.Client import OpenMeteoRequestsError
+
+STATUS_TO_RETRY = (500, 502, 504)  # as retry_requests
+
+
+class AsyncSQLiteCache:
+    def __init__(self, cache_name: str = '.cache_async', expire_after: int = 3600) -> None:
+        """Initialize cache of raw responses in an SQLite database.
+
+        Database access runs in a worker thread (asyncio.to_thread), so that the event loop is not blocked.
+
+        :param str cache_name: path of the cache database (".sqlite" is appended)
+        :param int expire_after: time after which cached responses expire, in seconds (never if negative)
+        """
+        self.expire_after = expire_after
+        self.connection = sqlite3.connect(cache_name + '.sqlite', check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, expires REAL, content BLOB)')
+        self.lock = asyncio.Lock()
+
+    @staticmethod
+    def get_key(method: str, url: str, params: list[tuple[str, str]]) -> str:
+        """Get the cache key of a request."""
+        return hashlib.sha256(repr((method, url, sorted(params))).encode()).hexdigest()
+
+    def _get(self, key: str) -> bytes | None:
+        row = self.connection.execute('SELECT expires, content FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[0] is not None and row[0] < time.time()):
+            return None
+        return row[1]
+
+    def _set(self, key: str, content: bytes, expire_after: int) -> None:
+        expires = time.time() + expire_after if expire_after >= 0 else None
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?)', (key, expires, content))
+
+    async def get(self, key: str) -> bytes | None:
+        """Get a cached response, None if not cached or expired."""
+
+        async with self.lock:
+            return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, content: bytes, expire_after: int | None = None) -> None:
+        """Cache a response, expiring after expire_after seconds (never if negative, the default of the cache if None,
+        not cached if DO_NOT_CACHE)."""
+
+        expire_after = self.expire_after if expire_after is None else expire_after
+        if expire_after == DO_NOT_CACHE:
+            return
+
+        async with self.lock:
+            await asyncio.to_thread(self._set, key, content, expire_after)
+
+    def close(self) -> None:
+        """Close the database."""
+        self.connection.close()
+
+
+class AsyncOpenMeteoClient:
+    """Asynchronous OpenMeteo API Client."""
+
+    def __init__(self, cache_name: str = '.cache_async', expire_after: int = 3600, url_forecast: str = URL_forecast,
+                 url_historical: str = URL_historical, max_concurrency: int = 100, retries: int = 5,
+                 backoff_factor: float = 0.2, cache: AsyncSQLiteCache | None = None, archive_lag: int = ARCHIVE_LAG):
+        """Set up the asynchronous Open-Meteo API client with cache, retry on error and concurrency limit.
+
+        Requests share a keep-alive connection pool of max_concurrency connections, further requests wait until a
+        connection is free. Failing requests are retried as by OpenMeteoClient (see retry_requests): on connection
+        errors and status 500, 502 or 504, after backoff_factor * 2 ** (n - 1) seconds for the n-th consecutive retry
+        (the first one being immediate).
+
+        The session is created on first use, the client has to be closed (or used as async context manager). Cached
+        responses expire according to a CachePolicy, as those of OpenMeteoClient.
+
+        :param str cache_name: path of the cache database
+        :param int expire_after: time after which cached responses expire, in seconds (see CachePolicy)
+        :param str url_forecast: URL of the forecast API
+        :param str url_historical: URL of the historical weather API
+        :param int max_concurrency: maximum number of requests in flight
+        :param int retries: maximum number of retries per request
+        :param float backoff_factor: backoff factor between retries, in seconds
+        :param AsyncSQLiteCache | None cache: cache of responses, created from cache_name and expire_after if None
+        :param int archive_lag: delay after which historical data is final, in days
+        """
+        self.cache = cache or AsyncSQLiteCache(cache_name, expire_after=expire_after)
+        self.policy = CachePolicy(url_forecast, url_historical, expire_after=expire_after, archive_lag=archive_lag)
+        self.url_forecast = url_forecast
+        self.url_historical = url_historical
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.session = None
+
+    async def __aenter__(self) -> 'AsyncOpenMeteoClient':
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Get the HTTP session, creating it with its connection pool if need be."""
+
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=30)
+            self.session = aiohttp.ClientSession(connector=connector, raise_for_status=False)
+        return self.session
+
+    async def close(self) -> None:
+        """Close the HTTP session and the cache."""
+
+        if self.session is not None:
+            await self.session.close()
+        self.cache.close()
+
+    @staticmethod
+    def get_query(params: dict) -> list[tuple[str, str]]:
+        """Get query parameters as (name, value) pairs, lists being joined by commas."""
+
+        query = []
+        for name, value in (params | {'format': 'flatbuffers'}).items():
+            if isinstance(value, (list, tuple)):
+                value = ','.join(str(_value) for _value in value)
+            query.append((name, str(value)))
+        return query
+
+    @staticmethod
+    def decode(data: bytes) -> list[WeatherApiResponse]:
+        """Decode raw data into OpenMeteo API responses, one per location (see openmeteo_requests.Client)."""
+
+        messages = []
+        total = len(data)
+        pos = 0
+        while pos < total:
+            length = int.from_bytes(data[pos:pos + 4], byteorder='little')
+            messages.append(WeatherApiResponse.GetRootAs(data, pos + 4))
+            pos += length + 4
+        return messages
+
+    async def fetch(self, url: str, query: list[tuple[str, str]], method: str = 'GET') -> bytes:
+        """Send request with retry on error.
+
+        :param str url: API URL
+        :param list query: query parameters as (name, value) pairs
+        :param str method: HTTP method
+        :return: raw response data
+        """
+
+        session = self.get_session()
+        for attempt in range(self.retries + 1):
+            if attempt > 1:
+                await asyncio.sleep(self.backoff_factor * 2 ** (attempt - 1))
+            try:
+                async with self.semaphore:
+                    if method.upper() == 'POST':
+                        request = session.post(url, data=query)
+                    else:
+                        request = session.get(url, params=query)
+                    async with request as response:
+                        status = response.status
+                        content = await response.read()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+                continue
+
+            if status in (400, 429):
+                raise OpenMeteoRequestsError(json.loads(content))  # as openmeteo_requests.Client
+            if status in STATUS_TO_RETRY and attempt < self.retries:
+                continue
+            if status >= 400:
+                raise aiohttp.ClientResponseError(response.request_info, response.history, status=status,
+                                                  message=content.decode(errors='replace'))
+            if attempt:
+                increment('openmeteo_http_retries_total', attempt)
+            return content
+
+    async def weather_api(self, url: str, params: dict, method: str = 'GET') -> list[WeatherApiResponse]:
+        """Send request to OpenMeteo API, cached, and decode the responses (instrumented, see OpenMeteoAPI.metrics).
+
+        :param str url: API URL
+        :param dict params: parameters (see OpenMeteo API doc)
+        :param str method: HTTP method
+        :return: OpenMeteo API responses, one per location
+        """
+
+        start = time.perf_counter()
+        params, order = OpenMeteoClient.sort_hourly(params)  # same cache entry for any order of the variables
+        query = self.get_query(params)
+        key = self.cache.get_key(method.upper(), url, query)
+
+        content = await self.cache.get(key)
+        cache = 'hit' if content is not None else 'miss'
+        if content is None:
+            content = await self.fetch(url, query, method=method)
+            await self.cache.set(key, content, self.policy.get_expire_after(url, params))
+
+        if SINKS:
+            increment('openmeteo_http_requests_total', cache=cache)
+            increment('openmeteo_http_bytes_total', len(content), cache=cache)
+            observe('openmeteo_stage_seconds', time.perf_counter() - start, stage='request')
+
+        responses = self.decode(content)
+        return OpenMeteoClient.reorder_hourly(responses, order) if order else responses
+
+    async def request_historical_data(self, params: dict, year: int) -> WeatherApiResponse:
+        """Send request for historical data of a given year to OpenMeteo API.
+
+        :param dict params: parameters (see OpenMeteo API doc)
+        :param int year: year of requested historical dataset
+        :return: OpenMeteo API response
+        """
+
+        responses = await self.weather_api(self.url_historical, OpenMeteoClient.get_historical_params(params, year))
+        return responses[0]
+
+    async def request_forecast_data(self, params: dict) -> WeatherApiResponse:
+        """Send request for forecast data to OpenMeteo API.
+
+        :param dict params: parameters (see OpenMeteo API doc)
+        :return: OpenMeteo API response
+        """
+
+        responses = await self.weather_api(self.url_forecast, params)
+        return responses[0]
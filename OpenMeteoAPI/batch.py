@@ -0,0 +1,402 @@
+"""Batch export of historical and forecast data described by a job manifest.
+
+The manifest is a JSON file with the sites, the jobs and the defaults of all jobs, e.g.:
+
+    {
+        "sites": {"vienna": [48.2085, 16.3721]},
+        "variables": ["temperature_2m", "relative_humidity_2m"],
+        "formats": ["tm2", "csv"],
+        "archive": "../data/archive",
+        "jobs": [
+            {"type": "historical", "sites": ["vienna"], "models": ["ecmwf_ifs"], "start_date": "2022-01-01",
+             "end_date": "today", "output": "../data/historical{period}"},
+            {"type": "forecast", "sites": ["vienna"], "models": ["icon_eu"], "forecast_days": 16, "past_days": 1,
+             "output": "../data/{period}"}
+        ]
+    }
+
+Every job is expanded into units, one per site, model and period: a calendar year for historical data, "forecast" and
+"past_days" for forecast data. The output path of a unit is given by the "output" template of its job ("{site}",
+"{model}" and "{period}" are replaced), without file extension. Run from the directory the paths refer to:
+
+    python -m OpenMeteoAPI.batch manifest.json [--workers 8] [--restart]
+
+Exported historical units are recorded in a checkpoint file and skipped by later runs. Forecast units change with every
+model run, they are exported on every run, as is the whole manifest with --restart.
+
+The client, pandas and the exporters are only imported once there are units to export, so that runs with nothing left
+to do start quickly. Units exported as tm2 only are converted from NumPy arrays, without pandas.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from ConvertToTM2.tmy2format import OPENMETEO_MAPPING
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+    from OpenMeteoAPI.archive import LocalArchive
+    from OpenMeteoAPI.openmeteo_api import OpenMeteoClient
+
+# defaults of the manifest and of its jobs
+DEFAULTS = {
+    'variables': list(OPENMETEO_MAPPING.keys()),
+    'formats': ['tm2', 'csv'],
+    'timezone': 'auto',
+    'models': ['best_match'],
+    'output': '{site}_{model}_{period}',
+    'leap_days': False,
+    'archive': '.archive',
+    'cache': '.cache',
+    'workers': 4,
+    'request_workers': 2,
+    'checkpoint': None,
+}
+JOB_DEFAULTS = ['variables', 'formats', 'timezone', 'models', 'output', 'leap_days']  # can be overridden per job
+
+
+def load_manifest(path: str) -> dict:
+    """Load a job manifest, with the defaults of DEFAULTS.
+
+    :param str path: path of the JSON manifest
+    :return: manifest, with the checkpoint path ("<manifest>.checkpoint" unless given) added
+    """
+
+    with open(path, 'r') as f:
+        manifest = DEFAULTS | {'checkpoint': path + '.checkpoint'} | json.load(f)
+
+    return manifest
+
+
+def parse_date(value: str) -> datetime.date:
+    """Parse a date of the manifest, given in ISO format or as "today"."""
+    return datetime.date.today() if value == 'today' else datetime.date.fromisoformat(value)
+
+
+def get_fetched_variables(unit: dict) -> list[str]:
+    """Get the variables to fetch for a unit: its variables, and all variables of the tm2 format if it is exported."""
+
+    if 'tm2' not in unit['formats']:
+        return unit['variables']
+    return unit['variables'] + [_var for _var in OPENMETEO_MAPPING if _var not in unit['variables']]
+
+
+def is_tm2_only(units: list[dict]) -> bool:
+    """Check if units are only exported as tm2 files, so that their data can be handled without pandas."""
+    return all(set(unit['formats']) == {'tm2'} for unit in units)
+
+
+def get_unit_id(unit: dict) -> str:
+    """Get the checkpoint id of a unit, changing with anything that changes its output."""
+
+    content = [unit['type'], unit['site'], unit['model'], unit['period'], str(unit.get('start_date')),
+               str(unit.get('end_date')), unit.get('days'), unit['variables'], sorted(unit['formats']), unit['path'],
+               unit['leap_days']]
+    return hashlib.sha1(json.dumps(content).encode()).hexdigest()
+
+
+def plan_tasks(manifest: dict) -> list[dict]:
+    """Expand the jobs of a manifest into tasks, removing duplicate work.
+
+    Units of the same site (by coordinates), model, period and output path are merged into one unit exporting the union
+    of their variables, formats and dates. Units of the same site and model are grouped into one task, so that the data
+    is fetched once for all of them (and, for historical data, the archive of a site and model is only written by one
+    task at a time).
+
+    :param dict manifest: job manifest (see load_manifest)
+    :return: tasks, with type, request parameters, period to fetch and units to export
+    """
+
+    manifest = DEFAULTS | manifest
+    units = {}
+    for job in manifest['jobs']:
+        job = {key: manifest[key] for key in JOB_DEFAULTS} | job
+        for site in job['sites']:
+            latitude, longitude = manifest['sites'][site]
+            location = f'{float(latitude):.4f}_{float(longitude):.4f}'
+            for model in job['models']:
+                if job['type'] == 'historical':
+                    start_date = parse_date(job['start_date'])
+                    end_date = min(parse_date(job.get('end_date', 'today')), datetime.date.today())
+                    periods = [(str(year), max(start_date, datetime.date(year, 1, 1)),
+                                min(end_date, datetime.date(year, 12, 31)))
+                               for year in range(start_date.year, end_date.year + 1)]
+                elif job['type'] == 'forecast':
+                    # number of days instead of first and last date
+                    periods = [('forecast', job.get('forecast_days', 7), None)]
+                    if job.get('past_days', 0):
+                        periods.append(('past_days', job['past_days'], None))
+                else:
+                    raise ValueError(f"unknown job type {job['type']!r}, expected 'historical' or 'forecast'")
+
+                for period, first, last in periods:
+                    path = job['output'].format(site=site, model=model, period=period)
+                    key = (job['type'], location, model, period, path)
+                    unit = units.setdefault(key, {
+                        'type': job['type'], 'site': site, 'location': (latitude, longitude), 'model': model,
+                        'timezone': job['timezone'], 'period': period, 'path': path, 'variables': [], 'formats': [],
+                        'leap_days': job['leap_days']})
+                    unit['variables'] += [_var for _var in job['variables'] if _var not in unit['variables']]
+                    unit['formats'] += [_format for _format in job['formats'] if _format not in unit['formats']]
+                    if job['type'] == 'historical':
+                        unit['start_date'] = min(unit.get('start_date', first), first)
+                        unit['end_date'] = max(unit.get('end_date', last), last)
+                    else:
+                        unit['days'] = max(unit.get('days', 0), first)
+
+    tasks = {}
+    for (kind, location, model, _, _), unit in units.items():
+        unit['id'] = get_unit_id(unit)
+        task = tasks.setdefault((kind, location, model, unit['timezone']), {
+            'type': kind, 'params': {'latitude': unit['location'][0], 'longitude': unit['location'][1],
+                                     'models': model, 'timezone': unit['timezone'], 'hourly': []},
+            'units': []})
+        hourly = task['params']['hourly']
+        hourly += [_var for _var in get_fetched_variables(unit) if _var not in hourly]
+        task['units'].append(unit)
+
+    return list(tasks.values())
+
+
+def read_checkpoint(path: str) -> set:
+    """Read the ids of the units completed by previous runs (an incomplete last line, e.g. after a crash, is ignored).
+
+    :param str path: path of the checkpoint file
+    :return: ids of completed units
+    """
+
+    if not os.path.isfile(path):
+        return set()
+
+    done = set()
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)['id'])
+            except (ValueError, KeyError):
+                continue
+
+    return done
+
+
+def export_unit(unit: dict, df: DataFrame | dict, response) -> None:
+    """Export the data of a unit in all its formats.
+
+    Every file is written under a temporary name and then renamed, so that readers never see a partially written file
+    (the rename replaces an existing file atomically).
+
+    :param dict unit: unit (see plan_tasks)
+    :param DataFrame | dict df: hourly data of the unit, with its fetched variables (see get_fetched_variables), as
+        dict of arrays for units exported as tm2 only (see is_tm2_only)
+    :param response: response from OpenMeteo API or archived location information, for the tm2 export
+    """
+
+    from OpenMeteoAPI.export import WRITERS, export_tm2
+
+    directory, name = os.path.split(unit['path'])
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    for _format in unit['formats']:
+        path = unit['path'] + '.' + _format
+        tmp_path = os.path.join(directory, f'.{name}.{_format}.tmp')
+        if _format == 'tm2':
+            export_tm2(df, response, tmp_path)
+        else:
+            WRITERS[_format](df[['date'] + unit['variables']], unit['variables'], tmp_path)
+        os.replace(tmp_path, path)
+
+
+def get_forecast_days(task: dict) -> (int, int):
+    """Get the number of days to request for a forecast task.
+
+    The days of all units are requested, also of the completed ones, so that the response does not depend on them.
+
+    :param dict task: forecast task (see plan_tasks)
+    :return:
+        - forecast_days - number of forecast days
+        - past_days - number of past days
+    """
+
+    forecast_days = max([unit['days'] for unit in task['units'] if unit['period'] == 'forecast'], default=0)
+    past_days = max([unit['days'] for unit in task['units'] if unit['period'] == 'past_days'], default=0)
+
+    return forecast_days, past_days
+
+
+def get_forecast_unit_df(unit: dict, df: DataFrame | dict, past_days: int) -> DataFrame | dict:
+    """Get the data of a forecast unit, from the hourly data of its task (the past days followed by the forecast days).
+
+    :param dict unit: forecast unit (see plan_tasks)
+    :param DataFrame | dict df: hourly data of the task, as DataFrame or dict of arrays
+    :param int past_days: number of past days of the task
+    :return: hourly data of the last past days or of the first forecast days of the unit, with its fetched variables
+    """
+
+    if unit['period'] == 'past_days':
+        rows = slice((past_days - unit['days']) * 24, past_days * 24)
+    else:
+        rows = slice(past_days * 24, (past_days + unit['days']) * 24)
+    if isinstance(df, dict):
+        return {key: df[key][rows] for key in ['date'] + get_fetched_variables(unit)}
+    return df.iloc[rows][['date'] + get_fetched_variables(unit)].reset_index(drop=True)
+
+
+def run_task(task: dict, client: OpenMeteoClient, archive: LocalArchive, request_workers: int, done: set,
+             complete) -> None:
+    """Fetch the data of a task and export its units which are not completed yet.
+
+    Historical data is fetched into the local archive (only the dates missing in the archive are requested), forecast
+    data with one request for all units. If all units are exported as tm2 only, the data is kept as NumPy arrays.
+
+    :param dict task: task (see plan_tasks)
+    :param OpenMeteoClient client: OpenMeteo API client
+    :param LocalArchive archive: local archive of historical data
+    :param int request_workers: maximum number of concurrent requests of the task
+    :param set done: ids of completed units
+    :param complete: called with unit and number of rows after every exported unit
+    """
+
+    from OpenMeteoAPI.calendar_utils import drop_leap_days
+    from OpenMeteoAPI.openmeteo_api import OpenMeteoClient
+
+    units = [unit for unit in task['units'] if unit['id'] not in done]
+    if not units:
+        return
+    params = task['params']
+    columns = is_tm2_only(units)
+
+    if task['type'] == 'historical':
+        start_date = min(unit['start_date'] for unit in units)
+        end_date = max(unit['end_date'] for unit in units)
+        client.update_archive(params, start_date, end_date, archive, max_workers=request_workers)
+        response = archive.get_response(params)
+
+        get_hourly = archive.get_hourly_columns if columns else archive.get_hourly_df
+        for unit in units:
+            df = get_hourly(params | {'hourly': get_fetched_variables(unit)}, unit['start_date'], unit['end_date'])
+            if not unit['leap_days']:
+                df = drop_leap_days(df)
+            export_unit(unit, df, response)
+            complete(unit, len(df['date']))
+
+    else:
+        forecast_days, past_days = get_forecast_days(task)
+        response = client.request_forecast_data(params | {'forecast_days': forecast_days, 'past_days': past_days})
+        get_hourly = OpenMeteoClient.get_hourly_columns if columns else OpenMeteoClient.get_hourly_df
+        df = get_hourly(response, params['hourly'])
+
+        for unit in units:
+            unit_df = get_forecast_unit_df(unit, df, past_days)
+            export_unit(unit, unit_df, response)
+            complete(unit, len(unit_df['date']))
+
+
+def run_manifest(manifest: dict, client: OpenMeteoClient | None = None, restart: bool = False) -> dict:
+    """Run all jobs of a manifest, resuming from its checkpoint.
+
+    Tasks (see plan_tasks) run concurrently on manifest["workers"] threads, each sending at most
+    manifest["request_workers"] concurrent requests. Every exported historical unit is appended to the checkpoint file,
+    so that an interrupted run continues with the units not exported yet. Forecast units are never checkpointed, they
+    are exported on every run. Failing tasks do not stop the run, they are reported with their error in the
+    statistics.
+
+    :param dict manifest: job manifest (see load_manifest), without checkpoint if manifest["checkpoint"] is None
+    :param OpenMeteoClient | None client: OpenMeteo API client, a new one with the cache of the manifest if None
+    :param bool restart: ignore and overwrite the checkpoint, exporting all units again
+    :return: number of tasks, exported and skipped units, exported rows, failed tasks with their error and run time
+    """
+
+    manifest = DEFAULTS | manifest
+    tasks = plan_tasks(manifest)
+
+    checkpoint = manifest['checkpoint']
+    done = set() if restart or checkpoint is None else read_checkpoint(checkpoint)
+    done &= {unit['id'] for task in tasks for unit in task['units'] if unit['type'] == 'historical'}
+    lock = threading.Lock()
+    stats = {'tasks': len(tasks), 'units': 0, 'rows': 0,
+             'skipped': sum(unit['id'] in done for task in tasks for unit in task['units']), 'failed': []}
+
+    start = time.perf_counter()
+    tasks = [task for task in tasks if any(unit['id'] not in done for unit in task['units'])]
+    if not tasks:  # nothing to export, the client is not even imported
+        stats['seconds'] = time.perf_counter() - start
+        return stats
+
+    from OpenMeteoAPI.archive import LocalArchive
+    from OpenMeteoAPI.openmeteo_api import OpenMeteoClient
+
+    client = client or OpenMeteoClient(cache_name=manifest['cache'])
+    archive = LocalArchive(manifest['archive'])
+    with open(checkpoint if checkpoint else os.devnull, 'w' if restart else 'a') as f:
+        if f.tell() and not restart:  # terminate an incomplete last line
+            f.write('\n')
+
+        def complete(unit: dict, rows: int) -> None:
+            with lock:
+                if unit['type'] == 'historical':  # forecasts are exported again on every run
+                    f.write(json.dumps({'id': unit['id'], 'path': unit['path'], 'rows': rows}) + '\n')
+                    f.flush()
+                stats['units'] += 1
+                stats['rows'] += rows
+
+        def run(task: dict) -> None:
+            try:
+                run_task(task, client, archive, manifest['request_workers'], done, complete)
+            except Exception as e:
+                with lock:
+                    stats['failed'].append((task['type'], task['params']['latitude'], task['params']['longitude'],
+                                            task['params']['models'], repr(e)))
+
+        with ThreadPoolExecutor(max_workers=manifest['workers']) as executor:
+            list(executor.map(run, tasks))
+
+    stats['seconds'] = time.perf_counter() - start
+
+    return stats
+
+
+def print_stats(stats: dict) -> None:
+    """Print statistics of a manifest run.
+
+    :param dict stats: statistics (see run_manifest)
+    """
+
+    print(f"{stats['units']} units exported ({stats['rows']} rows) in {stats['seconds']:.2f} s, "
+          f"{stats['skipped']} units already completed, {stats['tasks']} tasks")
+    for *task, error in stats['failed']:
+        print(f"failed: {tuple(task)} ({error})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('manifest', help='path of the JSON job manifest')
+    parser.add_argument('--workers', type=int, help='number of tasks running concurrently (manifest value if omitted)')
+    parser.add_argument('--checkpoint', help='path of the checkpoint file (manifest value if omitted)')
+    parser.add_argument('--restart', action='store_true', help='ignore the checkpoint and export all units again')
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.manifest)
+    if args.workers:
+        manifest['workers'] = args.workers
+    if args.checkpoint:
+        manifest['checkpoint'] = args.checkpoint
+
+    stats = run_manifest(manifest, restart=args.restart)
+    print_stats(stats)
+    if stats['failed']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Expiration policy of the OpenMeteo API response cache (applied by OpenMeteoAPI.cached_session)."""
+import datetime
+import math
+import time
+
+# update cycle of the forecast models as (interval, delay) in hours: a run started at a multiple of the interval (UTC)
+# is assumed to be available after the delay
+FORECAST_UPDATES = {
+    'best_match': (1, 0),
+    'ecmwf_ifs025': (6, 7),
+    'ecmwf_aifs025': (6, 7),
+    'gfs_seamless': (6, 4),
+    'icon_seamless': (3, 2),
+    'icon_eu': (3, 2),
+    'icon_d2': (3, 1),
+    'meteofrance_seamless': (3, 2),
+}
+DEFAULT_FORECAST_UPDATE = (1, 0)
+
+# expiration times of requests_cache (see requests_cache.policy.expiration), which is only imported by the session
+DO_NOT_CACHE = 0x0D0E0200020704
+NEVER_EXPIRE = -1
+
+# delay after which historical data is final, in days (ERA5 has a delay of about 5 days)
+ARCHIVE_LAG = 7
+
+
+class CachePolicy:
+    def __init__(self, url_forecast: str, url_historical: str, expire_after: int = 3600, archive_lag: int = ARCHIVE_LAG,
+                 forecast_updates: dict | None = None, url_ensemble: str | None = None) -> None:
+        """Initialize expiration policy of cached responses, depending on the requested data.
+
+        - historical data ending before the archive lag never changes and never expires
+        - forecast data (also of the ensemble API) expires as soon as the next model run is available
+        - anything else (e.g. recent historical data) expires after expire_after
+
+        :param str url_forecast: URL of the forecast API
+        :param str url_historical: URL of the historical weather API
+        :param int expire_after: time after which other responses expire, in seconds
+        :param int archive_lag: delay after which historical data is final, in days
+        :param dict | None forecast_updates: update cycle as (interval, delay) in hours, with model as key
+            (FORECAST_UPDATES if None)
+        :param str | None url_ensemble: URL of the ensemble API
+        """
+        self.url_forecast = url_forecast
+        self.url_ensemble = url_ensemble
+        self.url_historical = url_historical
+        self.expire_after = expire_after
+        self.archive_lag = archive_lag
+        self.forecast_updates = forecast_updates or FORECAST_UPDATES
+
+    def get_next_update(self, model: str, now: float) -> float:
+        """Get the time at which the next run of a forecast model is available.
+
+        :param str model: forecast model, or comma-separated models (the most frequently updated one counts)
+        :param float now: current time, as UNIX timestamp
+        :return: UNIX timestamp
+        """
+
+        hour = now / 3600
+        updates = []
+        for _model in model.split(','):
+            interval, delay = self.forecast_updates.get(_model, DEFAULT_FORECAST_UPDATE)
+            updates.append((math.floor((hour - delay) / interval) + 1) * interval + delay)
+
+        return min(updates) * 3600
+
+    def get_last_run(self, model: str, now: float) -> float:
+        """Get the start time of the latest run of a forecast model which is available.
+
+        :param str model: forecast model
+        :param float now: current time, as UNIX timestamp
+        :return: UNIX timestamp
+        """
+
+        interval, delay = self.forecast_updates.get(model, DEFAULT_FORECAST_UPDATE)
+        return math.floor((now / 3600 - delay) / interval) * interval * 3600
+
+    def get_expire_after(self, url: str, params: dict, now: float | None = None) -> int:
+        """Get the expiration time of a request.
+
+        :param str url: API URL
+        :param dict params: parameters (see OpenMeteo API doc)
+        :param float | None now: current time as UNIX timestamp, time.time() if None
+        :return: expiration time in seconds, NEVER_EXPIRE if the response never expires (always DO_NOT_CACHE if
+            caching is disabled through expire_after)
+        """
+
+        now = time.time() if now is None else now
+
+        if self.expire_after == DO_NOT_CACHE:
+            return self.expire_after
+
+        if url == self.url_historical and 'end_date' in params:
+            today = datetime.datetime.fromtimestamp(now, datetime.timezone.utc).date()
+            if datetime.date.fromisoformat(str(params['end_date'])) < today - datetime.timedelta(days=self.archive_lag):
+                return NEVER_EXPIRE
+
+        if url in (self.url_forecast, self.url_ensemble):
+            models = params.get('models', 'best_match')
+            models = models if isinstance(models, str) else ','.join(models)
+            return max(math.ceil(self.get_next_update(models, now) - now), 1)
+
+        return self.expire_after
+
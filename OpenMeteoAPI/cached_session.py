@@ -0,0 +1,71 @@
+"""Cached session of OpenMeteoClient, applying a CachePolicy per request and a size limit.
+
+Imported by OpenMeteoClient.__init__ only, so that requests_cache is not loaded by modules which merely use the policy.
+"""
+import time
+
+import requests
+import requests_cache
+
+from OpenMeteoAPI.cache_policy import CachePolicy
+
+
+class PolicyCachedSession(requests_cache.CachedSession):
+    def __init__(self, cache_name: str, policy: CachePolicy, max_size: int | None = None, **kwargs) -> None:
+        """Initialize cached session applying an expiration policy per request and a size limit.
+
+        Every response is recorded with its time of last use. Whenever a response is added, the least recently used
+        responses are removed until the cached responses fit into max_size again (the SQLite file keeps its size, but
+        freed pages are reused, so that it no longer grows).
+
+        :param str cache_name: path of the cache database
+        :param CachePolicy policy: expiration policy
+        :param int | None max_size: maximum size of the cached responses in bytes, unlimited if None
+        :param kwargs: further arguments of requests_cache.CachedSession
+        """
+        super().__init__(cache_name, **kwargs)
+        self.policy = policy
+        self.max_size = max_size
+
+        if self.max_size is not None:
+            with self.cache.responses.connection(commit=True) as connection:
+                connection.execute('CREATE TABLE IF NOT EXISTS last_used (key TEXT PRIMARY KEY, time REAL)')
+
+    def request(self, method: str, url: str, *args, params: dict | None = None, expire_after=None,
+                **kwargs) -> requests.Response:
+        """Send request, with the expiration time given by the policy unless set explicitly (see CachedSession)."""
+
+        if expire_after is None:
+            expire_after = self.policy.get_expire_after(url, params or {})
+        response = super().request(method, url, *args, params=params, expire_after=expire_after, **kwargs)
+
+        key = getattr(response, 'cache_key', None)
+        if self.max_size is not None and key:
+            with self.cache.responses.connection(commit=True) as connection:
+                connection.execute('INSERT OR REPLACE INTO last_used VALUES (?, ?)', (key, time.time()))
+            if not response.from_cache:
+                self.evict()
+
+        return response
+
+    def evict(self) -> None:
+        """Remove least recently used responses until the cached responses fit into the size limit."""
+
+        with self.cache.responses.connection() as connection:
+            size = connection.execute('SELECT TOTAL(LENGTH(value)) FROM responses').fetchone()[0]
+            if size <= self.max_size:
+                return
+            rows = connection.execute(
+                'SELECT responses.key, LENGTH(responses.value) FROM responses '
+                'LEFT JOIN last_used ON responses.key = last_used.key ORDER BY COALESCE(last_used.time, 0)').fetchall()
+
+        keys = []
+        for key, length in rows:
+            if size <= self.max_size:
+                break
+            keys.append(key)
+            size -= length
+
+        self.cache.delete(*keys)
+        with self.cache.responses.connection(commit=True) as connection:
+            connection.executemany('DELETE FROM last_used WHERE key = ?', [(key,) for key in keys])
@@ -0,0 +1,164 @@
+"""Vectorized calendar functions on NumPy datetime64 arrays.
+
+Named calendar_utils, so that it does not shadow the calendar module of the standard library. Timestamps are local
+times, as in the date column of OpenMeteoClient.get_hourly_df (see get_dates for timezone-aware columns).
+"""
+from __future__ import annotations
+
+import functools
+
+import numpy as np
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def get_dates(dates) -> np.ndarray:
+    """Get timestamps as datetime64 array in hours, from a datetime column, index or array.
+
+    Timezone-aware timestamps keep their wall time, the timezone information is dropped (the date column of
+    OpenMeteoClient.get_hourly_df holds local times labelled as UTC).
+    """
+
+    # pandas Series or Index, checked without importing pandas
+    if getattr(getattr(dates, 'dtype', None), 'tz', None) is not None:
+        dates = dates.dt.tz_localize(None) if hasattr(dates, 'dt') else dates.tz_localize(None)
+    return np.asarray(dates, dtype='datetime64[h]')
+
+
+def hours_of_year(dates: np.ndarray) -> np.ndarray:
+    """Get hour of year (0 for January 1st, 00:00) of every timestamp.
+
+    :param np.ndarray dates: timestamps as datetime64 array
+    :return: hours of year
+    """
+
+    dates = np.asarray(dates, dtype='datetime64[h]')
+    return (dates - dates.astype('datetime64[Y]')).astype(np.int64)
+
+
+def leap_day_mask(dates: np.ndarray) -> np.ndarray:
+    """Get mask of the timestamps falling on February 29th.
+
+    :param np.ndarray dates: timestamps as datetime64 array
+    :return: boolean mask, True during leap days
+    """
+
+    days = np.asarray(dates, dtype='datetime64[D]')
+    months = days.astype('datetime64[M]')
+
+    return ((months - months.astype('datetime64[Y]')).astype(np.int64) == 1) & ((days - months).astype(np.int64) == 28)
+
+
+def tmy_slots(dates: np.ndarray) -> np.ndarray:
+    """Get position of every timestamp within a typical meteorological year of 8760 hours (without leap day).
+
+    Hours after February 29th of leap years are shifted by one day, so that every date keeps its slot in all years.
+
+    :param np.ndarray dates: timestamps as datetime64 array
+    :return: slot from 0 to 8759, -1 during leap days
+    """
+
+    dates = np.asarray(dates, dtype='datetime64[h]')
+    years = dates.astype('datetime64[Y]')
+    hours = (dates - years).astype(np.int64)
+
+    # hour of year of March 1st, 00:00, 1416 in common years and 1440 in leap years
+    march = (years.astype('datetime64[M]') + 2).astype('datetime64[h]') - years.astype('datetime64[h]')
+    march = march.astype(np.int64)
+    leap = march == 1440
+
+    slots = np.where(leap & (hours >= march), hours - 24, hours)
+    return np.where(leap_day_mask(dates), -1, slots)
+
+
+@functools.lru_cache(maxsize=256)
+def get_year_calendar(year: int) -> dict:
+    """Get datetime columns of all hours of a year (cached, the arrays are read-only).
+
+    :param int year: year
+    :return: dict with year (format YY), month, day, hour and leap day mask as arrays
+    """
+
+    start, end = np.datetime64(f'{year:04d}-01-01T00', 'h'), np.datetime64(f'{year + 1:04d}-01-01T00', 'h')
+    dates = np.arange(start, end)
+    days = dates.astype('datetime64[D]')
+    months = dates.astype('datetime64[M]')
+
+    calendar = {
+        'year': np.full(len(dates), year % 100, dtype=np.int64),
+        'month': (months - months.astype('datetime64[Y]')).astype(np.int64) + 1,
+        'day': (days - months).astype(np.int64) + 1,
+        'hour': (dates - days).astype(np.int64),
+        'leap_day': leap_day_mask(dates),
+    }
+    for values in calendar.values():
+        values.flags.writeable = False
+
+    return calendar
+
+
+def get_calendar(year: int, length: int, start: int = 0) -> dict:
+    """Get datetime columns of consecutive hours, from the cached calendars of the years covered.
+
+    :param int year: year of the first hour
+    :param int length: number of hours
+    :param int start: first hour, counted from the beginning of the year
+    :return: dict with year (format YY), month, day and hour as arrays
+    """
+
+    parts = []
+    while length > 0:
+        calendar = get_year_calendar(year)
+        year_length = len(calendar['hour'])
+        if start < year_length:
+            end = min(start + length, year_length)
+            parts.append({key: calendar[key][start:end] for key in ['year', 'month', 'day', 'hour']})
+            length -= end - start
+            start = 0
+        else:
+            start -= year_length
+        year += 1
+
+    if len(parts) == 1:
+        return parts[0]
+    return {key: np.concatenate([part[key] for part in parts]) for key in ['year', 'month', 'day', 'hour']}
+
+
+def get_date_columns(dates: np.ndarray) -> dict:
+    """Get datetime columns of arbitrary timestamps.
+
+    :param np.ndarray dates: timestamps as datetime64 array
+    :return: dict with year (format YY), month, day and hour as arrays
+    """
+
+    dates = np.asarray(dates, dtype='datetime64[h]')
+    days = dates.astype('datetime64[D]')
+    months = dates.astype('datetime64[M]')
+    years = months.astype('datetime64[Y]')
+
+    return {
+        'year': (years.astype(np.int64) + 1970) % 100,
+        'month': (months - years).astype(np.int64) + 1,
+        'day': (days - months).astype(np.int64) + 1,
+        'hour': (dates - days).astype(np.int64),
+    }
+
+
+def drop_leap_days(df: pd.DataFrame | dict, column: str = 'date') -> pd.DataFrame | dict:
+    """Remove the rows falling on February 29th (the data itself is returned if there are none).
+
+    :param DataFrame | dict df: data with a datetime column, as DataFrame or as dict of arrays (see
+        OpenMeteoClient.get_hourly_columns)
+    :param str column: name of the datetime column
+    :return: data without leap days
+    """
+
+    mask = leap_day_mask(get_dates(df[column]))
+    if not mask.any():
+        return df
+    if isinstance(df, dict):
+        return {key: values[~mask] for key, values in df.items()}
+    return df[~mask]
@@ -0,0 +1,151 @@
+"""Statistics of ensemble forecasts and multi-model data.
+
+An ensemble (see OpenMeteoClient.get_ensemble) holds the hourly values of all members as one array of shape (members,
+time, variables): the members of the ensemble API, the models of a multi-model request, or both. Mean, spread,
+percentiles and exceedance probabilities are computed over the member axis for all hours and variables at once, missing
+values (e.g. of models with a shorter forecast horizon) are ignored. Example:
+
+    responses = client.request_ensemble_data(params | {'models': 'icon_seamless,gfs05'})
+    ensemble = OpenMeteoClient.get_ensemble(responses, params['hourly'])
+    statistics = get_statistics(ensemble, thresholds={'temperature_2m': [0, 30]})
+    export_percentile_tm2(ensemble, responses[0], '../data/vienna_p{percentile}.tm2')
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from typing import TYPE_CHECKING
+
+from OpenMeteoAPI.calendar_utils import drop_leap_days
+from OpenMeteoAPI.export import export_tm2
+from OpenMeteoAPI.metrics import instrument
+
+if TYPE_CHECKING:
+    from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+
+PERCENTILES = (10, 50, 90)  # default percentiles, e.g. of P10/P50/P90 design years
+
+
+def get_percentiles(values: np.ndarray, percentiles: tuple | list = PERCENTILES) -> (np.ndarray, np.ndarray):
+    """Get percentiles over the first axis of an array, ignoring NaN values.
+
+    Same result as np.nanpercentile with linear interpolation, but the members are sorted once and every percentile is
+    interpolated between two gathered values for all elements at once, instead of a 1-D percentile per element.
+
+    :param np.ndarray values: values, e.g. of shape (members, time, variables)
+    :param tuple | list percentiles: percentiles between 0 and 100
+    :return:
+        - percentiles - values of the percentiles, of shape (percentiles, ...) (NaN where all members are NaN)
+        - count - number of values which are not NaN, of shape (...)
+    """
+
+    ordered = np.sort(values, axis=0)  # NaN values are sorted to the end
+    count = values.shape[0] - np.isnan(ordered).sum(axis=0)
+
+    ranks = (np.asarray(percentiles, dtype=np.float64) / 100).reshape((-1,) + (1,) * count.ndim) * (count - 1)
+    lower = np.clip(np.floor(ranks), 0, None).astype(np.intp)
+    upper = np.minimum(lower + 1, np.maximum(count - 1, 0))
+    fraction = (ranks - lower).astype(values.dtype)
+
+    low = np.take_along_axis(ordered, lower, axis=0)
+    high = np.take_along_axis(ordered, upper, axis=0)
+    result = low + fraction * (high - low)
+    result[:, count == 0] = np.nan
+
+    return result, count
+
+
+def get_exceedance(values: np.ndarray, count: np.ndarray, thresholds: list[float]) -> np.ndarray:
+    """Get the probability of values exceeding thresholds, as share of the members which are not NaN.
+
+    :param np.ndarray values: values of a variable, of shape (members, time)
+    :param np.ndarray count: number of values which are not NaN, of shape (time,)
+    :param list thresholds: thresholds
+    :return: probabilities between 0 and 1, of shape (thresholds, time) (NaN where all members are NaN)
+    """
+
+    limits = np.asarray(thresholds, dtype=values.dtype)
+    exceeding = (values[:, None, :] > limits[:, None]).sum(axis=0)  # NaN never exceeds
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return exceeding / count
+
+
+@instrument('statistics', rows=lambda statistics, ensemble, *args, **kwargs: len(ensemble['date']))
+def get_statistics(ensemble: dict, percentiles: tuple | list = PERCENTILES, thresholds: dict | None = None) -> dict:
+    """Get the statistics of an ensemble over its members, for every hour and variable.
+
+    :param dict ensemble: ensemble (see OpenMeteoClient.get_ensemble)
+    :param tuple | list percentiles: percentiles between 0 and 100
+    :param dict | None thresholds: thresholds of the exceedance probabilities, with variable as key
+    :return: statistics as dict, with the following keys:
+        - date, variables - as in the ensemble
+        - count - number of members which are not NaN, of shape (time, variables)
+        - mean, std - mean and standard deviation (spread) of the members, of shape (time, variables)
+        - percentiles - values of every percentile, of shape (time, variables), with percentile as key
+        - exceedance - probability of exceeding every threshold, of shape (thresholds, time), with variable as key
+    """
+
+    values = ensemble['values']
+    quantiles, count = get_percentiles(values, percentiles)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nansum(values, axis=0) / count
+        std = np.sqrt(np.nansum(np.square(values - mean), axis=0) / count)
+
+    exceedance = {}
+    for variable, limits in (thresholds or {}).items():
+        index = ensemble['variables'].index(variable)
+        exceedance[variable] = get_exceedance(values[:, :, index], count[:, index], limits)
+
+    return {'date': ensemble['date'], 'variables': ensemble['variables'], 'count': count, 'mean': mean, 'std': std,
+            'percentiles': dict(zip(percentiles, quantiles)), 'exceedance': exceedance}
+
+
+def get_statistic_columns(statistics: dict, statistic: str | int | float) -> dict:
+    """Get a statistic of all variables in the format of OpenMeteoClient.get_hourly_columns, e.g. for a tm2 export.
+
+    :param dict statistics: statistics (see get_statistics)
+    :param str | int | float statistic: "mean", "std" or a percentile
+    :return: hourly data as dict, with date and variables as keys
+    """
+
+    values = statistics[statistic] if isinstance(statistic, str) else statistics['percentiles'][statistic]
+
+    columns = {'date': statistics['date']}
+    columns.update({variable: values[:, index] for index, variable in enumerate(statistics['variables'])})
+
+    return columns
+
+
+def export_percentile_tm2(ensemble: dict, response: WeatherApiResponse, path: str,
+                          percentiles: tuple | list = PERCENTILES, derived: bool = False,
+                          leap_days: bool = False) -> list[str]:
+    """Export a tm2 file per percentile of an ensemble, e.g. P10/P50/P90 design years of a multi-model request.
+
+    Percentiles are taken per hour and variable, so that the P90 file is the envelope of the 90 % values of every
+    element, not the data of a single member.
+
+    :param dict ensemble: ensemble (see OpenMeteoClient.get_ensemble), with the variables of the tm2 format
+    :param response: response from OpenMeteo API, for the location information
+    :param str path: export path, "{percentile}" is replaced by the percentile
+    :param tuple | list percentiles: percentiles between 0 and 100
+    :param bool derived: fill the tmy2 elements derived from the OpenMeteo data (see export_tm2)
+    :param bool leap_days: keep February 29, otherwise it is dropped
+    :return: paths of the exported files
+    """
+
+    if '{percentile}' not in path:
+        raise ValueError('path must contain "{percentile}"')
+
+    statistics = get_statistics(ensemble, percentiles)
+
+    paths = []
+    for percentile in percentiles:
+        columns = get_statistic_columns(statistics, percentile)
+        if not leap_days:
+            columns = drop_leap_days(columns)
+        paths.append(path.format(percentile=percentile))
+        export_tm2(columns, response, paths[-1], derived=derived)
+
+    return paths
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from ConvertToTM2.columnar import ColumnarTMY2
+from ConvertToTM2.derived import derive_tm2_variables
+from ConvertToTM2.tmy2format import OPENMETEO_MAPPING
+from OpenMeteoAPI.metrics import instrument
+
+import json
+
+import numpy as np
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pandas and pyarrow are imported on first use, the tm2 export needs neither
+    import pyarrow
+
+    from pandas import DataFrame
+    from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+
+# rows per parquet row group: one (leap) year of hourly data, so that reading a year touches at most two row groups
+PARQUET_ROW_GROUP_SIZE = 366 * 24
+
+
+def import_pyarrow():
+    """Import pyarrow with the modules used by the parquet and feather exports, None if it is not installed."""
+
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:  # optional, only required for the parquet and feather exports
+        return None
+
+    return pyarrow
+
+
+def export_tm2(df: DataFrame | dict, response: WeatherApiResponse, path: str, derived: bool = False) -> None:
+    """Export hourly OpenMeteo data as tm2 file, with location information taken from the API response.
+
+    :param DataFrame | dict df: hourly data (see OpenMeteoClient.get_hourly_df or get_hourly_columns)
+    :param response: response from OpenMeteo API
+    :param str path: export path
+    :param bool derived: fill the tmy2 elements derived from the OpenMeteo data (see derive_tm2_variables), the direct
+        radiation is then exported as direct normal radiation and the wind speed in m/s
+    """
+
+    lat, long, time_zone = response.Latitude(), response.Longitude(), int(response.UtcOffsetSeconds() / 3600)
+    if derived:
+        df = derive_tm2_variables(df, lat, long, time_zone)
+
+    ColumnarTMY2().export_from_openmeteo_df(
+        data=df, lat=lat, long=long, time_zone=time_zone, elevation=int(response.Elevation()), path=path)
+
+
+@instrument('csv_export', rows=lambda result, df, *args, **kwargs: len(df))
+def export_csv(df: DataFrame, variables: list[str], path: str) -> None:
+    """Export hourly OpenMeteo data as csv file, with units added to the headers.
+
+    :param DataFrame df: hourly data (see OpenMeteoClient.get_hourly_df)
+    :param list variables: list of variables passed to the OpenMeteo API
+    :param str path: export path
+    """
+
+    headers = ['date'] + [_varname + '_' + OPENMETEO_MAPPING[_varname]['unit'] for _varname in variables]
+    df.set_axis(headers, axis=1).to_csv(path)
+
+
+def get_units(variables: list[str]) -> dict:
+    """Get units of OpenMeteo variables, with variable as key."""
+    return {_varname: OPENMETEO_MAPPING[_varname]['unit'] for _varname in variables}
+
+
+def get_arrow_table(df: DataFrame, variables: list[str]) -> pyarrow.Table:
+    """Convert hourly OpenMeteo data into an Arrow table, with the unit of every variable as field metadata.
+
+    :param DataFrame df: hourly data (see OpenMeteoClient.get_hourly_df)
+    :param list variables: list of variables passed to the OpenMeteo API
+    :return: table with date and variables as columns
+    """
+
+    pyarrow = import_pyarrow()
+    if pyarrow is None:
+        raise ImportError('pyarrow is required for parquet and feather exports (pip install pyarrow)')
+
+    table = pyarrow.Table.from_pandas(df[['date'] + variables], preserve_index=False)
+    units = get_units(variables)
+    schema = pyarrow.schema([field.with_metadata({'unit': units[field.name]}) if field.name in units else field
+                             for field in table.schema], metadata=table.schema.metadata)
+
+    return table.cast(schema)
+
+
+@instrument('parquet_export', rows=lambda result, df, *args, **kwargs: len(df))
+def export_parquet(df: DataFrame, variables: list[str], path: str, compression: str = 'zstd',
+                   row_group_size: int = PARQUET_ROW_GROUP_SIZE) -> None:
+    """Export hourly OpenMeteo data as parquet file, with units as column metadata (requires pyarrow).
+
+    :param DataFrame df: hourly data (see OpenMeteoClient.get_hourly_df)
+    :param list variables: list of variables passed to the OpenMeteo API
+    :param str path: export path
+    :param str compression: compression codec (see pyarrow.parquet.write_table)
+    :param int row_group_size: maximum number of rows per row group
+    """
+
+    table = get_arrow_table(df, variables)
+    import_pyarrow().parquet.write_table(table, path, compression=compression, row_group_size=row_group_size)
+
+
+@instrument('feather_export', rows=lambda result, df, *args, **kwargs: len(df))
+def export_feather(df: DataFrame, variables: list[str], path: str, compression: str = 'lz4') -> None:
+    """Export hourly OpenMeteo data as feather (Arrow IPC) file, with units as column metadata (requires pyarrow).
+
+    :param DataFrame df: hourly data (see OpenMeteoClient.get_hourly_df)
+    :param list variables: list of variables passed to the OpenMeteo API
+    :param str path: export path
+    :param str compression: compression codec, "lz4", "zstd" or "uncompressed" (see pyarrow.feather.write_feather)
+    """
+
+    table = get_arrow_table(df, variables)
+    import_pyarrow().feather.write_feather(table, path, compression=compression)
+
+
+@instrument('npz_export', rows=lambda result, df, *args, **kwargs: len(df))
+def export_npz(df: DataFrame, variables: list[str], path: str) -> None:
+    """Export hourly OpenMeteo data as uncompressed npz file, with units stored as metadata (see read_npz).
+
+    The timestamps are stored as datetime64 array without timezone, every variable as array under its name and the
+    metadata (timezone and units) as JSON string under "_metadata", so that the file loads without pickle.
+
+    :param DataFrame df: hourly data (see OpenMeteoClient.get_hourly_df)
+    :param list variables: list of variables passed to the OpenMeteo API
+    :param str path: export path
+    """
+
+    import pandas as pd
+
+    dates = pd.DatetimeIndex(df['date'])
+    metadata = {'timezone': str(dates.tz) if dates.tz is not None else None, 'units': get_units(variables)}
+    arrays = {'date': dates.tz_localize(None).values if dates.tz is not None else dates.values}
+    arrays |= {_varname: df[_varname].to_numpy() for _varname in variables}
+
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays, _metadata=np.array(json.dumps(metadata)))
+
+
+def read_npz(path: str) -> (DataFrame, dict):
+    """Read hourly OpenMeteo data exported by export_npz.
+
+    :param str path: path of the npz file
+    :return:
+        - df - hourly data, in the format of OpenMeteoClient.get_hourly_df
+        - units - unit of every variable, with variable as key
+    """
+
+    import pandas as pd
+
+    with np.load(path) as npz:
+        metadata = json.loads(str(npz['_metadata']))
+        df = pd.DataFrame({name: npz[name] for name in npz.files if name != '_metadata'}, copy=False)
+
+    if metadata['timezone'] is not None:
+        df['date'] = df['date'].dt.tz_localize(metadata['timezone'])
+
+    return df, metadata['units']
+
+
+def read_units(path: str) -> dict:
+    """Read the units stored as column metadata of a parquet or feather file (requires pyarrow).
+
+    :param str path: path of the parquet or feather file
+    :return: unit of every variable, with variable as key
+    """
+
+    pyarrow = import_pyarrow()
+    if pyarrow is None:
+        raise ImportError('pyarrow is required to read parquet and feather files (pip install pyarrow)')
+
+    if path.endswith('.parquet'):
+        schema = pyarrow.parquet.read_schema(path)
+    else:
+        schema = pyarrow.ipc.open_file(path).schema
+
+    return {field.name: field.metadata[b'unit'].decode() for field in schema
+            if field.metadata and b'unit' in field.metadata}
+
+
+# writers with the same arguments, with export format (used as file extension) as key
+WRITERS = {
+    'csv': export_csv,
+    'parquet': export_parquet,
+    'feather': export_feather,
+    'npz': export_npz,
+}
+
+
+def export_sites(dfs: dict, responses: dict, variables: list[str], path: str, formats: tuple = ('csv',)) -> None:
+    """Export hourly OpenMeteo data of multiple sites as tm2 files and in the given formats.
+
+    :param dict dfs: hourly data, with site name as key
+    :param dict responses: responses from OpenMeteo API, with site name as key
+    :param list variables: list of variables passed to the OpenMeteo API
+    :param str path: export path without file extension, "{site}" is replaced by the site name
+    :param tuple formats: export formats besides tm2, keys of WRITERS
+    """
+
+    for site in dfs:
+        export_tm2(dfs[site], responses[site], path.format(site=site) + '.tm2')
+        for _format in formats:
+            WRITERS[_format](dfs[site], variables, path.format(site=site) + '.' + _format)
@@ -0,0 +1,145 @@
+"""In-process memoization of decoded OpenMeteo API responses.
+
+Repeated lookups of the same data skip both the request (including the lookup in the requests_cache database) and the
+decoding of the FlatBuffer. Example:
+
+    frames = FrameCache(OpenMeteoClient(), max_bytes=512 * 2 ** 20)
+    df = frames.request_historical_df(params, 2023)  # request and decode
+    df = frames.request_historical_df(params, 2023)  # from memory
+    print(frames.get_stats())
+"""
+from __future__ import annotations
+
+import threading
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from OpenMeteoAPI.archive import LocalArchive
+from OpenMeteoAPI.metrics import increment
+from OpenMeteoAPI.openmeteo_api import OpenMeteoClient
+from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+
+if TYPE_CHECKING:  # pandas is imported on first lookup
+    import pandas as pd
+
+
+class FrameCache:
+    def __init__(self, client: OpenMeteoClient | None = None, max_bytes: int = 256 * 2 ** 20) -> None:
+        """Initialize memory cache of decoded hourly data, with LRU eviction.
+
+        The hourly values are stored once, as read-only block, and every lookup wraps them in a new DataFrame without
+        copying them (only the date column is created per DataFrame). The DataFrames can therefore be modified freely
+        by adding, replacing or removing columns, but writing into the values raises a ValueError.
+
+        :param OpenMeteoClient | None client: OpenMeteo API client, a new one is created if None
+        :param int max_bytes: maximum size of the cached values and timestamps, in bytes
+        """
+        self.client = client or OpenMeteoClient()
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # (values, dates, size) with request key as key, least recently used first
+        self.size = 0
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def get_key(url: str, params: dict) -> tuple:
+        """Get the key of a request, identical for any order of the parameters and of the hourly variables.
+
+        :param str url: API URL
+        :param dict params: parameters (see OpenMeteo API doc)
+        :return: endpoint, normalized parameters and variables in the requested order
+        """
+
+        variables = tuple(LocalArchive.get_variables(params))
+        params, _ = OpenMeteoClient.sort_hourly(params)
+        return url, tuple(sorted((name, tuple(value) if isinstance(value, (list, tuple)) else value)
+                                 for name, value in params.items())), variables
+
+    def get_hourly_df(self, url: str, params: dict) -> pd.DataFrame:
+        """Get hourly data of a request, from memory or from OpenMeteo API.
+
+        :param str url: API URL
+        :param dict params: parameters (see OpenMeteo API doc)
+        :return: hourly data, in the format of OpenMeteoClient.get_hourly_df with read-only values
+        """
+
+        key = self.get_key(url, params)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+        increment('openmeteo_frame_cache_lookups_total', result='hit' if entry is not None else 'miss')
+
+        if entry is None:
+            entry = self.decode(self.client.weather_api(url, params=dict(params))[0], list(key[2]))
+            with self.lock:
+                self.stats['misses'] += 1
+                self.add(key, entry)
+
+        import pandas as pd
+
+        values, dates, _ = entry
+        df = pd.DataFrame(values, columns=list(key[2]), copy=False)
+        df.insert(0, 'date', dates)
+
+        return df
+
+    def request_historical_df(self, params: dict, year: int) -> pd.DataFrame:
+        """Get hourly historical data of a given year (see OpenMeteoClient.request_historical_data)."""
+        return self.get_hourly_df(self.client.url_historical, self.client.get_historical_params(params, year))
+
+    def request_forecast_df(self, params: dict) -> pd.DataFrame:
+        """Get hourly forecast data (see OpenMeteoClient.request_forecast_data)."""
+        return self.get_hourly_df(self.client.url_forecast, params)
+
+    @staticmethod
+    def decode(response: WeatherApiResponse, variables: list[str]) -> (np.ndarray, pd.DatetimeIndex, int):
+        """Decode the hourly data of a response into a read-only block of values and its timestamps.
+
+        :param response: response from OpenMeteo API
+        :param list variables: list of variables passed to the OpenMeteo API
+        :return: values of shape (time, variables), timestamps and size of both in bytes
+        """
+
+        values = OpenMeteoClient.get_hourly_values(response, variables)
+        values.flags.writeable = False
+        dates = OpenMeteoClient.get_hourly_time(response)
+
+        return values, dates, values.nbytes + dates.nbytes
+
+    def add(self, key: tuple, entry: tuple) -> None:
+        """Add an entry (lock held), evicting least recently used entries to stay within the size limit."""
+
+        if key in self.entries:  # decoded concurrently by another thread
+            self.size -= self.entries.pop(key)[2]
+
+        self.entries[key] = entry
+        self.size += entry[2]
+
+        # an entry exceeding the limit on its own is not kept
+        while self.size > self.max_bytes and self.entries:
+            _, (_, _, size) = self.entries.popitem(last=False)
+            self.size -= size
+            self.stats['evictions'] += 1
+
+    def get_stats(self) -> dict:
+        """Get number of hits, misses and evictions, hit rate, number of entries and size in bytes."""
+
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return self.stats | {
+                'hit_rate': self.stats['hits'] / lookups if lookups else None,
+                'entries': len(self.entries),
+                'bytes': self.size,
+            }
+
+    def clear(self) -> None:
+        """Remove all entries."""
+
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
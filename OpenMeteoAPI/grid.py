@@ -0,0 +1,274 @@
+"""Bulk fetch of hourly data over a regional grid.
+
+The cells of a bounding box are snapped to the native grid of the model, so that cells falling onto the same grid point
+are requested once. The grid points are requested in multi-location tiles, concurrently, and their values are written
+into one memory-mapped array of shape (time, latitude, longitude, variable). Example:
+
+    grid = fetch_grid(client, client.url_historical, params, (47.0, 15.0, 49.0, 17.5), 0.1, 'grid.npy')
+    export_grid_tm2(grid, 'tm2/{latitude}_{longitude}.tm2')
+"""
+from __future__ import annotations
+
+import json
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from OpenMeteoAPI.archive import ArchivedResponse, LocalArchive
+from OpenMeteoAPI.calendar_utils import drop_leap_days
+from OpenMeteoAPI.export import export_tm2
+from OpenMeteoAPI.metrics import increment
+from OpenMeteoAPI.openmeteo_api import MAX_LOCATIONS, MAX_URL_LENGTH, OpenMeteoClient
+from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+
+if TYPE_CHECKING:  # pandas is imported on first use, it is not needed for tm2 exports
+    import pandas as pd
+
+# native grid spacing of the models as (latitude, longitude) step in degrees, with grid points at multiples of the steps
+# (approximated by the closest regular grid for models with reduced Gaussian or icosahedral grids)
+MODEL_GRIDS = {
+    'era5': (0.25, 0.25),
+    'era5_land': (0.1, 0.1),
+    'ecmwf_ifs': (0.1, 0.1),
+    'ecmwf_ifs025': (0.25, 0.25),
+    'ecmwf_aifs025': (0.25, 0.25),
+    'gfs_seamless': (0.25, 0.25),
+    'icon_global': (0.125, 0.125),
+    'icon_eu': (0.0625, 0.0625),
+    'icon_d2': (0.02, 0.02),
+}
+
+
+def get_grid_axes(bbox: tuple[float, float, float, float], resolution: float) -> (np.ndarray, np.ndarray):
+    """Get latitudes and longitudes of the cells of a bounding box.
+
+    :param tuple bbox: bounding box as (south, west, north, east) in degrees, edges included
+    :param float resolution: distance between two cells in degrees
+    :return:
+        - latitudes - latitudes from south to north
+        - longitudes - longitudes from west to east
+    """
+
+    south, west, north, east = bbox
+    if south > north or west > east:
+        raise ValueError(f'invalid bounding box {bbox}, expected (south, west, north, east)')
+
+    # rounded, so that the edges are included despite floating point errors
+    latitudes = np.round(south + resolution * np.arange(int(np.floor((north - south) / resolution + 1e-9)) + 1), 6)
+    longitudes = np.round(west + resolution * np.arange(int(np.floor((east - west) / resolution + 1e-9)) + 1), 6)
+
+    return latitudes, longitudes
+
+
+def snap_to_grid(latitudes: np.ndarray, longitudes: np.ndarray, model: str) -> (np.ndarray, np.ndarray):
+    """Snap the cells of a grid to the native grid points of a model and remove duplicates.
+
+    :param np.ndarray latitudes: latitudes of the grid
+    :param np.ndarray longitudes: longitudes of the grid
+    :param str model: model, cells are only deduplicated (not snapped) for models not in MODEL_GRIDS
+    :return:
+        - points - distinct grid points as (latitude, longitude), of shape (points, 2)
+        - cells - index of the grid point of every cell, of shape (latitudes, longitudes)
+    """
+
+    cell_latitudes, cell_longitudes = np.meshgrid(latitudes, longitudes, indexing='ij')
+    coordinates = np.stack([cell_latitudes.ravel(), cell_longitudes.ravel()], axis=1)
+
+    if model in MODEL_GRIDS:
+        steps = np.array(MODEL_GRIDS[model])
+        coordinates = np.round(np.round(coordinates / steps) * steps, 6)
+
+    points, cells = np.unique(coordinates, axis=0, return_inverse=True)
+
+    return points, cells.reshape(len(latitudes), len(longitudes))
+
+
+def plan_tiles(client: OpenMeteoClient, url: str, params: dict, points: np.ndarray,
+               max_locations: int = MAX_LOCATIONS, max_url_length: int = MAX_URL_LENGTH) -> list[list[int]]:
+    """Split grid points into tiles of multi-location requests.
+
+    The points are sorted by latitude and longitude, so that a tile covers a compact area of the grid.
+
+    :param OpenMeteoClient client: OpenMeteo API client
+    :param str url: API URL
+    :param dict params: parameters (see OpenMeteo API doc), without latitude and longitude
+    :param np.ndarray points: grid points as (latitude, longitude)
+    :param int max_locations: maximum number of locations per request
+    :param int max_url_length: maximum number of characters of a request URL
+    :return: lists of point indices, one per request
+    """
+
+    sites = {index: (float(latitude), float(longitude)) for index, (latitude, longitude) in enumerate(points)}
+    return client.get_site_chunks(url, params, sites, max_locations, max_url_length)
+
+
+def fetch_grid(client: OpenMeteoClient, url: str, params: dict, bbox: tuple[float, float, float, float],
+               resolution: float, path: str, max_locations: int = MAX_LOCATIONS, max_url_length: int = MAX_URL_LENGTH,
+               max_workers: int = 8) -> dict:
+    """Request hourly data of all cells of a bounding box and write it into a memory-mapped array.
+
+    The values of every grid point are copied once, from the FlatBuffer vectors into all cells snapped to it. The time
+    axis is given by the first tile (local time), hours not returned for a point are NaN. The location information of
+    every grid point is written next to the array (path + ".json"), so that the grid can be reopened with load_grid.
+
+    :param OpenMeteoClient client: OpenMeteo API client
+    :param str url: API URL
+    :param dict params: parameters (see OpenMeteo API doc), without latitude and longitude
+    :param tuple bbox: bounding box as (south, west, north, east) in degrees, edges included
+    :param float resolution: distance between two cells in degrees
+    :param str path: path of the array (.npy)
+    :param int max_locations: maximum number of locations per request
+    :param int max_url_length: maximum number of characters of a request URL
+    :param int max_workers: maximum number of concurrent requests
+    :return: grid (see load_grid), with values as array of shape (time, latitude, longitude, variable)
+    """
+
+    variables = LocalArchive.get_variables(params)
+    latitudes, longitudes = get_grid_axes(bbox, resolution)
+    points, cells = snap_to_grid(latitudes, longitudes, params.get('models', 'best_match'))
+    tiles = plan_tiles(client, url, params, points, max_locations, max_url_length)
+    sites = {index: (float(latitude), float(longitude)) for index, (latitude, longitude) in enumerate(points)}
+    increment('openmeteo_grid_points_total', len(points))
+    increment('openmeteo_grid_cells_total', cells.size)
+
+    # cells of every grid point, as (latitude indices, longitude indices)
+    order = np.argsort(cells, axis=None, kind='stable')
+    bounds = np.searchsorted(cells.ravel()[order], np.arange(len(points) + 1))
+    point_cells = [np.unravel_index(order[first:last], cells.shape) for first, last in zip(bounds[:-1], bounds[1:])]
+
+    meta = [None] * len(points)
+    lock = threading.Lock()
+    grid = {}
+
+    def request_tile(tile: list[int]) -> list[WeatherApiResponse]:
+        responses = client.weather_api(url, params=params | client.get_location_params(sites, tile))
+        if len(responses) != len(tile):
+            raise ValueError(f'expected {len(tile)} responses from multi-location request, got {len(responses)}')
+        return responses
+
+    def write_tile(tile: list[int], responses: list[WeatherApiResponse]) -> None:
+        values, start = grid['values'], grid['start']
+        for index, response in zip(tile, responses):
+            hourly = response.Hourly()
+            first = (hourly.Time() + response.UtcOffsetSeconds()) // 3600 - start
+            lat_index, long_index = point_cells[index]
+            for variable in range(len(variables)):
+                point_values = hourly.Variables(variable).ValuesAsNumpy()
+                # clip to the time axis of the grid
+                _first, _last = max(first, 0), min(first + len(point_values), len(values))
+                if _first < _last:
+                    values[_first:_last, lat_index, long_index, variable] = \
+                        point_values[_first - first:_last - first, np.newaxis]
+            with lock:
+                meta[index] = {
+                    'latitude': response.Latitude(),
+                    'longitude': response.Longitude(),
+                    'elevation': response.Elevation(),
+                    'utc_offset_seconds': response.UtcOffsetSeconds(),
+                }
+
+    # the first tile gives the time axis
+    responses = request_tile(tiles[0])
+    hourly = responses[0].Hourly()
+    start = (hourly.Time() + responses[0].UtcOffsetSeconds()) // 3600
+    hours = (hourly.TimeEnd() - hourly.Time()) // hourly.Interval()
+    grid['start'] = start
+    grid['values'] = np.lib.format.open_memmap(
+        path, mode='w+', dtype=np.float32, shape=(hours, len(latitudes), len(longitudes), len(variables)))
+    grid['values'][:] = np.nan
+    write_tile(tiles[0], responses)
+
+    def fetch(tile: list[int]) -> None:
+        write_tile(tile, request_tile(tile))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(fetch, tiles[1:]))
+    grid['values'].flush()
+
+    with open(path + '.json', 'w') as f:
+        json.dump({
+            'start': int(start),
+            'latitudes': latitudes.tolist(),
+            'longitudes': longitudes.tolist(),
+            'variables': variables,
+            'points': points.tolist(),
+            'cells': cells.tolist(),
+            'meta': meta,
+        }, f)
+
+    return load_grid(path)
+
+
+def load_grid(path: str, mode: str = 'r') -> dict:
+    """Open a grid written by fetch_grid.
+
+    :param str path: path of the array (.npy)
+    :param str mode: "r" for reading, "r+" for writing (see np.load)
+    :return: dict with
+        - values - hourly values, memory-mapped array of shape (time, latitude, longitude, variable)
+        - dates - timestamps of the time axis (local time, labelled as UTC)
+        - latitudes, longitudes - axes of the grid
+        - variables - names of the variables
+        - points - distinct grid points as (latitude, longitude)
+        - cells - index of the grid point of every cell
+        - meta - location information of every grid point, as returned by the API
+    """
+
+    import pandas as pd
+
+    with open(path + '.json', 'r') as f:
+        content = json.load(f)
+    values = np.load(path, mmap_mode=mode)
+
+    return {
+        'values': values,
+        'dates': pd.date_range(start=pd.Timestamp(content['start'] * 3600, unit='s', tz='UTC'), periods=len(values),
+                               freq='h'),
+        'latitudes': np.array(content['latitudes']),
+        'longitudes': np.array(content['longitudes']),
+        'variables': content['variables'],
+        'points': np.array(content['points']),
+        'cells': np.array(content['cells']),
+        'meta': content['meta'],
+    }
+
+
+def get_point_df(grid: dict, index: int) -> pd.DataFrame:
+    """Get the hourly data of a grid point.
+
+    :param dict grid: grid (see load_grid)
+    :param int index: index of the grid point
+    :return: hourly data, in the format of OpenMeteoClient.get_hourly_df
+    """
+
+    import pandas as pd
+
+    lat_index, long_index = np.argwhere(grid['cells'] == index)[0]
+    df = pd.DataFrame(grid['values'][:, lat_index, long_index, :], columns=grid['variables'])
+    df.insert(0, 'date', grid['dates'])
+
+    return df
+
+
+def export_grid_tm2(grid: dict, path: str, max_workers: int = 1) -> list[str]:
+    """Export the hourly data of every grid point as tm2 file, without leap days.
+
+    The grid has to hold all variables of the tm2 format (see OPENMETEO_MAPPING) and at most one year of data.
+
+    :param dict grid: grid (see load_grid)
+    :param str path: export path, "{latitude}" and "{longitude}" are replaced by the coordinates of the grid point
+    :param int max_workers: number of concurrent exports
+    :return: paths of the exported files, one per grid point
+    """
+
+    def export(index: int) -> str:
+        latitude, longitude = grid['points'][index]
+        point_path = path.format(latitude=f'{latitude:.4f}', longitude=f'{longitude:.4f}')
+        export_tm2(drop_leap_days(get_point_df(grid, index)), ArchivedResponse(grid['meta'][index]), point_path)
+        return point_path
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(export, range(len(grid['points']))))
@@ -0,0 +1,227 @@
+"""Instrumentation of the fetch, decode and export stages.
+
+Metrics are only recorded while at least one sink is enabled, otherwise the instrumented functions are called directly,
+the overhead being a single check of the list of sinks. Example:
+
+    registry = MemorySink()
+    enable(registry, LogSink())
+    ...  # use OpenMeteoClient, ColumnarTMY2 etc.
+    print(registry.summary())
+    registry.dump_prometheus('metrics.prom')
+"""
+from __future__ import annotations
+
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # only imported with the client, not by the converters
+    import requests
+
+# upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10., 30., 60.)
+
+SINKS = []  # enabled sinks
+
+
+class MemorySink:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS) -> None:
+        """Initialize in-memory registry of counters and latency histograms.
+
+        :param tuple buckets: upper bounds of the histogram buckets, in seconds
+        """
+        self.buckets = buckets
+        self.counters = {}  # values, with (name, labels) as key
+        self.histograms = {}  # bucket counts, sum and count, with (name, labels) as key
+        self.lock = threading.Lock()
+
+    def increment(self, name: str, value: float, labels: tuple) -> None:
+        """Increment a counter.
+
+        :param str name: metric name
+        :param float value: increment
+        :param tuple labels: labels as (name, value) pairs
+        """
+
+        with self.lock:
+            self.counters[(name, labels)] = self.counters.get((name, labels), 0) + value
+
+    def observe(self, name: str, value: float, labels: tuple) -> None:
+        """Add an observation to a histogram.
+
+        :param str name: metric name
+        :param float value: observed value
+        :param tuple labels: labels as (name, value) pairs
+        """
+
+        with self.lock:
+            histogram = self.histograms.setdefault((name, labels), {
+                'buckets': [0] * (len(self.buckets) + 1), 'sum': 0., 'count': 0})
+            histogram['buckets'][bisect.bisect_left(self.buckets, value)] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def summary(self) -> dict:
+        """Get calls, total time and rows per second of every stage, as well as all counters.
+
+        :return: summary with stage as key for stages, metric name (and labels) as key for counters
+        """
+
+        summary = {'stages': {}, 'counters': {}}
+        with self.lock:
+            for (name, labels), histogram in self.histograms.items():
+                if name != 'openmeteo_stage_seconds':
+                    continue
+                stage = dict(labels)['stage']
+                rows = self.counters.get(('openmeteo_stage_rows_total', labels))  # None for stages without rows
+                summary['stages'][stage] = {
+                    'calls': histogram['count'],
+                    'seconds': histogram['sum'],
+                    'rows': rows,
+                    'rows_per_second': rows / histogram['sum'] if rows is not None and histogram['sum'] else None,
+                }
+            for (name, labels), value in self.counters.items():
+                summary['counters'][name + format_labels(labels)] = value
+
+        return summary
+
+    def to_prometheus(self) -> str:
+        """Get all metrics in the Prometheus text exposition format.
+
+        :return: metrics as text
+        """
+
+        lines = []
+        with self.lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f'# TYPE {name} counter')
+                for (_name, labels), value in self.counters.items():
+                    if _name == name:
+                        lines.append(f'{name}{format_labels(labels)} {value}')
+
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f'# TYPE {name} histogram')
+                for (_name, labels), histogram in self.histograms.items():
+                    if _name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(self.buckets + ('+Inf',), histogram['buckets']):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{format_labels(labels + (("le", str(bound)),))} {cumulative}')
+                    lines.append(f'{name}_sum{format_labels(labels)} {histogram["sum"]}')
+                    lines.append(f'{name}_count{format_labels(labels)} {histogram["count"]}')
+
+        return '\n'.join(lines) + '\n'
+
+    def dump_prometheus(self, path: str) -> None:
+        """Write all metrics into a file in the Prometheus text exposition format (e.g. for the textfile collector).
+
+        :param str path: output path, the file is replaced atomically
+        """
+
+        with open(path + '.tmp', 'w') as f:
+            f.write(self.to_prometheus())
+        os.replace(path + '.tmp', path)
+
+
+class LogSink:
+    def __init__(self, logger: logging.Logger | None = None, level: int = logging.INFO) -> None:
+        """Initialize sink writing every metric event as structured (JSON) log message.
+
+        :param logging.Logger | None logger: logger, "OpenMeteoAPI.metrics" if None
+        :param int level: logging level of the messages
+        """
+        self.logger = logger or logging.getLogger('OpenMeteoAPI.metrics')
+        self.level = level
+
+    def increment(self, name: str, value: float, labels: tuple) -> None:
+        """Log a counter increment."""
+        self.logger.log(self.level, json.dumps({'metric': name, 'type': 'counter', 'value': value} | dict(labels)))
+
+    def observe(self, name: str, value: float, labels: tuple) -> None:
+        """Log a histogram observation."""
+        self.logger.log(self.level, json.dumps({'metric': name, 'type': 'histogram', 'value': value} | dict(labels)))
+
+
+def format_labels(labels: tuple) -> str:
+    """Format labels as in the Prometheus text exposition format, e.g. {stage="decode"}."""
+
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+def enable(*sinks) -> None:
+    """Enable recording of metrics into the given sinks (in addition to the already enabled ones)."""
+    SINKS.extend(sinks)
+
+
+def disable() -> None:
+    """Disable recording of metrics, removing all sinks."""
+    SINKS.clear()
+
+
+def increment(name: str, value: float = 1, **labels) -> None:
+    """Increment a counter in all enabled sinks."""
+
+    for sink in SINKS:
+        sink.increment(name, value, tuple(sorted(labels.items())))
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """Add an observation to a histogram in all enabled sinks."""
+
+    for sink in SINKS:
+        sink.observe(name, value, tuple(sorted(labels.items())))
+
+
+def instrument(stage: str, rows=None):
+    """Decorator recording latency (and processed rows) of every call of a function as stage.
+
+    :param str stage: name of the stage
+    :param rows: function getting the number of processed rows from the result and the arguments of the call, if any
+    :return: decorator
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not SINKS:
+                return function(*args, **kwargs)
+
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            observe('openmeteo_stage_seconds', time.perf_counter() - start, stage=stage)
+            if rows is not None:
+                increment('openmeteo_stage_rows_total', rows(result, *args, **kwargs), stage=stage)
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def record_response(response: requests.Response, *args, **kwargs) -> None:
+    """Response hook of the cached session, recording transferred bytes, cache hits/misses and retries.
+
+    :param requests.Response response: response of a request
+    """
+
+    # hooks are called a first time by requests itself and a second time by requests_cache, which sets from_cache
+    if not SINKS or not hasattr(response, 'from_cache'):
+        return
+
+    cache = 'hit' if response.from_cache else 'miss'
+    increment('openmeteo_http_requests_total', cache=cache)
+    increment('openmeteo_http_bytes_total', len(response.content), cache=cache)
+
+    retries = getattr(getattr(response.raw, 'retries', None), 'history', None)
+    if retries:
+        increment('openmeteo_http_retries_total', len(retries))
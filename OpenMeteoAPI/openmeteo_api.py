@@ -1,27 +1,164 @@
 # code generated and modified from https://open-meteo.com/en/docs
+from __future__ import annotations
+
 import datetime
-import requests_cache
 
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+import numpy as np
 
+from OpenMeteoAPI.archive import LocalArchive
+from OpenMeteoAPI.cache_policy import ARCHIVE_LAG, CachePolicy
+from OpenMeteoAPI.metrics import instrument, record_response
+from openmeteo_sdk.Model import Model
+from openmeteo_sdk.VariablesWithTime import VariablesWithTime
+from openmeteo_sdk.VariableWithValues import VariableWithValues
 from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
 from openmeteo_requests import Client
-from retry_requests import retry
+
+if TYPE_CHECKING:  # pandas is imported on first use, it is not needed for tm2 exports (see get_hourly_columns)
+    import pandas as pd
 
 # API URLs
 URL_forecast = "https://api.open-meteo.com/v1/forecast"
 URL_historical = "https://archive-api.open-meteo.com/v1/archive"
+URL_ensemble = "https://ensemble-api.open-meteo.com/v1/ensemble"
+
+# model names, with their value in responses (WeatherApiResponse.Model) as key
+MODEL_NAMES = {value: name for name, value in vars(Model).items() if not name.startswith('_')}
+
+# limits of multi-location requests
+MAX_LOCATIONS = 100  # maximum number of locations per request
+MAX_URL_LENGTH = 8000  # maximum number of characters of a request URL
+
+
+class ReorderedVariables(VariablesWithTime):
+    def __init__(self, section: VariablesWithTime, order: list[int]) -> None:
+        """Initialize view of a section (VariablesWithTime) of an OpenMeteo API response with reordered variables.
+
+        :param section: section of the response, e.g. response.Hourly()
+        :param list order: index of the current variable, for every position of the new order (the ensemble members
+            of a variable are consecutive and moved together)
+        """
+        self.Init(section._tab.Bytes, section._tab.Pos)
+        self.order = order
+
+    def Variables(self, j: int) -> VariableWithValues | None:
+        """Get the variable at position j of the new order."""
+
+        members = self.VariablesLength() // len(self.order)  # consecutive entries per variable
+        variable, member = divmod(j, members)
+        return super().Variables(self.order[variable] * members + member)
+
+
+class ReorderedResponse(WeatherApiResponse):
+    def __init__(self, response: WeatherApiResponse, order: list[int]) -> None:
+        """Initialize view of an OpenMeteo API response with reordered hourly variables, sharing its raw data.
+
+        :param response: response from OpenMeteo API
+        :param list order: index of the current variable, for every position of the new order
+        """
+        self.Init(response._tab.Bytes, response._tab.Pos)
+        self.order = order
+
+    def Hourly(self) -> ReorderedVariables | None:
+        """Get the hourly data, with the variables in the new order."""
+
+        hourly = super().Hourly()
+        return None if hourly is None else ReorderedVariables(hourly, self.order)
 
 
 class OpenMeteoClient(Client):
     """OpenMeteo API Client."""
 
-    def __init__(self):
-        """Set up the Open-Meteo API client with cache and retry on error."""
-        cache_session = requests_cache.CachedSession('.cache', expire_after=3600)
+    def __init__(self, cache_name: str = '.cache', expire_after: int = 3600, url_forecast: str = URL_forecast,
+                 url_historical: str = URL_historical, archive_lag: int = ARCHIVE_LAG,
+                 max_cache_size: int | None = None, url_ensemble: str = URL_ensemble):
+        """Set up the Open-Meteo API client with cache and retry on error.
+
+        Cached responses expire according to a CachePolicy: historical data ending before the archive lag never expires,
+        forecast and ensemble data expires with the next model run and anything else after expire_after.
+
+        :param str cache_name: path of the cache database
+        :param int expire_after: time after which cached responses expire, in seconds (see CachePolicy)
+        :param str url_forecast: URL of the forecast API
+        :param str url_historical: URL of the historical weather API
+        :param int archive_lag: delay after which historical data is final, in days
+        :param int | None max_cache_size: maximum size of the cached responses in bytes (least recently used responses
+            are removed), unlimited if None
+        :param str url_ensemble: URL of the ensemble API
+        """
+        from retry_requests import retry
+
+        from OpenMeteoAPI.cached_session import PolicyCachedSession
+
+        policy = CachePolicy(url_forecast, url_historical, expire_after=expire_after, archive_lag=archive_lag,
+                             url_ensemble=url_ensemble)
+        cache_session = PolicyCachedSession(cache_name, policy, max_size=max_cache_size, expire_after=expire_after)
+        cache_session.hooks['response'].append(record_response)  # metrics of transferred data, if enabled
         retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
         super().__init__(session=retry_session)
 
+        self.url_forecast = url_forecast
+        self.url_historical = url_historical
+        self.url_ensemble = url_ensemble
+        self.archive_lag = archive_lag
+
+    @instrument('request')
+    def weather_api(self, url: str, params: any, method: str = "GET", verify: bool | str | None = None
+                    ) -> list[WeatherApiResponse]:
+        """Send request to OpenMeteo API and decode the responses (instrumented, see OpenMeteoAPI.metrics).
+
+        Hourly variables are always requested in sorted order, so that requests only differing in the order of the
+        variables share the same cache entry. The variables of the responses are put back into the requested order.
+        The parameters are copied, the parameters of the caller are left unchanged.
+
+        :param str url: API URL
+        :param params: parameters (see OpenMeteo API doc)
+        :param str method: HTTP method
+        :param bool | str | None verify: TLS verification (see requests)
+        :return: OpenMeteo API responses, one per location and model
+        """
+
+        params, order = self.sort_hourly(dict(params))  # the client adds the format to the parameters
+        responses = super().weather_api(url, params, method=method, verify=verify)
+        return self.reorder_hourly(responses, order) if order else responses
+
+    @staticmethod
+    def sort_hourly(params: dict) -> (dict, list[int] | None):
+        """Sort the hourly variables of the request parameters.
+
+        :param dict params: parameters (see OpenMeteo API doc)
+        :return:
+            - params - parameters with sorted hourly variables
+            - order - index of the sorted variable for every requested variable (see reorder_hourly), None if the
+              variables are already sorted
+        """
+
+        variables = params.get('hourly')
+        variables = variables.split(',') if isinstance(variables, str) else variables
+        if not isinstance(variables, (list, tuple)) or list(variables) == sorted(variables) \
+                or len(set(variables)) != len(variables):
+            return params, None
+
+        ordered = sorted(variables)
+        return params | {'hourly': ordered}, [ordered.index(variable) for variable in variables]
+
+    @staticmethod
+    def reorder_hourly(responses: list[WeatherApiResponse], order: list[int]) -> list[ReorderedResponse]:
+        """Reorder the hourly variables of OpenMeteo API responses.
+
+        Nothing is copied, the responses are wrapped so that their hourly variables are read in the new order (see
+        ReorderedResponse). The ensemble members of a variable (see get_ensemble) are moved together.
+
+        :param list responses: responses from OpenMeteo API
+        :param list order: index of the current variable, for every position of the new order
+        :return: responses with reordered hourly variables
+        """
+
+        return [ReorderedResponse(response, order) for response in responses]
+
     def request_historical_data(self, params: dict, year: int) -> WeatherApiResponse:
         """Send request for historical data of a given year to OpenMeteo API.
 
@@ -30,21 +167,73 @@ class OpenMeteoClient(Client):
         :return: OpenMeteo API response
         """
 
-        # if data from current year is requested, limit to current day instead of whole year
-        if year == datetime.date.today().year:
-            end_date = str(datetime.date.today())
-        else:
-            end_date = f'{year}-12-31'
-
-        # add start and end date of historical dataset
-        params = params | {'start_date': f'{year}-01-01', 'end_date': end_date}
-
         # get response
-        responses = self.weather_api(URL_historical, params=params)
+        responses = self.weather_api(self.url_historical, params=self.get_historical_params(params, year))
         response = responses[0]
 
         return response
 
+    def request_historical_range(self, params: dict, years: list[int], max_workers: int = 8
+                                 ) -> dict[int, WeatherApiResponse]:
+        """Send concurrent requests for historical data of multiple years to OpenMeteo API.
+
+        Every year is requested separately through request_historical_data, sharing the cached session with retry on
+        error, with at most max_workers requests being sent at the same time.
+
+        :param dict params: parameters (see OpenMeteo API doc)
+        :param list years: years of requested historical datasets
+        :param int max_workers: maximum number of concurrent requests
+        :return: OpenMeteo API responses, with year as key
+        """
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {_year: executor.submit(self.request_historical_data, params, _year) for _year in years}
+
+        return {_year: futures[_year].result() for _year in years}
+
+    def request_historical_sites(self, params: dict, sites: dict, year: int, **kwargs) -> dict[str, WeatherApiResponse]:
+        """Send multi-location requests for historical data of a given year to OpenMeteo API.
+
+        :param dict params: parameters (see OpenMeteo API doc), without latitude and longitude
+        :param dict sites: site coordinates as (latitude, longitude), with site name as key
+        :param int year: year of requested historical datasets
+        :param kwargs: limits of multi-location requests (see request_model_sites)
+        :return: OpenMeteo API responses, with site name as key
+        """
+
+        return self.request_sites(self.url_historical, self.get_historical_params(params, year), sites, **kwargs)
+
+    def update_archive(self, params: dict, start_date: datetime.date, end_date: datetime.date, archive: LocalArchive,
+                       max_workers: int = 8) -> int:
+        """Request historical data missing in a local archive from OpenMeteo API and write it into the archive.
+
+        Only the date ranges not yet covered by the archive are requested (concurrently), e.g. a daily refresh only
+        requests the days since the last refresh. Requested dates without data are not requested again, unless they
+        are within the archive lag (see LocalArchive.write_response).
+
+        :param dict params: parameters (see OpenMeteo API doc)
+        :param datetime.date start_date: first date of the requested period
+        :param datetime.date end_date: last date of the requested period (included)
+        :param LocalArchive archive: local archive
+        :param int max_workers: maximum number of concurrent requests
+        :return: number of requests sent
+        """
+
+        missing_dates = archive.get_missing_dates(params, start_date, end_date)
+
+        def request_dates(dates: tuple[datetime.date, datetime.date]) -> WeatherApiResponse:
+            dates_params = params | {'start_date': str(dates[0]), 'end_date': str(dates[1])}
+            return self.weather_api(self.url_historical, params=dates_params)[0]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            responses = list(executor.map(request_dates, missing_dates))
+
+        final_date = datetime.date.today() - datetime.timedelta(days=self.archive_lag)
+        for response in responses:
+            archive.write_response(params, response, final_date=final_date)
+
+        return len(missing_dates)
+
     def request_forecast_data(self, params: dict) -> WeatherApiResponse:
         """Send request for forecast data to OpenMeteo API.
 
@@ -53,11 +242,159 @@ class OpenMeteoClient(Client):
         """
 
         # get response
-        responses = self.weather_api(URL_forecast, params=params)
+        responses = self.weather_api(self.url_forecast, params=params)
         response = responses[0]
 
         return response
 
+    def request_forecast_sites(self, params: dict, sites: dict, **kwargs) -> dict[str, WeatherApiResponse]:
+        """Send multi-location requests for forecast data to OpenMeteo API.
+
+        :param dict params: parameters (see OpenMeteo API doc), without latitude and longitude
+        :param dict sites: site coordinates as (latitude, longitude), with site name as key
+        :param kwargs: limits of multi-location requests (see request_model_sites)
+        :return: OpenMeteo API responses, with site name as key
+        """
+
+        return self.request_sites(self.url_forecast, params, sites, **kwargs)
+
+    def request_ensemble_data(self, params: dict) -> list[WeatherApiResponse]:
+        """Send request for ensemble forecast data to OpenMeteo API.
+
+        :param dict params: parameters (see OpenMeteo API doc), with one or more ensemble models
+        :return: OpenMeteo API responses, one per model (see get_ensemble)
+        """
+
+        return self.weather_api(self.url_ensemble, params=params)
+
+    def request_sites(self, url: str, params: dict, sites: dict, **kwargs) -> dict[str, WeatherApiResponse]:
+        """Send multi-location requests of a single model to OpenMeteo API (see request_model_sites).
+
+        :param str url: API URL
+        :param dict params: parameters (see OpenMeteo API doc), without latitude and longitude
+        :param dict sites: site coordinates as (latitude, longitude), with site name as key
+        :param kwargs: limits of multi-location requests (see request_model_sites)
+        :return: OpenMeteo API responses, with site name as key
+        """
+
+        if len(self.get_models(params)) != 1:
+            raise ValueError('request_sites expects a single model, use request_model_sites for multiple models')
+
+        site_responses = self.request_model_sites(url, params, sites, **kwargs)
+        return {name: responses[0] for name, responses in site_responses.items()}
+
+    def request_model_sites(self, url: str, params: dict, sites: dict, max_locations: int = MAX_LOCATIONS,
+                            max_url_length: int = MAX_URL_LENGTH, max_workers: int = 8
+                            ) -> dict[str, list[WeatherApiResponse]]:
+        """Send multi-location requests of one or more models to OpenMeteo API.
+
+        The sites are packed into as few requests as the limits allow, the requests are sent concurrently and every
+        response is mapped back to its site (OpenMeteo returns one response per location and model, the models of a
+        location being consecutive, in the requested order).
+
+        :param str url: API URL, e.g. of the ensemble API
+        :param dict params: parameters (see OpenMeteo API doc), without latitude and longitude
+        :param dict sites: site coordinates as (latitude, longitude), with site name as key
+        :param int max_locations: maximum number of locations per request
+        :param int max_url_length: maximum number of characters of a request URL
+        :param int max_workers: maximum number of concurrent requests
+        :return: OpenMeteo API responses of every model, with site name as key
+        """
+
+        chunks = self.get_site_chunks(url, params, sites, max_locations, max_url_length)
+        n_models = len(self.get_models(params))
+
+        def request_chunk(chunk: list[str]) -> list[WeatherApiResponse]:
+            responses = self.weather_api(url, params=params | self.get_location_params(sites, chunk))
+            if len(responses) != len(chunk) * n_models:
+                raise ValueError(f'expected {len(chunk) * n_models} responses from multi-location request, '
+                                 f'got {len(responses)}')
+            return responses
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            chunk_responses = list(executor.map(request_chunk, chunks))
+
+        return {name: responses[index * n_models:(index + 1) * n_models]
+                for chunk, responses in zip(chunks, chunk_responses) for index, name in enumerate(chunk)}
+
+    @staticmethod
+    def get_models(params: dict) -> list[str]:
+        """Get the requested models of the request parameters.
+
+        :param dict params: parameters (see OpenMeteo API doc)
+        :return: models, best_match if not given
+        """
+
+        models = params.get('models', 'best_match')
+        return models.split(',') if isinstance(models, str) else list(models)
+
+    @staticmethod
+    def get_historical_params(params: dict, year: int) -> dict:
+        """Add start and end date of a historical dataset of a given year to the request parameters.
+
+        :param dict params: parameters (see OpenMeteo API doc)
+        :param int year: year of requested historical dataset
+        :return: parameters including start and end date
+        """
+
+        # if data from current year is requested, limit to current day instead of whole year
+        if year == datetime.date.today().year:
+            end_date = str(datetime.date.today())
+        else:
+            end_date = f'{year}-12-31'
+
+        return params | {'start_date': f'{year}-01-01', 'end_date': end_date}
+
+    @staticmethod
+    def get_location_params(sites: dict, names: list[str]) -> dict:
+        """Get comma-separated latitude and longitude parameters of multiple sites.
+
+        :param dict sites: site coordinates as (latitude, longitude), with site name as key
+        :param list names: names of the sites to be included
+        :return: latitude and longitude parameters
+        """
+
+        return {
+            'latitude': ','.join(str(sites[name][0]) for name in names),
+            'longitude': ','.join(str(sites[name][1]) for name in names),
+        }
+
+    @classmethod
+    def get_site_chunks(cls, url: str, params: dict, sites: dict, max_locations: int = MAX_LOCATIONS,
+                        max_url_length: int = MAX_URL_LENGTH) -> list[list[str]]:
+        """Split sites into chunks of multi-location requests.
+
+        Sites are added to a chunk as long as neither the number of locations nor the length of the resulting request
+        URL exceed the limits. A single site exceeding the URL length limit still gets its own request.
+
+        :param str url: API URL
+        :param dict params: parameters (see OpenMeteo API doc), without latitude and longitude
+        :param dict sites: site coordinates as (latitude, longitude), with site name as key
+        :param int max_locations: maximum number of locations per request
+        :param int max_url_length: maximum number of characters of a request URL
+        :return: lists of site names, one per request
+        """
+
+        params = params | {'format': 'flatbuffers'}  # added by the client on every request
+
+        import requests
+
+        def url_length(names: list[str]) -> int:
+            request = requests.Request('GET', url, params=params | cls.get_location_params(sites, names))
+            return len(request.prepare().url)
+
+        chunks = []
+        chunk = []
+        for name in sites:
+            if chunk and (len(chunk) >= max_locations or url_length(chunk + [name]) > max_url_length):
+                chunks.append(chunk)
+                chunk = []
+            chunk.append(name)
+        if chunk:
+            chunks.append(chunk)
+
+        return chunks
+
     @staticmethod
     def print_response(response: WeatherApiResponse) -> None:
         """Print OpenMeteo API response.
@@ -71,26 +408,254 @@ class OpenMeteoClient(Client):
         print(f"Timezone difference to GMT+0 {response.UtcOffsetSeconds()} s")
 
     @staticmethod
-    def get_hourly_df(response: WeatherApiResponse, variables: list[str]) -> pd.DataFrame:
-        """Get hourly values from OpenMeteo API response.
+    def get_hourly_time(response: WeatherApiResponse) -> pd.DatetimeIndex:
+        """Get timestamps of the hourly values of an OpenMeteo API response, in local time.
 
         :param response: response from OpenMeteo API
-        :param list variables: list of variables passed to the OpenMeteo API
-        :return: hourly data as dict
+        :return: timestamps
         """
 
+        import pandas as pd
+
         hourly = response.Hourly()
 
-        # create date column
-        time_data = pd.date_range(
+        return pd.date_range(
             start=pd.to_datetime(hourly.Time() + response.UtcOffsetSeconds(), unit="s", utc=True, ),
             end=pd.to_datetime(hourly.TimeEnd() + response.UtcOffsetSeconds(), unit="s", utc=True),
             freq=pd.Timedelta(seconds=hourly.Interval()),
             inclusive="left")
-        hourly_data = {"date": time_data}
 
-        # save hourly data into dictionary
-        for index, variable in enumerate(variables):
-            hourly_data[variable] = hourly.Variables(index).ValuesAsNumpy()
+    @staticmethod
+    def get_section_values(section, variables: list[str]) -> np.ndarray:
+        """Get the values of a section (hourly or minutely_15) of an OpenMeteo API response as a single 2-D array.
+
+        The values of every variable are copied once, straight from the FlatBuffer vector into a contiguous block of
+        shape (variables, time). The returned array is its transposed view, with one column per variable.
+
+        :param section: section of the response (VariablesWithTime), e.g. response.Hourly()
+        :param list variables: list of variables of the section passed to the OpenMeteo API
+        :return: values, as float32 array of shape (time, variables)
+        """
+
+        length = section.Variables(0).ValuesLength() if variables else 0
+
+        block = np.empty((len(variables), length), dtype=np.float32)
+        for index in range(len(variables)):
+            block[index] = section.Variables(index).ValuesAsNumpy()
+
+        return block.T
+
+    @staticmethod
+    def get_section_dates(section, utc_offset_seconds: int) -> np.ndarray:
+        """Get the timestamps of a section (hourly or minutely_15) of an OpenMeteo API response, in local time.
+
+        :param section: section of the response (VariablesWithTime), e.g. response.Hourly()
+        :param int utc_offset_seconds: UTC offset of the response
+        :return: timestamps as datetime64 array
+        """
+
+        return np.arange(section.Time() + utc_offset_seconds, section.TimeEnd() + utc_offset_seconds,
+                         section.Interval()).astype('datetime64[s]')
+
+    @classmethod
+    def get_hourly_values(cls, response: WeatherApiResponse, variables: list[str]) -> np.ndarray:
+        """Get hourly values from OpenMeteo API response as a single 2-D array (see get_section_values).
+
+        :param response: response from OpenMeteo API
+        :param list variables: list of variables passed to the OpenMeteo API
+        :return: hourly values, as float32 array of shape (time, variables)
+        """
+
+        return cls.get_section_values(response.Hourly(), variables)
+
+    @classmethod
+    def get_hourly_dates(cls, response: WeatherApiResponse) -> np.ndarray:
+        """Get timestamps of the hourly values of an OpenMeteo API response, in local time, without pandas.
+
+        :param response: response from OpenMeteo API
+        :return: timestamps as datetime64 array
+        """
+
+        return cls.get_section_dates(response.Hourly(), response.UtcOffsetSeconds())
+
+    @classmethod
+    @instrument('decode', rows=lambda columns, *args, **kwargs: len(columns['date']))
+    def get_hourly_columns(cls, response: WeatherApiResponse, variables: list[str]) -> dict:
+        """Get hourly values from OpenMeteo API response as NumPy arrays, without pandas.
+
+        Lighter alternative to get_hourly_df, e.g. for tm2 exports (see ColumnarTMY2.export_from_openmeteo_df), which
+        also accept dicts of arrays.
+
+        :param response: response from OpenMeteo API
+        :param list variables: list of variables passed to the OpenMeteo API
+        :return: hourly data as dict, with date (timestamps as datetime64 array, see get_hourly_dates) and variables as
+            keys
+        """
+
+        values = cls.get_hourly_values(response, variables)
+        columns = {'date': cls.get_hourly_dates(response)}
+        columns.update({variable: values[:, index] for index, variable in enumerate(variables)})
+
+        return columns
+
+    @classmethod
+    @instrument('decode', rows=lambda df, *args, **kwargs: len(df))
+    def get_hourly_df(cls, response: WeatherApiResponse, variables: list[str], date: bool = True,
+                      copy: bool = True) -> pd.DataFrame:
+        """Get hourly values from OpenMeteo API response.
+
+        By default, the values are copied once into a single block (see get_hourly_values) and wrapped in a DataFrame
+        without further copies. Without copy, the columns are read-only views of the FlatBuffer vectors, so that no
+        memory is allocated for the values at all (the response must be kept alive as long as the DataFrame is used).
+
+        Creating the date column can be skipped if the timestamps are not needed, they can still be created later on
+        with get_hourly_time.
+
+        :param response: response from OpenMeteo API
+        :param list variables: list of variables passed to the OpenMeteo API
+        :param bool date: add date column with the timestamps of the values
+        :param bool copy: copy the values into a writable block, otherwise use read-only views of the response
+        :return: hourly data as DataFrame
+        """
+
+        import pandas as pd
+
+        if copy:
+            df = pd.DataFrame(cls.get_hourly_values(response, variables), columns=variables, copy=False)
+        else:
+            hourly = response.Hourly()
+            df = pd.DataFrame({variable: hourly.Variables(index).ValuesAsNumpy()
+                               for index, variable in enumerate(variables)}, copy=False)
+
+        # create date column
+        if date:
+            df.insert(0, 'date', cls.get_hourly_time(response))
+
+        return df
+
+    @classmethod
+    def get_hourly_dfs(cls, responses: dict, variables: list[str]) -> dict[str, pd.DataFrame]:
+        """Get hourly values from multiple OpenMeteo API responses.
+
+        :param dict responses: responses from OpenMeteo API, e.g. with site name as key
+        :param list variables: list of variables passed to the OpenMeteo API
+        :return: hourly data as DataFrames, with the same keys as the responses
+        """
+
+        return {key: cls.get_hourly_df(responses[key], variables) for key in responses}
+
+    @staticmethod
+    def get_member_count(section, variables: list[str]) -> int:
+        """Get the number of ensemble members of a section of an OpenMeteo API response.
+
+        :param section: section of the response (VariablesWithTime), e.g. response.Hourly()
+        :param list variables: list of variables of the section passed to the OpenMeteo API
+        :return: number of members per variable, 1 for deterministic models
+        """
+
+        count = section.VariablesLength()
+        if not variables or count % len(variables):
+            raise ValueError(f'{count} values do not match {len(variables)} variables')
+
+        return count // len(variables)
+
+    @classmethod
+    def get_ensemble_values(cls, responses: list[WeatherApiResponse], variables: list[str]
+                            ) -> (np.ndarray, list[tuple[str, int]]):
+        """Get the hourly values of all ensemble members of multiple OpenMeteo API responses as a single 3-D array.
+
+        The responses (e.g. of the models of a multi-model or ensemble request) must share the same timestamps. The
+        members of a variable are consecutive in a response, as returned by the ensemble API. The values of every member
+        are copied once into a contiguous block of shape (members, variables, time), the returned array is its view of
+        shape (members, time, variables).
+
+        :param list responses: responses from OpenMeteo API
+        :param list variables: list of variables passed to the OpenMeteo API
+        :return:
+            - values - hourly values, as float32 array of shape (members, time, variables)
+            - members - model name and member number of every member (the member of deterministic models is 0)
+        """
+
+        if not responses:
+            raise ValueError('at least one response is required')
+
+        sections = [response.Hourly() for response in responses]
+        axes = {(section.Time(), section.TimeEnd(), section.Interval()) for section in sections}
+        if len(axes) > 1:
+            raise ValueError('responses with different timestamps cannot be combined')
+
+        counts = [cls.get_member_count(section, variables) for section in sections]
+        block = np.empty((sum(counts), len(variables), sections[0].Variables(0).ValuesLength()), dtype=np.float32)
+
+        members = []
+        for response, section, count in zip(responses, sections, counts):
+            numbers = np.empty((len(variables), count), dtype=np.int64)
+            for index in range(section.VariablesLength()):
+                variable, member = divmod(index, count)
+                values = section.Variables(index)
+                block[len(members) + member, variable] = values.ValuesAsNumpy()
+                numbers[variable, member] = values.EnsembleMember()
+            if (numbers != numbers[0]).any():
+                raise ValueError('members of every variable must be consecutive and in the same order')
+
+            model = MODEL_NAMES.get(response.Model(), str(response.Model()))
+            members += [(model, int(number)) for number in numbers[0]]
+
+        return block.transpose(0, 2, 1), members
+
+    @classmethod
+    @instrument('decode', rows=lambda ensemble, *args, **kwargs: ensemble['values'].shape[1])
+    def get_ensemble(cls, responses: list[WeatherApiResponse], variables: list[str]) -> dict:
+        """Get the hourly values of all ensemble members and models of OpenMeteo API responses, e.g. of an ensemble
+        request (see request_ensemble_data) or of a multi-model request of a site (see request_model_sites).
+
+        :param list responses: responses from OpenMeteo API, with the same timestamps
+        :param list variables: list of variables passed to the OpenMeteo API
+        :return: ensemble as dict, with date (timestamps as datetime64 array, see get_hourly_dates), variables, members
+            (model and member number of every member) and values (float32 array of shape (members, time, variables),
+            see get_ensemble_values) as keys
+        """
+
+        values, members = cls.get_ensemble_values(responses, variables)
+
+        return {'date': cls.get_hourly_dates(responses[0]), 'variables': list(variables), 'members': members,
+                'values': values}
+
+    @classmethod
+    @instrument('decode', rows=lambda columns, *args, **kwargs: len(columns['date']))
+    def get_minutely_15_columns(cls, response: WeatherApiResponse, variables: list[str]) -> dict:
+        """Get 15-minutely values from OpenMeteo API response as NumPy arrays (see get_hourly_columns).
+
+        Values of a timestamp refer to the preceding 15 minutes (sums and means) or to the timestamp itself
+        (instantaneous values), they can be aggregated into hourly values with OpenMeteoAPI.resample.resample_columns.
+
+        :param response: response from OpenMeteo API
+        :param list variables: list of minutely_15 variables passed to the OpenMeteo API
+        :return: 15-minutely data as dict, with date (timestamps as datetime64 array) and variables as keys
+        """
+
+        minutely_15 = response.Minutely15()
+        if minutely_15 is None:
+            raise ValueError('response without minutely_15 data, request the variables with "minutely_15"')
+
+        values = cls.get_section_values(minutely_15, variables)
+        columns = {'date': cls.get_section_dates(minutely_15, response.UtcOffsetSeconds())}
+        columns.update({variable: values[:, index] for index, variable in enumerate(variables)})
+
+        return columns
+
+    @classmethod
+    def get_minutely_15_df(cls, response: WeatherApiResponse, variables: list[str]) -> pd.DataFrame:
+        """Get 15-minutely values from OpenMeteo API response, in the format of get_hourly_df.
+
+        :param response: response from OpenMeteo API
+        :param list variables: list of minutely_15 variables passed to the OpenMeteo API
+        :return: 15-minutely data as DataFrame
+        """
+
+        import pandas as pd
+
+        columns = cls.get_minutely_15_columns(response, variables)
+        columns['date'] = pd.DatetimeIndex(columns['date'].astype('datetime64[ns]'), tz='UTC')
 
-        return pd.DataFrame(hourly_data)
+        return pd.DataFrame(columns)
@@ -0,0 +1,150 @@
+import threading
+import time
+
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from queue import Queue
+
+from OpenMeteoAPI.calendar_utils import drop_leap_days
+from OpenMeteoAPI.export import export_csv, export_tm2
+from OpenMeteoAPI.openmeteo_api import OpenMeteoClient, ReorderedResponse
+from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+
+
+def export_job(payload: bytes, position: int, variables: list[str], year: int, path: str,
+               order: list[int] | None = None) -> (int, float):
+    """Decode an OpenMeteo API response and export it as tm2 and csv file (runs in a worker process).
+
+    :param bytes payload: raw response data
+    :param int position: position of the response within the raw data
+    :param list variables: list of variables passed to the OpenMeteo API
+    :param int year: year of the historical dataset
+    :param str path: export path without file extension
+    :param list | None order: order of the hourly variables of the response (see OpenMeteoClient.reorder_hourly)
+    :return:
+        - rows - number of exported rows
+        - seconds - processing time
+    """
+
+    start = time.perf_counter()
+
+    response = WeatherApiResponse()
+    response.Init(payload, position)
+    if order:
+        response = ReorderedResponse(response, order)
+
+    df = OpenMeteoClient.get_hourly_df(response, variables)
+
+    # remove leap day during leap years
+    df = drop_leap_days(df)
+
+    export_tm2(df, response, path + '.tm2')
+    export_csv(df, variables, path + '.csv')
+
+    return len(df), time.perf_counter() - start
+
+
+def run_pipeline(jobs: list[tuple[str, int, str]], sites: dict, params: dict, path: str,
+                 client: OpenMeteoClient | None = None, fetch_workers: int = 8, export_workers: int | None = None,
+                 queue_size: int = 16) -> dict:
+    """Fetch and export historical data of multiple sites, years and models in parallel.
+
+    Responses are fetched on a thread pool and put into a bounded queue, from which they are passed on to a process
+    pool for decoding and tm2/csv export. Fetching blocks as long as the queue is full and at most queue_size exports
+    are pending at a time, so that memory usage stays capped regardless of the number of jobs. Failing jobs do not stop
+    the pipeline, they are reported with their error in the statistics.
+
+    As the exports run in separate processes, the calling script has to be guarded by "if __name__ == '__main__'".
+
+    :param list jobs: jobs as (site name, year, model)
+    :param dict sites: site coordinates as (latitude, longitude), with site name as key
+    :param dict params: parameters (see OpenMeteo API doc), without latitude, longitude and models
+    :param str path: export path without file extension, "{site}", "{year}" and "{model}" are replaced accordingly
+    :param OpenMeteoClient | None client: OpenMeteo API client, a new one is created if None
+    :param int fetch_workers: number of threads fetching responses
+    :param int | None export_workers: number of processes exporting responses, number of CPUs if None
+    :param int queue_size: maximum number of fetched responses waiting for export
+    :return: throughput statistics per stage, failed jobs with their error
+    """
+
+    client = client or OpenMeteoClient()
+    variables = params['hourly']
+    variables = variables.split(',') if isinstance(variables, str) else list(variables)
+    queue = Queue(maxsize=queue_size)
+    lock = threading.Lock()
+    stats = {stage: {'jobs': 0, 'rows': 0, 'busy_seconds': 0.} for stage in ['fetch', 'export']}
+    stats['failed'] = []
+
+    def fetch(job: tuple[str, int, str]) -> None:
+        site, year, model = job
+        start = time.perf_counter()
+        try:
+            job_params = params | {'latitude': sites[site][0], 'longitude': sites[site][1], 'models': model}
+            response = client.request_historical_data(job_params, year)
+            item = (job, response._tab.Bytes, response._tab.Pos, getattr(response, 'order', None))
+            rows = response.Hourly().Variables(0).ValuesLength() if variables else 0
+        except Exception as e:  # passed on, so that the consumer does not wait for a response which never comes
+            item = (job, e, None, None)
+            rows = 0
+        with lock:
+            stats['fetch']['busy_seconds'] += time.perf_counter() - start
+            stats['fetch']['rows'] += rows
+        queue.put(item)
+
+    def collect(futures: dict, return_when: str) -> None:
+        done, _ = wait(futures, return_when=return_when)
+        for future in done:
+            try:
+                rows, seconds = future.result()
+                stats['export']['rows'] += rows
+                stats['export']['busy_seconds'] += seconds
+                stats['export']['jobs'] += 1
+            except Exception as e:
+                stats['failed'].append((futures[future], repr(e)))
+            del futures[future]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetchers, \
+            ProcessPoolExecutor(max_workers=export_workers) as exporters:
+        for job in jobs:
+            fetchers.submit(fetch, job)
+
+        pending = {}
+        for _ in range(len(jobs)):
+            job, payload, position, order = queue.get()
+            if isinstance(payload, Exception):
+                stats['failed'].append((job, repr(payload)))
+                continue
+            stats['fetch']['jobs'] += 1
+
+            # wait for exports to finish if too many are pending
+            while len(pending) >= queue_size:
+                collect(pending, FIRST_COMPLETED)
+
+            site, year, model = job
+            export_path = path.format(site=site, year=year, model=model)
+            pending[exporters.submit(export_job, payload, position, variables, year, export_path, order)] = job
+
+        collect(pending, ALL_COMPLETED)
+
+    # throughput of every stage, relative to the wall time of the whole pipeline
+    seconds = time.perf_counter() - start
+    for stage in ['fetch', 'export']:
+        stats[stage]['jobs_per_second'] = stats[stage]['jobs'] / seconds
+        stats[stage]['rows_per_second'] = stats[stage]['rows'] / seconds
+    stats['seconds'] = seconds
+
+    return stats
+
+
+def print_stats(stats: dict) -> None:
+    """Print throughput statistics of a pipeline run.
+
+    :param dict stats: throughput statistics per stage (see run_pipeline)
+    """
+
+    print(f"Pipeline finished in {stats['seconds']:.2f} s")
+    for stage in ['fetch', 'export']:
+        print(f"{stage}: {stats[stage]['jobs']} jobs ({stats[stage]['jobs_per_second']:.2f} jobs/s, "
+              f"{stats[stage]['rows_per_second']:.0f} rows/s, {stats[stage]['busy_seconds']:.2f} s busy)")
+    for job, error in stats['failed']:
+        print(f"failed: {job} ({error})")
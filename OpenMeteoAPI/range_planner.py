@@ -0,0 +1,109 @@
+"""Planning and fetching of historical data over arbitrary periods.
+
+A period is split into chunks of whole calendar years, as many years per chunk as fit into the payload limit for the
+requested number of variables. The chunks are requested concurrently and their values are written straight into one
+preallocated block. Example:
+
+    df, response = request_period(client, params, datetime.date(1940, 1, 1), datetime.date.today())
+"""
+import datetime
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from OpenMeteoAPI.archive import LocalArchive, date_hour
+from OpenMeteoAPI.calendar_utils import leap_day_mask
+from OpenMeteoAPI.openmeteo_api import OpenMeteoClient
+from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+
+# maximum number of values (hours x variables) per request, about 2 MB of payload
+MAX_CHUNK_VALUES = 500_000
+
+
+def plan_chunks(start_date: datetime.date, end_date: datetime.date, n_variables: int,
+                max_values: int = MAX_CHUNK_VALUES) -> list[tuple[datetime.date, datetime.date]]:
+    """Split a period into chunks of whole calendar years fitting into the payload limit.
+
+    Chunks start on January 1st (except the first one), so that the same chunks are requested for overlapping periods
+    and can be served from the cache. A chunk covers at least one year, even if it exceeds the limit.
+
+    :param datetime.date start_date: first date of the period
+    :param datetime.date end_date: last date of the period (included)
+    :param int n_variables: number of requested variables
+    :param int max_values: maximum number of values (hours x variables) per chunk
+    :return: chunks as (first date, last date)
+    """
+
+    years = max(max_values // (366 * 24 * max(n_variables, 1)), 1)
+
+    chunks = []
+    for year in range(start_date.year, end_date.year + 1, years):
+        first_date = max(start_date, datetime.date(year, 1, 1))
+        last_date = min(end_date, datetime.date(year + years - 1, 12, 31))
+        chunks.append((first_date, last_date))
+
+    return chunks
+
+
+def request_period(client: OpenMeteoClient, params: dict, start_date: datetime.date, end_date: datetime.date,
+                   max_values: int = MAX_CHUNK_VALUES, max_workers: int = 8, leap_days: bool = True
+                   ) -> (pd.DataFrame, WeatherApiResponse):
+    """Request hourly historical data of a period from OpenMeteo API, in concurrent chunks (see plan_chunks).
+
+    The values of every chunk are copied once, from the FlatBuffer vectors into a block preallocated for the whole
+    period, at the position given by the local time of the chunk. Hours not returned by the API are NaN. Leap days are
+    removed from the values while copying, the positions of the following values being shifted accordingly, so that
+    the result does not depend on the chunk boundaries.
+
+    :param OpenMeteoClient client: OpenMeteo API client
+    :param dict params: parameters (see OpenMeteo API doc), without start and end date
+    :param datetime.date start_date: first date of the period
+    :param datetime.date end_date: last date of the period (included)
+    :param int max_values: maximum number of values (hours x variables) per request
+    :param int max_workers: maximum number of concurrent requests
+    :param bool leap_days: keep February 29th, otherwise the leap days are removed
+    :return:
+        - df - hourly data, in the format of OpenMeteoClient.get_hourly_df
+        - response - response of the first chunk, e.g. for location information
+    """
+
+    variables = LocalArchive.get_variables(params)
+    chunks = plan_chunks(start_date, end_date, len(variables), max_values)
+    start = date_hour(start_date)
+    hours = date_hour(end_date) + 24 - start
+
+    # target position of every hour of the period
+    keep = np.ones(hours, dtype=bool)
+    if not leap_days:
+        keep = ~leap_day_mask(np.datetime64(start_date, 'h') + np.arange(hours))
+    positions = np.cumsum(keep) - 1
+    block = np.full((len(variables), int(keep.sum())), np.nan, dtype=np.float32)
+
+    def fetch(chunk: tuple[datetime.date, datetime.date]) -> WeatherApiResponse:
+        chunk_params = params | {'start_date': str(chunk[0]), 'end_date': str(chunk[1])}
+        response = client.weather_api(client.url_historical, params=chunk_params)[0]
+
+        hourly = response.Hourly()
+        first = (hourly.Time() + response.UtcOffsetSeconds()) // 3600 - start
+        for index in range(len(variables)):
+            values = hourly.Variables(index).ValuesAsNumpy()
+            # clip to the period, e.g. if the API returns more than the requested days
+            _first, _last = max(first, 0), min(first + len(values), hours)
+            if _first >= _last:
+                continue
+            chunk_keep = keep[_first:_last]
+            target = positions[_first] if chunk_keep[0] else positions[_first] + 1
+            block[index, target:target + int(chunk_keep.sum())] = values[_first - first:_last - first][chunk_keep]
+
+        return response
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        responses = list(executor.map(fetch, chunks))
+
+    dates = pd.date_range(start=pd.Timestamp(start_date, tz='UTC'), periods=hours, freq='h')
+    df = pd.DataFrame(block.T, columns=variables, copy=False)
+    df.insert(0, 'date', dates if leap_days else dates[keep])
+
+    return df, responses[0]
@@ -0,0 +1,252 @@
+"""Continuous refresh of the forecast exports of a job manifest (see OpenMeteoAPI.batch).
+
+The forecast of a site and model is only requested once a new run of the model is expected to be available (see
+CachePolicy.get_last_run), and a unit is only exported again if its data has changed. Run from the directory the paths
+of the manifest refer to:
+
+    python -m OpenMeteoAPI.refresh manifest.json [--once] [--state refresh.json]
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from OpenMeteoAPI.batch import DEFAULTS, export_unit, get_forecast_days, get_forecast_unit_df, load_manifest, plan_tasks
+from OpenMeteoAPI.cache_policy import DO_NOT_CACHE, CachePolicy
+from OpenMeteoAPI.metrics import increment
+from OpenMeteoAPI.openmeteo_api import OpenMeteoClient
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+
+def get_task_key(task: dict) -> str:
+    """Get the key of a forecast task in the refresh state."""
+
+    params = task['params']
+    return f"{float(params['latitude']):.4f}_{float(params['longitude']):.4f}/{params['models']}/{params['timezone']}"
+
+
+def hash_frame(df: DataFrame) -> str:
+    """Get a hash of the dates and values of hourly data, to detect changed data."""
+
+    import numpy as np
+    import pandas as pd
+
+    digest = hashlib.sha1()
+    digest.update(pd.DatetimeIndex(df['date']).asi8.tobytes())
+    for column in df.columns.drop('date'):
+        digest.update(column.encode())
+        digest.update(np.ascontiguousarray(df[column].to_numpy()).tobytes())
+
+    return digest.hexdigest()
+
+
+class ForecastRefresher:
+    def __init__(self, manifest: dict, client: OpenMeteoClient | None = None, policy: CachePolicy | None = None,
+                 state_path: str | None = None, retry_interval: int = 600) -> None:
+        """Initialize refresh of the forecast units of a manifest.
+
+        The state (latest run and data hash of every unit) is kept in a JSON file, so that a restarted refresher does
+        not request runs it has already exported. A run which is due but whose data has not changed yet (e.g. published
+        later than its expected delay) is requested again after retry_interval, until new data is returned.
+
+        :param dict manifest: job manifest (see OpenMeteoAPI.batch.load_manifest), only forecast jobs are refreshed
+        :param OpenMeteoClient | None client: OpenMeteo API client, a new one without cache if None (the refresher
+            only requests data it expects to have changed)
+        :param CachePolicy | None policy: update cycle of the forecast models, with the default cycles if None
+        :param str | None state_path: path of the state file, "<checkpoint>.refresh" of the manifest if None (the
+            state is only kept in memory if the manifest has no checkpoint either)
+        :param int retry_interval: time after which a due run without new data is requested again, in seconds
+        """
+        self.manifest = DEFAULTS | manifest
+        self.client = client or OpenMeteoClient(cache_name=self.manifest['cache'],
+                                                expire_after=DO_NOT_CACHE)
+        self.policy = policy or CachePolicy(self.client.url_forecast, self.client.url_historical)
+        self.retry_interval = retry_interval
+        if state_path is None and self.manifest['checkpoint']:
+            state_path = self.manifest['checkpoint'] + '.refresh'
+        self.state_path = state_path
+
+        self.tasks = {get_task_key(task): task for task in plan_tasks(self.manifest) if task['type'] == 'forecast'}
+        self.state = self.read_state()  # {'run': run, 'retry': time, 'units': {unit id: hash}} with task key as key
+        self.lock = threading.Lock()
+
+    def read_state(self) -> dict:
+        """Read the refresh state, empty if there is no state file."""
+
+        if self.state_path is None or not os.path.isfile(self.state_path):
+            return {}
+        with open(self.state_path, 'r') as f:
+            return json.load(f)
+
+    def write_state(self) -> None:
+        """Write the refresh state (atomically, through a temporary file)."""
+
+        if self.state_path is None:
+            return
+        with self.lock:
+            with open(self.state_path + '.tmp', 'w') as f:
+                json.dump(self.state, f)
+        os.replace(self.state_path + '.tmp', self.state_path)
+
+    def get_run(self, task: dict, now: float) -> str:
+        """Get the latest available run of the models of a task, e.g. "icon_eu@1760767200".
+
+        :param dict task: forecast task (see OpenMeteoAPI.batch.plan_tasks)
+        :param float now: current time, as UNIX timestamp
+        :return: model and start time of the run, for every model
+        """
+
+        models = task['params']['models']
+        models = models.split(',') if isinstance(models, str) else models
+        return ','.join(f'{model}@{self.policy.get_last_run(model, now):.0f}' for model in models)
+
+    def is_due(self, key: str, now: float) -> bool:
+        """Check if the forecast of a task has to be requested: new run, or retry of a run without new data."""
+
+        state = self.state.get(key, {})
+        if state.get('run') != self.get_run(self.tasks[key], now):
+            return True
+        return state.get('retry') is not None and now >= state['retry']
+
+    def get_next_refresh(self, now: float) -> float:
+        """Get the time at which the next task is due.
+
+        :param float now: current time, as UNIX timestamp
+        :return: UNIX timestamp
+        """
+
+        times = []
+        for key, task in self.tasks.items():
+            if self.is_due(key, now):
+                return now
+            models = task['params']['models']
+            times.append(self.policy.get_next_update(models if isinstance(models, str) else ','.join(models), now))
+            if self.state.get(key, {}).get('retry') is not None:
+                times.append(self.state[key]['retry'])
+
+        return min(times, default=now + self.retry_interval)
+
+    def refresh_task(self, key: str, now: float) -> dict:
+        """Request the forecast of a task and export the units whose data has changed.
+
+        :param str key: task key (see get_task_key)
+        :param float now: current time, as UNIX timestamp
+        :return: number of exported and unchanged units
+        """
+
+        task = self.tasks[key]
+        run = self.get_run(task, now)
+        previous = self.state.get(key, {}).get('units', {})
+
+        forecast_days, past_days = get_forecast_days(task)
+        response = self.client.request_forecast_data(
+            task['params'] | {'forecast_days': forecast_days, 'past_days': past_days})
+        df = OpenMeteoClient.get_hourly_df(response, task['params']['hourly'])
+
+        stats = {'exported': 0, 'unchanged': 0}
+        hashes = {}
+        for unit in task['units']:
+            unit_df = get_forecast_unit_df(unit, df, past_days)
+            digest = hash_frame(unit_df)
+            if previous.get(unit['id']) == digest:
+                stats['unchanged'] += 1
+            else:
+                export_unit(unit, unit_df, response)
+                stats['exported'] += 1
+            hashes[unit['id']] = digest
+
+        # a run whose data did not change at all is most likely not published yet, it is requested again later
+        retry = now + self.retry_interval if stats['exported'] == 0 else None
+        with self.lock:
+            self.state[key] = {'run': run, 'retry': retry, 'units': hashes}
+
+        return stats
+
+    def refresh(self, now: float | None = None) -> dict:
+        """Refresh all due tasks concurrently (on manifest["workers"] threads).
+
+        :param float | None now: current time as UNIX timestamp, time.time() if None
+        :return: number of requested and skipped tasks, exported and unchanged units, failed tasks with their error
+        """
+
+        now = time.time() if now is None else now
+        due = [key for key in self.tasks if self.is_due(key, now)]
+        stats = {'requested': len(due), 'skipped': len(self.tasks) - len(due), 'exported': 0, 'unchanged': 0,
+                 'failed': []}
+        increment('openmeteo_forecast_refresh_total', len(self.tasks) - len(due), result='skipped')
+
+        def run(key: str) -> None:
+            try:
+                task_stats = self.refresh_task(key, now)
+            except Exception as e:
+                with self.lock:
+                    stats['failed'].append((key, repr(e)))
+                    # requested again after the retry interval
+                    self.state[key] = self.state.get(key, {}) | {'retry': now + self.retry_interval}
+                increment('openmeteo_forecast_refresh_total', result='failed')
+                return
+            with self.lock:
+                stats['exported'] += task_stats['exported']
+                stats['unchanged'] += task_stats['unchanged']
+            increment('openmeteo_forecast_refresh_total', result='unchanged' if task_stats['exported'] == 0 else 'new')
+
+        with ThreadPoolExecutor(max_workers=self.manifest['workers']) as executor:
+            list(executor.map(run, due))
+        self.write_state()
+
+        return stats
+
+    def run_forever(self, min_interval: float = 60, cycles: int | None = None) -> None:
+        """Refresh the tasks whenever the next one is due.
+
+        :param float min_interval: minimum time between two refreshes, in seconds
+        :param int | None cycles: number of refreshes, unlimited if None
+        """
+
+        cycle = 0
+        while cycles is None or cycle < cycles:
+            start = time.time()
+            print_stats(self.refresh(start))
+            cycle += 1
+            if cycles is not None and cycle >= cycles:
+                break
+            time.sleep(max(self.get_next_refresh(time.time()) - time.time(), start + min_interval - time.time(), 0))
+
+
+def print_stats(stats: dict) -> None:
+    """Print statistics of a refresh.
+
+    :param dict stats: statistics (see ForecastRefresher.refresh)
+    """
+
+    print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {stats['requested']} forecasts requested, {stats['skipped']} "
+          f"skipped (no new run), {stats['exported']} units exported, {stats['unchanged']} unchanged")
+    for key, error in stats['failed']:
+        print(f"failed: {key} ({error})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('manifest', help='path of the JSON job manifest')
+    parser.add_argument('--state', help='path of the refresh state ("<checkpoint>.refresh" of the manifest if omitted)')
+    parser.add_argument('--once', action='store_true', help='refresh the due forecasts once and exit')
+    parser.add_argument('--retry-interval', type=int, default=600,
+                        help='time after which a due run without new data is requested again, in seconds')
+    args = parser.parse_args()
+
+    refresher = ForecastRefresher(load_manifest(args.manifest), state_path=args.state,
+                                  retry_interval=args.retry_interval)
+    refresher.run_forever(cycles=1 if args.once else None)
+
+
+if __name__ == '__main__':
+    main()
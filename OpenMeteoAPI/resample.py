@@ -0,0 +1,140 @@
+"""Aggregation of sub-hourly (e.g. 15-minutely) OpenMeteo data into hourly data.
+
+Every variable is aggregated as defined by OPENMETEO_MAPPING: the mean or the sum of the values of an hour, or the
+instantaneous value at the full hour. As for the hourly data of OpenMeteo, the hour labelled HH:00 covers the values
+after (HH-1):00 up to and including HH:00. The values of a variable are reduced in one pass over a (hours, steps) view
+of the array, without grouping. Example:
+
+    columns = OpenMeteoClient.get_minutely_15_columns(response, variables)
+    hourly = resample_columns(columns)  # same format as OpenMeteoClient.get_hourly_columns
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from typing import TYPE_CHECKING
+
+from ConvertToTM2.tmy2format import OPENMETEO_MAPPING
+from OpenMeteoAPI.metrics import instrument
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+AGGREGATIONS = ('mean', 'sum', 'instant')
+
+
+def get_aggregation(variable: str, aggregations: dict | None = None) -> str:
+    """Get the aggregation of a variable: from aggregations if given, from OPENMETEO_MAPPING otherwise (mean if the
+    variable is not mapped).
+
+    :param str variable: OpenMeteo variable
+    :param dict | None aggregations: aggregation per variable, overriding OPENMETEO_MAPPING
+    :return: "mean", "sum" or "instant"
+    """
+
+    if aggregations and variable in aggregations:
+        aggregation = aggregations[variable]
+    else:
+        aggregation = OPENMETEO_MAPPING.get(variable, {}).get('aggregation', 'mean')
+    if aggregation not in AGGREGATIONS:
+        raise ValueError(f'unknown aggregation {aggregation!r} of {variable}, expected one of {AGGREGATIONS}')
+
+    return aggregation
+
+
+def get_hour_layout(dates: np.ndarray) -> (int, int, int):
+    """Get the position of the full hours within sub-hourly timestamps.
+
+    :param np.ndarray dates: equidistant timestamps as datetime64 array, with an interval dividing an hour
+    :return:
+        - first - index of the first timestamp at a full hour
+        - steps - number of timestamps per hour
+        - hours - number of full hours
+    """
+
+    seconds = np.asarray(dates, dtype='datetime64[s]').astype(np.int64)
+    if len(seconds) < 2:
+        raise ValueError('at least two timestamps are required to resample')
+    interval = int(seconds[1] - seconds[0])
+    if interval <= 0 or 3600 % interval:
+        raise ValueError(f'interval of {interval} s does not divide an hour')
+
+    steps = 3600 // interval
+    first = int(-seconds[0] % 3600 // interval)
+    hours = max((len(seconds) - 1 - first) // steps + 1, 0)
+
+    return first, steps, hours
+
+
+def resample_array(values: np.ndarray, first: int, steps: int, hours: int, aggregation: str) -> np.ndarray:
+    """Aggregate the sub-hourly values of a variable into hourly values.
+
+    Hours missing values (the first hour, if the data does not start right after a full hour) are NaN for means and
+    sums, as are hours with a NaN value.
+
+    :param np.ndarray values: sub-hourly values
+    :param int first: index of the first value at a full hour (see get_hour_layout)
+    :param int steps: number of values per hour
+    :param int hours: number of hours
+    :param str aggregation: "mean", "sum" or "instant"
+    :return: hourly values
+    """
+
+    if aggregation == 'instant':
+        return values[first::steps][:hours].copy()
+
+    result = np.empty(hours, dtype=values.dtype)
+    incomplete = 1 if first < steps - 1 and hours else 0
+    result[:incomplete] = np.nan
+
+    start = first - (steps - 1) + incomplete * steps
+    groups = values[start:start + (hours - incomplete) * steps].reshape(hours - incomplete, steps)
+    np.add.reduce(groups, axis=1, out=result[incomplete:])
+    if aggregation == 'mean':
+        result[incomplete:] /= steps
+
+    return result
+
+
+@instrument('resample', rows=lambda result, columns, *args, **kwargs: len(columns['date']))
+def resample_columns(columns: dict, aggregations: dict | None = None) -> dict:
+    """Aggregate sub-hourly data into hourly data.
+
+    :param dict columns: sub-hourly data, with date (timestamps as datetime64 array) and variables as keys (see
+        OpenMeteoClient.get_minutely_15_columns)
+    :param dict | None aggregations: aggregation per variable, overriding OPENMETEO_MAPPING (see get_aggregation)
+    :return: hourly data, in the format of OpenMeteoClient.get_hourly_columns
+    """
+
+    dates = np.asarray(columns['date'], dtype='datetime64[s]')
+    first, steps, hours = get_hour_layout(dates)
+
+    hourly = {'date': dates[first::steps][:hours]}
+    for variable, values in columns.items():
+        if variable != 'date':
+            hourly[variable] = resample_array(np.asarray(values), first, steps, hours,
+                                              get_aggregation(variable, aggregations))
+
+    return hourly
+
+
+def resample_df(df: pd.DataFrame, aggregations: dict | None = None) -> pd.DataFrame:
+    """Aggregate sub-hourly data into hourly data (see resample_columns).
+
+    :param DataFrame df: sub-hourly data (see OpenMeteoClient.get_minutely_15_df)
+    :param dict | None aggregations: aggregation per variable, overriding OPENMETEO_MAPPING (see get_aggregation)
+    :return: hourly data, in the format of OpenMeteoClient.get_hourly_df
+    """
+
+    import pandas as pd
+
+    dates = pd.DatetimeIndex(df['date'])
+    if dates.tz is not None:  # local time labelled as UTC
+        dates = dates.tz_localize(None)
+
+    columns = {'date': dates.values}
+    columns |= {variable: df[variable].to_numpy() for variable in df.columns if variable != 'date'}
+    hourly = resample_columns(columns, aggregations)
+    hourly['date'] = pd.DatetimeIndex(hourly['date'].astype('datetime64[ns]'), tz='UTC')
+
+    return pd.DataFrame(hourly)
@@ -0,0 +1,274 @@
+"""Rate-limited scheduling of OpenMeteo API requests.
+
+Requests are dispatched as soon as the token buckets of all rate limits hold enough tokens for their cost, so that
+throughput stays just under the quota instead of running into 429 errors and backing off. Example:
+
+    with RequestScheduler(OpenMeteoClient()) as scheduler:
+        forecast = scheduler.submit(URL_forecast, params, priority=FORECAST)  # dispatched before any backfill
+        backfill = [scheduler.submit(URL_historical, OpenMeteoClient.get_historical_params(params, year))
+                    for year in range(1990, 2024)]
+        print(forecast.result()[0].Latitude())
+"""
+import datetime
+import heapq
+import itertools
+import threading
+import time
+
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from OpenMeteoAPI.metrics import increment
+from OpenMeteoAPI.openmeteo_api import OpenMeteoClient
+from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+from openmeteo_requests.Client import OpenMeteoRequestsError
+
+# rate limits of the free API, as number of API calls with the period in seconds as key
+RATE_LIMITS = {60: 600, 3600: 5000, 86400: 10000}
+
+# priority lanes, lower values being dispatched first
+FORECAST = 0
+HISTORICAL = 1
+
+# maximum number of variables and days of a request counting as a single API call
+CALL_VARIABLES = 10
+CALL_DAYS = 14
+
+
+def get_request_cost(params: dict) -> float:
+    """Get the cost of a request in API calls, as counted by OpenMeteo.
+
+    Requests with more than 10 variables or more than 2 weeks of data count as multiple (fractional) calls, for every
+    requested location.
+
+    :param dict params: parameters (see OpenMeteo API doc)
+    :return: number of API calls
+    """
+
+    def count(value) -> int:
+        if value is None:
+            return 0
+        if isinstance(value, str):
+            return len(value.split(','))
+        return len(value) if isinstance(value, (list, tuple)) else 1
+
+    variables = sum(count(params.get(name)) for name in ['hourly', 'daily', 'minutely_15', 'current'])
+    locations = max(count(params.get('latitude')), 1)
+
+    if 'start_date' in params:
+        days = (datetime.date.fromisoformat(str(params['end_date']))
+                - datetime.date.fromisoformat(str(params['start_date']))).days + 1
+    else:
+        days = int(params.get('forecast_days', 7)) + int(params.get('past_days', 0))
+
+    return max(variables / CALL_VARIABLES, 1.) * max(days / CALL_DAYS, 1.) * locations
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, period: float) -> None:
+        """Initialize token bucket, full, refilling continuously at capacity per period.
+
+        :param float capacity: maximum number of tokens
+        :param float period: time in which the bucket is refilled from empty to full, in seconds
+        """
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        """Add the tokens refilled since the last update."""
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def get_wait(self, cost: float, now: float) -> float:
+        """Get the time until a cost can be taken from the bucket, in seconds.
+
+        A cost exceeding the capacity can be taken from a full bucket, the bucket then has to refill the difference.
+        """
+
+        self.refill(now)
+        return max(min(cost, self.capacity) - self.tokens, 0.) / self.rate
+
+
+class RateLimiter:
+    def __init__(self, limits: dict = None, utilization: float = 0.95) -> None:
+        """Initialize rate limiter with one token bucket per limit.
+
+        The buckets refill continuously, so that requests are spread over the period instead of being sent in bursts.
+
+        :param dict limits: number of API calls, with the period in seconds as key (RATE_LIMITS if None)
+        :param float utilization: fraction of the limits to be used, leaving a margin for other clients
+        """
+        self.buckets = [TokenBucket(calls * utilization, period) for period, calls in (limits or RATE_LIMITS).items()]
+        self.lock = threading.Lock()
+
+    def acquire(self, cost: float) -> float:
+        """Take a cost from all buckets if they hold enough tokens.
+
+        :param float cost: cost of the request, in API calls
+        :return: 0 if the cost was taken, otherwise the time to wait before trying again, in seconds
+        """
+
+        with self.lock:
+            now = time.monotonic()
+            wait = max(bucket.get_wait(cost, now) for bucket in self.buckets)
+            if wait == 0:
+                for bucket in self.buckets:
+                    bucket.tokens -= cost
+            return wait
+
+    def drain(self) -> None:
+        """Empty all buckets, e.g. after the API reported the limit as exceeded."""
+
+        with self.lock:
+            now = time.monotonic()
+            for bucket in self.buckets:
+                bucket.refill(now)
+                bucket.tokens = min(bucket.tokens, 0.)
+
+
+class RequestScheduler:
+    def __init__(self, client: OpenMeteoClient | None = None, limiter: RateLimiter | None = None, max_workers: int = 8,
+                 max_requeues: int = 3) -> None:
+        """Initialize scheduler sending requests through a client within the rate limits.
+
+        Requests are queued per priority (FORECAST before HISTORICAL) and dispatched by a background thread to a pool of
+        max_workers threads, once the rate limiter holds enough tokens for the request at the head of the queue. A
+        request identical to one which is queued or in flight is not sent again, both share the same future.
+
+        Should the API still report the limit as exceeded (e.g. due to other clients sharing the quota), the limiter is
+        drained and the request is queued again, at most max_requeues times.
+
+        :param OpenMeteoClient | None client: OpenMeteo API client, a new one is created if None
+        :param RateLimiter | None limiter: rate limiter, one with the limits of the free API is created if None
+        :param int max_workers: maximum number of concurrent requests
+        :param int max_requeues: maximum number of times a request is queued again after exceeding the limit
+        """
+        self.client = client or OpenMeteoClient()
+        self.limiter = limiter or RateLimiter()
+        self.max_requeues = max_requeues
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        self.queue = []  # heap of (priority, sequence, key, url, params, cost, requeues)
+        self.sequence = itertools.count()  # keeps requests of the same priority in submission order
+        self.pending = {}  # futures of queued or in-flight requests, with request key as key
+        self.condition = threading.Condition()
+        self.closed = False
+        self.stats = {'submitted': 0, 'coalesced': 0, 'dispatched': 0, 'requeued': 0, 'cost': 0., 'wait_seconds': 0.}
+
+        self.dispatcher = threading.Thread(target=self.dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def __enter__(self) -> 'RequestScheduler':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @staticmethod
+    def get_key(url: str, params: dict) -> tuple:
+        """Get the key identifying a request (the order of list parameters is kept, as it defines the response)."""
+        return url, tuple(sorted((name, tuple(value) if isinstance(value, (list, tuple)) else value)
+                                 for name, value in params.items()))
+
+    def submit(self, url: str, params: dict, priority: int = HISTORICAL) -> Future:
+        """Queue a request to OpenMeteo API.
+
+        :param str url: API URL
+        :param dict params: parameters (see OpenMeteo API doc)
+        :param int priority: priority lane, FORECAST or HISTORICAL (or any other int, lower values first)
+        :return: future of the OpenMeteo API responses, one per location
+        """
+
+        params = dict(params)  # queued as a copy, the client adds the format to the parameters it sends
+        key = self.get_key(url, params)
+        with self.condition:
+            if self.closed:
+                raise RuntimeError('cannot submit requests to a closed scheduler')
+            self.stats['submitted'] += 1
+            if key in self.pending:
+                self.stats['coalesced'] += 1
+                return self.pending[key]
+
+            future = self.pending[key] = Future()
+            heapq.heappush(self.queue, (priority, next(self.sequence), key, url, params, get_request_cost(params), 0))
+            self.condition.notify()
+
+        return future
+
+    def request_historical_data(self, params: dict, year: int) -> WeatherApiResponse:
+        """Send request for historical data of a given year, in the historical lane (see OpenMeteoClient)."""
+
+        params = self.client.get_historical_params(params, year)
+        return self.submit(self.client.url_historical, params, priority=HISTORICAL).result()[0]
+
+    def request_forecast_data(self, params: dict) -> WeatherApiResponse:
+        """Send request for forecast data, in the forecast lane (see OpenMeteoClient)."""
+        return self.submit(self.client.url_forecast, params, priority=FORECAST).result()[0]
+
+    def dispatch(self) -> None:
+        """Dispatch queued requests within the rate limits (runs in the background thread)."""
+
+        while True:
+            with self.condition:
+                # requests in flight may still be queued again, keep running until all of them are resolved
+                while not self.queue and not (self.closed and not self.pending):
+                    self.condition.wait()
+                if not self.queue:
+                    return
+
+                # wait for tokens, a request with higher priority submitted meanwhile takes over the head of the queue
+                wait = self.limiter.acquire(self.queue[0][5])
+                if wait:
+                    start = time.monotonic()
+                    self.condition.wait(wait)
+                    self.stats['wait_seconds'] += time.monotonic() - start
+                    continue
+
+                job = heapq.heappop(self.queue)
+                self.stats['dispatched'] += 1
+                self.stats['cost'] += job[5]
+
+            increment('openmeteo_scheduler_dispatched_total', lane=str(job[0]))
+            self.executor.submit(self.execute, job)
+
+    def execute(self, job: tuple) -> None:
+        """Send a dispatched request and resolve its future (runs in the thread pool)."""
+
+        priority, _, key, url, params, cost, requeues = job
+        try:
+            responses = self.client.weather_api(url, params=params)
+        except OpenMeteoRequestsError as e:
+            if 'limit exceeded' in str(e).lower() and requeues < self.max_requeues:
+                self.limiter.drain()
+                with self.condition:
+                    self.stats['requeued'] += 1
+                    heapq.heappush(self.queue, (priority, next(self.sequence), key, url, params, cost, requeues + 1))
+                    self.condition.notify()
+                return
+            self.resolve(key, exception=e)
+        except Exception as e:
+            self.resolve(key, exception=e)
+        else:
+            self.resolve(key, result=responses)
+
+    def resolve(self, key: tuple, result: list | None = None, exception: Exception | None = None) -> None:
+        """Resolve the future of a request, so that identical requests are sent again from now on."""
+
+        with self.condition:
+            future = self.pending.pop(key)
+            self.condition.notify()
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def close(self) -> None:
+        """Send all queued requests and wait for them to finish."""
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.dispatcher.join()
+        self.executor.shutdown(wait=True)
@@ -1,4 +1,6 @@
-import datetime
+import numpy as np
+
+from OpenMeteoAPI.calendar_utils import hours_of_year
 
 
 def get_lat_long_minutes(lat: float, long: float) -> (int, int):
@@ -29,9 +31,7 @@ def hour_of_year(year: int, month: int, day: int, hour: int) -> int:
     :return: hour of year (from 0 to 8760)
     """
 
-    beginning_of_year = datetime.datetime(year, month=1, day=1, hour=1)
-    date = datetime.datetime(year=year, month=month, day=day, hour=hour)
-    return int((date - beginning_of_year).total_seconds() // 3600) + 1
+    return int(hours_of_year(np.datetime64(f'{year:04d}-{month:02d}-{day:02d}T{hour:02d}', 'h')))
 
 
 def is_leap_year(year: int) -> bool:
@@ -0,0 +1,139 @@
+"""Memory benchmark of the decoding of OpenMeteo API responses into DataFrames.
+
+Decodes a synthetic response (20 years, 10 variables by default) with the former dict-based implementation of
+OpenMeteoClient.get_hourly_df and with the current block-based and zero-copy ones, each in a fresh process, and reports
+the peak resident set size (RSS) on top of the loaded payload (the peak is reset before decoding on Linux, elsewhere
+the traced Python allocations are the more meaningful figure). Run from the repository root:
+
+    python -m benchmarks.decode_memory [--years 20] [--variables 10]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic import build_response, decode, random_variables
+from OpenMeteoAPI.openmeteo_api import OpenMeteoClient
+
+MODES = ['legacy', 'block', 'block_without_date', 'zero_copy']
+
+
+def legacy_get_hourly_df(response, variables: list[str]) -> pd.DataFrame:
+    """Former implementation of OpenMeteoClient.get_hourly_df, building the DataFrame from a dict of columns."""
+
+    hourly = response.Hourly()
+    hourly_data = {"date": OpenMeteoClient.get_hourly_time(response)}
+    for index, variable in enumerate(variables):
+        hourly_data[variable] = hourly.Variables(index).ValuesAsNumpy()
+
+    return pd.DataFrame(hourly_data)
+
+
+def reset_peak_rss() -> bool:
+    """Reset peak resident set size of the current process (Linux only).
+
+    :return: True if the peak was reset
+    """
+
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss() -> int:
+    """Get peak resident set size of the current process in bytes (0 if not available on this platform)."""
+
+    if os.path.isfile('/proc/self/status'):
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+
+    try:
+        import resource
+    except ImportError:
+        return 0
+
+    # ru_maxrss is given in kilobytes on Linux, in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def run(mode: str, path: str, n_variables: int) -> dict:
+    """Decode the payload of a file with the given mode and measure time and memory.
+
+    :param str mode: decoding mode, one of MODES
+    :param str path: path of the payload file
+    :param int n_variables: number of variables of the payload
+    :return: results
+    """
+
+    with open(path, 'rb') as f:
+        payload = f.read()
+    response = decode(payload)[0]
+    variables = [f'variable_{index}' for index in range(n_variables)]
+
+    reset_peak_rss()
+    rss_before = peak_rss()
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    if mode == 'legacy':
+        df = legacy_get_hourly_df(response, variables)
+    elif mode == 'zero_copy':
+        df = OpenMeteoClient.get_hourly_df(response, variables, copy=False)
+    else:
+        df = OpenMeteoClient.get_hourly_df(response, variables, date=(mode == 'block'))
+
+    seconds = time.perf_counter() - start
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'mode': mode,
+        'seconds': seconds,
+        'payload_bytes': len(payload),
+        'df_bytes': int(df.memory_usage(index=False).sum()),
+        'peak_rss_before_bytes': rss_before,
+        'peak_rss_increase_bytes': peak_rss() - rss_before,
+        'traced_peak_bytes': traced_peak,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--years', type=int, default=20)
+    parser.add_argument('--variables', type=int, default=10)
+    parser.add_argument('--mode', choices=MODES, help='run a single mode in this process (used internally)')
+    parser.add_argument('--payload', help='payload file (used internally)')
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run(args.mode, args.payload, args.variables)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'payload.bin')
+        with open(path, 'wb') as f:
+            f.write(build_response(48.2085, 16.3721, 946684800, random_variables(args.variables, args.years * 8760)))
+
+        results = []
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.decode_memory', '--mode', mode, '--payload', path,
+                 '--variables', str(args.variables)], capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(output))
+
+    print(json.dumps({'years': args.years, 'variables': args.variables, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
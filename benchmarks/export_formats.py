@@ -0,0 +1,80 @@
+"""Benchmark of the export formats of hourly OpenMeteo data.
+
+Writes a synthetic dataset (all variables of OPENMETEO_MAPPING) with every writer of OpenMeteoAPI.export.WRITERS, reads
+it back with the matching pandas (or NumPy) loader and reports write time, read time and file size. Formats whose
+optional dependency is missing (pyarrow for parquet and feather) are skipped. Run from the repository root:
+
+    python -m benchmarks.export_formats [--years 1,10,30] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+from benchmarks.suite import measure
+from benchmarks.synthetic import build_response, decode, random_variables
+from ConvertToTM2.tmy2format import OPENMETEO_MAPPING
+from OpenMeteoAPI.export import WRITERS, read_npz
+from OpenMeteoAPI.openmeteo_api import OpenMeteoClient
+
+# loaders of the exported files, with export format as key
+READERS = {
+    'csv': lambda path: pd.read_csv(path, index_col=0, parse_dates=['date']),
+    'parquet': pd.read_parquet,
+    'feather': pd.read_feather,
+    'npz': lambda path: read_npz(path)[0],
+}
+
+
+def run_size(years: int, directory: str, repeat: int) -> list[dict]:
+    """Run the benchmark of all export formats for a dataset size.
+
+    :param int years: dataset size in years (of 8760 hours)
+    :param str directory: directory for the export files
+    :param int repeat: number of runs per format
+    :return: results, with write and read times and file size per format
+    """
+
+    variables = list(OPENMETEO_MAPPING.keys())
+    payload = build_response(48.2085, 16.3721, 978307200, random_variables(len(variables), years * 8760))
+    df = OpenMeteoClient.get_hourly_df(decode(payload)[0], variables)
+
+    results = []
+    for name, writer in WRITERS.items():
+        path = os.path.join(directory, 'export.' + name)
+        try:
+            write = measure(lambda: writer(df, variables, path), repeat)
+        except ImportError as e:
+            print(f"{name:<8} {years:>3} years skipped ({e})", file=sys.stderr)
+            continue
+        read = measure(lambda: READERS[name](path), repeat)
+
+        result = {'format': name, 'years': years, 'rows': len(df), 'bytes': os.path.getsize(path),
+                  'write_seconds': write['seconds_median'], 'read_seconds': read['seconds_median']}
+        results.append(result)
+        print(f"{name:<8} {years:>3} years write {result['write_seconds'] * 1000:>9.1f} ms "
+              f"read {result['read_seconds'] * 1000:>9.1f} ms {result['bytes'] / 2 ** 20:>8.2f} MiB", file=sys.stderr)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--years', type=lambda value: [int(years) for years in value.split(',')], default=[1, 10, 30],
+                        help='comma-separated dataset sizes in years')
+    parser.add_argument('--repeat', type=int, default=3, help='number of runs per format')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = []
+        for years in args.years:
+            results += run_size(years, directory, args.repeat)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
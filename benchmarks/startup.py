@@ -0,0 +1,171 @@
+"""Benchmark of the cold start time of the package and of the batch CLI.
+
+Every module is imported in a fresh interpreter with "python -X importtime", and the total import time (sum of the
+cumulative times of the top-level imports) is reported, together with the slowest imported packages. The CLI is timed
+on a manifest whose units are all completed already, i.e. the startup overhead of a scheduled run with nothing to do.
+Run from the repository root:
+
+    python -m benchmarks.startup --output startup.json
+    python -m benchmarks.startup --output startup_new.json --compare startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.suite import get_metadata
+from OpenMeteoAPI.batch import load_manifest, plan_tasks
+
+DEFAULT_MODULES = ['OpenMeteoAPI.batch', 'OpenMeteoAPI.export', 'ConvertToTM2.columnar', 'OpenMeteoAPI.openmeteo_api',
+                   'OpenMeteoAPI.refresh']
+
+# manifest of the CLI benchmark, all its units are marked as completed in the checkpoint (historical jobs only,
+# forecasts are exported on every run)
+MANIFEST = {
+    'sites': {'vienna': [48.2085, 16.3721]},
+    'jobs': [
+        {'type': 'historical', 'sites': ['vienna'], 'models': ['ecmwf_ifs'], 'start_date': '2022-01-01',
+         'end_date': '2023-12-31', 'output': 'historical{period}'},
+    ],
+}
+
+
+def parse_importtime(output: str) -> (int, dict):
+    """Parse the output of "python -X importtime".
+
+    :param str output: standard error of the interpreter
+    :return:
+        - total - total import time in microseconds
+        - packages - cumulative import time of every top-level package in microseconds, with package as key
+    """
+
+    total, packages = 0, {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # nested imports are indented by two spaces per level
+        if len(name) - len(name.lstrip()) == 1:
+            total += int(cumulative)
+        package = name.strip().split('.')[0]
+        packages[package] = max(packages.get(package, 0), int(cumulative))
+
+    return total, packages
+
+
+def run_python(args: list[str], cwd: str | None = None) -> (float, int, dict):
+    """Run a fresh interpreter with "-X importtime".
+
+    :param list args: arguments of the interpreter
+    :param str | None cwd: working directory
+    :return:
+        - seconds - wall time of the process
+        - total - total import time in microseconds (see parse_importtime)
+        - packages - import time of every top-level package in microseconds
+    """
+
+    env = os.environ | {'PYTHONPATH': os.pathsep.join([os.getcwd()] + sys.path[1:])}
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=cwd, env=env, capture_output=True,
+                             text=True, check=True)
+    seconds = time.perf_counter() - start
+
+    return (seconds, *parse_importtime(process.stderr))
+
+
+def measure_startup(name: str, args: list[str], repeat: int, cwd: str | None = None, top: int = 5) -> dict:
+    """Time the start of an interpreter repeatedly.
+
+    :param str name: name of the benchmark
+    :param list args: arguments of the interpreter
+    :param int repeat: number of runs
+    :param str | None cwd: working directory
+    :param int top: number of slowest packages reported
+    :return: result, with median wall and import time and the slowest packages of the last run
+    """
+
+    runs = [run_python(args, cwd) for _ in range(repeat)]
+    packages = sorted(runs[-1][2].items(), key=lambda item: item[1], reverse=True)
+
+    result = {
+        'benchmark': name,
+        'seconds_median': statistics.median(run[0] for run in runs),
+        'import_seconds_median': statistics.median(run[1] for run in runs) / 1e6,
+        'slowest_packages': {package: microseconds / 1e6 for package, microseconds in packages[:top]},
+    }
+    print(f"{name:<28} wall {result['seconds_median'] * 1000:>8.1f} ms import "
+          f"{result['import_seconds_median'] * 1000:>8.1f} ms", file=sys.stderr)
+
+    return result
+
+
+def run_cli(directory: str, repeat: int) -> dict:
+    """Time a batch CLI run of a manifest without units left to export.
+
+    :param str directory: working directory of the run
+    :param int repeat: number of runs
+    :return: result (see measure_startup)
+    """
+
+    path = os.path.join(directory, 'manifest.json')
+    with open(path, 'w') as f:
+        json.dump(MANIFEST, f)
+    manifest = load_manifest(path)
+    with open(manifest['checkpoint'], 'w') as f:
+        for task in plan_tasks(manifest):
+            for unit in task['units']:
+                f.write(json.dumps({'id': unit['id'], 'path': unit['path'], 'rows': 0}) + '\n')
+
+    return measure_startup('cli_nothing_to_do', ['-m', 'OpenMeteoAPI.batch', path], repeat, cwd=directory)
+
+
+def compare(results: list[dict], baseline: list[dict]) -> None:
+    """Print the ratio of median import times between results and baseline results.
+
+    :param list results: results of the current run
+    :param list baseline: results of a previous run
+    """
+
+    baseline = {result['benchmark']: result for result in baseline}
+    print(f"{'benchmark':<28} {'baseline [ms]':>14} {'current [ms]':>14} {'ratio':>7}")
+    for result in results:
+        previous = baseline.get(result['benchmark'])
+        if previous is None:
+            continue
+        ratio = result['import_seconds_median'] / previous['import_seconds_median']
+        print(f"{result['benchmark']:<28} {previous['import_seconds_median'] * 1000:>14.1f} "
+              f"{result['import_seconds_median'] * 1000:>14.1f} {ratio:>7.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', help='path of the JSON results, printed to stdout if omitted')
+    parser.add_argument('--modules', type=lambda value: value.split(','), default=DEFAULT_MODULES,
+                        help='comma-separated modules to import')
+    parser.add_argument('--repeat', type=int, default=5, help='number of runs per benchmark')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare with')
+    args = parser.parse_args()
+
+    results = [measure_startup('python', ['-c', 'pass'], args.repeat)]
+    results += [measure_startup(module, ['-c', f'import {module}'], args.repeat) for module in args.modules]
+    with tempfile.TemporaryDirectory() as directory:
+        results.append(run_cli(directory, args.repeat))
+
+    output = json.dumps({'metadata': get_metadata(), 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f)['results'])
+
+
+if __name__ == '__main__':
+    main()
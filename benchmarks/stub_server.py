@@ -0,0 +1,105 @@
+"""Local stand-in for the OpenMeteo API, serving synthetic FlatBuffers payloads.
+
+Understands the parameters used by OpenMeteoClient: comma-separated latitude/longitude lists, comma-separated models,
+hourly (or minutely_15) variables, start_date/end_date (historical weather API) and forecast_days/past_days (forecast
+and ensemble API). Requests to /v1/ensemble return StubHandler.members ensemble members per model and variable.
+Payloads are generated once per query and kept in memory, so that serving them costs the same as serving a real
+response.
+"""
+import datetime
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import build_response, random_variables
+from openmeteo_sdk.Model import Model
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.  # injected latency per request, in seconds
+    members = 51  # ensemble members per model of ensemble requests
+    payloads = {}  # generated payloads, with path and query string as key
+    requests = 0  # number of handled requests
+    lock = threading.Lock()
+
+    def do_GET(self) -> None:
+        """Serve the synthetic payload of a request."""
+
+        with self.lock:
+            type(self).requests += 1
+        time.sleep(self.latency)
+
+        url = urlparse(self.path)
+        key = url.path + '?' + url.query
+        payload = self.payloads.get(key)
+        if payload is None:
+            members = self.members if url.path.rstrip('/').endswith('/ensemble') else 1
+            payload = self.payloads[key] = self.build_payload(parse_qs(url.query), members)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    @staticmethod
+    def build_payload(query: dict, members: int = 1) -> bytes:
+        """Build the payload of a request, one response per requested location and model (models of a location are
+        consecutive).
+
+        :param dict query: parsed query string
+        :param int members: ensemble members per variable
+        :return: payload
+        """
+
+        latitudes = [float(value) for value in ','.join(query['latitude']).split(',')]
+        longitudes = [float(value) for value in ','.join(query['longitude']).split(',')]
+        minutely_15 = 'minutely_15' in query and 'hourly' not in query  # only one of them per request
+        section = 'minutely_15' if minutely_15 else 'hourly'
+        n_variables = len(','.join(query[section]).split(',')) if section in query else 0
+        models = ','.join(query.get('models', ['best_match'])).split(',')
+        utc_offset_seconds = 3600
+
+        if 'start_date' in query:
+            first_date = datetime.date.fromisoformat(query['start_date'][0])
+            last_date = datetime.date.fromisoformat(query['end_date'][0])
+        else:
+            today = datetime.date.today()
+            first_date = today - datetime.timedelta(days=int(query.get('past_days', ['0'])[0]))
+            last_date = today + datetime.timedelta(days=int(query.get('forecast_days', ['7'])[0]) - 1)
+
+        # timestamps are UTC, the data starts at midnight local time
+        start = int(datetime.datetime.combine(first_date, datetime.time(), datetime.timezone.utc).timestamp())
+        start -= utc_offset_seconds
+        steps = ((last_date - first_date).days + 1) * 24 * (4 if minutely_15 else 1)
+
+        # all members of a variable are consecutive
+        ensemble_members = [member for _ in range(n_variables) for member in range(members)]
+        return b''.join(
+            build_response(latitude, longitude, start,
+                           random_variables(n_variables * members, steps, seed=index * len(models) + model_index),
+                           interval=900 if minutely_15 else 3600, utc_offset_seconds=utc_offset_seconds, elevation=190,
+                           ensemble_members=ensemble_members, minutely_15=minutely_15, model=getattr(Model, model, 0))
+            for index, (latitude, longitude) in enumerate(zip(latitudes, longitudes))
+            for model_index, model in enumerate(models))
+
+    def log_message(self, format: str, *args) -> None:
+        """Do not log requests."""
+
+
+def start_server(latency: float = 0.) -> (ThreadingHTTPServer, str):
+    """Start a stub server in a background thread on a free local port.
+
+    :param float latency: injected latency per request, in seconds
+    :return:
+        - server - running server, stop it with server.shutdown()
+        - url - base URL of the server
+    """
+
+    StubHandler.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
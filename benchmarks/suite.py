@@ -0,0 +1,200 @@
+"""Offline benchmark suite of the fetch, decode and export hot paths.
+
+Times client round trips against a local stub server (benchmarks.stub_server), response decoding, leap day filtering,
+resampling of 15-minutely data, ensemble decoding and statistics, tm2 rendering and csv export for dataset sizes from
+1 day to 30 years, and writes the results as JSON, so that results of different commits can be compared. Run from the
+repository root:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --output results_new.json --compare results.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import requests_cache
+
+from benchmarks.stub_server import start_server
+from benchmarks.synthetic import build_response, decode, random_variables
+from ConvertToTM2.columnar import ColumnarTMY2, StreamingTMY2
+from ConvertToTM2.convert import TMY2
+from ConvertToTM2.tmy2format import OPENMETEO_MAPPING
+from OpenMeteoAPI.calendar_utils import drop_leap_days
+from OpenMeteoAPI.ensemble import get_statistics
+from OpenMeteoAPI.export import export_csv
+from OpenMeteoAPI.openmeteo_api import OpenMeteoClient
+from OpenMeteoAPI.resample import resample_columns
+
+DEFAULT_SIZES = [1, 7, 30, 365, 5 * 365, 30 * 365]  # dataset sizes in days
+START_DATE = datetime.date(2001, 1, 1)  # first date of all datasets
+ENSEMBLE_MEMBERS = 51  # members of the ensemble benchmarks, as of the ECMWF IFS ensemble
+
+
+def measure(function, repeat: int) -> dict:
+    """Time a function.
+
+    :param function: function without arguments
+    :param int repeat: number of runs
+    :return: minimum, median and all run times in seconds
+    """
+
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+
+    return {'seconds_min': min(seconds), 'seconds_median': statistics.median(seconds), 'seconds': seconds}
+
+
+def get_metadata() -> dict:
+    """Get information about the benchmarked code and environment."""
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        'commit': commit,
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def run_size(days: int, url: str, directory: str, repeat: int, legacy_max_days: int, ensemble_max_days: int
+             ) -> list[dict]:
+    """Run all benchmarks for a dataset size.
+
+    :param int days: dataset size in days
+    :param str url: base URL of the stub server
+    :param str directory: directory for cache and export files
+    :param int repeat: number of runs per benchmark
+    :param int legacy_max_days: largest dataset size for which the (slow) legacy tm2 writer is benchmarked
+    :param int ensemble_max_days: largest dataset size for which the (memory intensive) ensemble stages are benchmarked
+    :return: results
+    """
+
+    variables = list(OPENMETEO_MAPPING.keys())
+    params = {'latitude': 48.2085, 'longitude': 16.3721, 'hourly': variables, 'timezone': 'auto',
+              'start_date': str(START_DATE), 'end_date': str(START_DATE + datetime.timedelta(days=days - 1))}
+    rows = days * 24
+
+    uncached_client = OpenMeteoClient(cache_name=os.path.join(directory, 'uncached'),
+                                      expire_after=requests_cache.DO_NOT_CACHE, url_historical=url + '/v1/archive')
+    cached_client = OpenMeteoClient(cache_name=os.path.join(directory, 'cached'), url_historical=url + '/v1/archive')
+
+    def request(client: OpenMeteoClient):
+        return client.weather_api(client.url_historical, params=params.copy())[0]
+
+    response = request(cached_client)  # warms up stub server and cache
+    df = OpenMeteoClient.get_hourly_df(response, variables)
+    export_args = {'lat': response.Latitude(), 'long': response.Longitude(),
+                   'time_zone': int(response.UtcOffsetSeconds() / 3600), 'elevation': int(response.Elevation())}
+    tm2_path = os.path.join(directory, 'export.tm2')
+
+    # 15-minutely data of the same period, decoded from a synthetic payload
+    quarter_response = decode(build_response(params['latitude'], params['longitude'], response.Hourly().Time(),
+                                             random_variables(len(variables), rows * 4), interval=900,
+                                             minutely_15=True))[0]
+    quarter_columns = OpenMeteoClient.get_minutely_15_columns(quarter_response, variables)
+
+    benchmarks = {
+        'roundtrip_uncached': lambda: request(uncached_client),
+        'roundtrip_cached': lambda: request(cached_client),
+        'decode': lambda: OpenMeteoClient.get_hourly_df(response, variables),
+        'leap_day_filter': lambda: drop_leap_days(df),
+        'decode_minutely_15': lambda: OpenMeteoClient.get_minutely_15_columns(quarter_response, variables),
+        'resample_minutely_15': lambda: resample_columns(quarter_columns),
+        'tmy2_columnar': lambda: ColumnarTMY2(length=rows).export_from_openmeteo_df(df, path=tm2_path, **export_args),
+        'tmy2_streaming': lambda: StreamingTMY2(length=rows).export_from_openmeteo_df(df, path=tm2_path, **export_args),
+        'csv_export': lambda: export_csv(df, variables, os.path.join(directory, 'export.csv')),
+    }
+    if days <= legacy_max_days:
+        benchmarks['tmy2_legacy'] = lambda: TMY2(length=rows).export_from_openmeteo_df(df, path=tm2_path, **export_args)
+    if days <= ensemble_max_days:
+        ensemble_response = decode(build_response(
+            params['latitude'], params['longitude'], response.Hourly().Time(),
+            random_variables(len(variables) * ENSEMBLE_MEMBERS, rows),
+            ensemble_members=list(range(ENSEMBLE_MEMBERS)) * len(variables)))[0]
+        ensemble = OpenMeteoClient.get_ensemble([ensemble_response], variables)
+        benchmarks['decode_ensemble'] = lambda: OpenMeteoClient.get_ensemble([ensemble_response], variables)
+        benchmarks['ensemble_statistics'] = lambda: get_statistics(ensemble)
+
+    results = []
+    for name, function in benchmarks.items():
+        result = {'benchmark': name, 'days': days, 'rows': rows} | measure(function, repeat)
+        result['rows_per_second'] = rows / result['seconds_median']
+        results.append(result)
+        print(f"{name:<20} {days:>6} days {result['seconds_median'] * 1000:>10.2f} ms", file=sys.stderr)
+
+    return results
+
+
+def compare(results: list[dict], baseline: list[dict]) -> None:
+    """Print the ratio of median run times between results and baseline results.
+
+    :param list results: results of the current run
+    :param list baseline: results of a previous run
+    """
+
+    baseline = {(result['benchmark'], result['days']): result for result in baseline}
+    print(f"{'benchmark':<20} {'days':>6} {'baseline [ms]':>14} {'current [ms]':>14} {'ratio':>7}")
+    for result in results:
+        previous = baseline.get((result['benchmark'], result['days']))
+        if previous is None:
+            continue
+        ratio = result['seconds_median'] / previous['seconds_median']
+        print(f"{result['benchmark']:<20} {result['days']:>6} {previous['seconds_median'] * 1000:>14.2f} "
+              f"{result['seconds_median'] * 1000:>14.2f} {ratio:>7.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', help='path of the JSON results, printed to stdout if omitted')
+    parser.add_argument('--sizes', type=lambda value: [int(days) for days in value.split(',')], default=DEFAULT_SIZES,
+                        help='comma-separated dataset sizes in days')
+    parser.add_argument('--repeat', type=int, default=5, help='number of runs per benchmark')
+    parser.add_argument('--legacy-max-days', type=int, default=365,
+                        help='largest dataset size for which the legacy tm2 writer is benchmarked')
+    parser.add_argument('--ensemble-max-days', type=int, default=365,
+                        help='largest dataset size for which the ensemble stages are benchmarked')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare with')
+    args = parser.parse_args()
+
+    server, url = start_server()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            results = []
+            for days in args.sizes:
+                results += run_size(days, url, directory, args.repeat, args.legacy_max_days,
+                                    args.ensemble_max_days)
+    finally:
+        server.shutdown()
+
+    output = json.dumps({'metadata': get_metadata(), 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f)['results'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Synthetic OpenMeteo API payloads for offline benchmarks.
+
+The payloads follow the FlatBuffers schema of openmeteo_sdk (WeatherApiResponse), every message being prefixed by its
+length as the API does when requesting "format=flatbuffers".
+"""
+import flatbuffers
+import numpy as np
+
+from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+
+
+def build_variable(builder: flatbuffers.Builder, values: np.ndarray, ensemble_member: int = 0) -> int:
+    """Build a VariableWithValues table.
+
+    :param flatbuffers.Builder builder: FlatBuffers builder
+    :param np.ndarray values: values of the variable, as float32
+    :param int ensemble_member: ensemble member of the variable
+    :return: offset of the table
+    """
+
+    vector = builder.CreateNumpyVector(values.astype(np.float32))
+    builder.StartObject(12)
+    builder.PrependUOffsetTRelativeSlot(3, vector, 0)  # values
+    builder.PrependInt16Slot(10, ensemble_member, 0)  # ensemble_member
+    return builder.EndObject()
+
+
+def build_variables_with_time(builder: flatbuffers.Builder, start: int, interval: int, variables: list[np.ndarray],
+                              ensemble_members: list[int] | None = None) -> int:
+    """Build a VariablesWithTime table.
+
+    :param flatbuffers.Builder builder: FlatBuffers builder
+    :param int start: first timestamp, in seconds since 1970-01-01T00 (UTC)
+    :param int interval: time step in seconds
+    :param list variables: values of every variable, of equal length
+    :param list ensemble_members: ensemble member of every variable, all 0 if None
+    :return: offset of the table
+    """
+
+    ensemble_members = ensemble_members or [0] * len(variables)
+    offsets = [build_variable(builder, values, member) for values, member in zip(variables, ensemble_members)]
+
+    builder.StartVector(4, len(offsets), 4)
+    for offset in reversed(offsets):
+        builder.PrependUOffsetTRelative(offset)
+    vector = builder.EndVector()
+
+    length = len(variables[0]) if variables else 0
+    builder.StartObject(4)
+    builder.PrependInt64Slot(0, start, 0)  # time
+    builder.PrependInt64Slot(1, start + length * interval, 0)  # time_end
+    builder.PrependInt32Slot(2, interval, 0)  # interval
+    builder.PrependUOffsetTRelativeSlot(3, vector, 0)  # variables
+    return builder.EndObject()
+
+
+def build_response(latitude: float, longitude: float, start: int, variables: list[np.ndarray],
+                   interval: int = 3600, utc_offset_seconds: int = 0, elevation: float = 0,
+                   ensemble_members: list[int] | None = None, minutely_15: bool = False, model: int = 0) -> bytes:
+    """Build a length-prefixed WeatherApiResponse message with hourly (or 15-minutely) data.
+
+    :param float latitude: latitude in degrees
+    :param float longitude: longitude in degrees
+    :param int start: first timestamp, in seconds since 1970-01-01T00 (UTC)
+    :param list variables: values of every variable, of equal length
+    :param int interval: time step in seconds
+    :param int utc_offset_seconds: time difference to GMT+0 in seconds
+    :param float elevation: elevation in meters
+    :param list ensemble_members: ensemble member of every variable, all 0 if None
+    :param bool minutely_15: store the data as minutely_15 instead of hourly data
+    :param int model: model of the response (see openmeteo_sdk.Model)
+    :return: message as bytes
+    """
+
+    builder = flatbuffers.Builder(1024 + sum(4 * len(values) + 64 for values in variables))
+    data = build_variables_with_time(builder, start, interval, variables, ensemble_members)
+
+    builder.StartObject(14)
+    builder.PrependFloat32Slot(0, latitude, 0)  # latitude
+    builder.PrependFloat32Slot(1, longitude, 0)  # longitude
+    builder.PrependFloat32Slot(2, elevation, 0)  # elevation
+    builder.PrependUint8Slot(5, model, 0)  # model
+    builder.PrependInt32Slot(6, utc_offset_seconds, 0)  # utc_offset_seconds
+    builder.PrependUOffsetTRelativeSlot(12 if minutely_15 else 11, data, 0)  # minutely_15 / hourly
+    builder.Finish(builder.EndObject())
+
+    message = bytes(builder.Output())
+    return len(message).to_bytes(4, byteorder='little') + message
+
+
+def random_variables(n_variables: int, length: int, seed: int = 0, missing: float = 0.01) -> list[np.ndarray]:
+    """Get random weather-like values.
+
+    :param int n_variables: number of variables
+    :param int length: number of values per variable
+    :param int seed: random seed
+    :param float missing: share of NaN values
+    :return: values of every variable
+    """
+
+    rng = np.random.default_rng(seed)
+    variables = []
+    for _ in range(n_variables):
+        values = (rng.standard_normal(length) * 10 + 10).astype(np.float32)
+        values[rng.random(length) < missing] = np.nan
+        variables.append(values)
+
+    return variables
+
+
+def decode(payload: bytes) -> list[WeatherApiResponse]:
+    """Decode length-prefixed WeatherApiResponse messages, as openmeteo_requests.Client does.
+
+    :param bytes payload: messages
+    :return: responses
+    """
+
+    responses = []
+    pos = 0
+    while pos < len(payload):
+        length = int.from_bytes(payload[pos:pos + 4], byteorder='little')
+        responses.append(WeatherApiResponse.GetRootAs(payload, pos + 4))
+        pos += length + 4
+
+    return responses
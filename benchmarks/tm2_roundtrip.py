@@ -0,0 +1,65 @@
+"""Write-read round trip of the location information of tm2 files.
+
+Exports a year of zeros (all variables of OPENMETEO_MAPPING) as tm2 file for sites in all hemispheres and close to the
+zero meridian, reads it back with ConvertToTM2.reader.read_tmy2 and checks that latitude and longitude match to the
+minute written in the header. Run from the repository root:
+
+    python -m benchmarks.tm2_roundtrip
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from benchmarks.synthetic import build_response, decode
+from ConvertToTM2.reader import read_tmy2
+from ConvertToTM2.tmy2format import OPENMETEO_MAPPING
+from OpenMeteoAPI.export import export_tm2
+from OpenMeteoAPI.openmeteo_api import OpenMeteoClient
+
+# latitude and longitude of the sites, with site name as key
+SITES = {
+    'new_york': (40.7128, -74.006),  # western
+    'sydney': (-33.8688, 151.2093),  # southern, eastern
+    'santiago': (-33.4489, -70.6693),  # southern, western
+    'london': (51.5072, -0.1276),  # western, less than a degree from the zero meridian
+    'accra': (5.6037, -0.37),  # western, less than a degree from the zero meridian
+    'paris': (48.8566, 2.3522),  # eastern
+}
+
+
+def check_site(lat: float, long: float, directory: str) -> dict:
+    """Export and read back a tm2 file of a site.
+
+    :param float lat: latitude in degrees
+    :param float long: longitude in degrees
+    :param str directory: directory for the export file
+    :return: result, with written and read latitude and longitude and whether they match
+    """
+
+    variables = list(OPENMETEO_MAPPING)
+    response = decode(build_response(lat, long, 1672531200, [np.zeros(8760, dtype=np.float32)] * len(variables)))[0]
+    path = os.path.join(directory, 'roundtrip.tm2')
+    export_tm2(OpenMeteoClient.get_hourly_df(response, variables), response, path)
+    header, _ = read_tmy2(path)
+
+    # the header holds whole minutes, truncated towards zero
+    ok = abs(header['lat'] - lat) < 1 / 60 and abs(header['long'] - long) < 1 / 60
+
+    return {'lat': lat, 'long': long, 'read_lat': header['lat'], 'read_long': header['long'], 'ok': ok}
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as directory:
+        results = {site: check_site(lat, long, directory) for site, (lat, long) in SITES.items()}
+
+    for site, result in results.items():
+        print(f"{site:<10} {result['lat']:9.4f} {result['long']:9.4f} -> "
+              f"{result['read_lat']:9.4f} {result['read_long']:9.4f}  {'ok' if result['ok'] else 'MISMATCH'}")
+
+    return 0 if all(result['ok'] for result in results.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())